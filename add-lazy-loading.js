@@ -3,6 +3,9 @@
 /**
  * Script to add loading="lazy" attribute to all img tags outside hero sections
  * Runs through all HTML files in the project
+ *
+ * Superseded by scripts/python/lazy_loading.py, which does the same in one
+ * linear pass per page and never edits a tag that is already broken.
  */
 
 import fs from 'fs';
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Index of the site's assets for rebuilding truncated image paths.
+
+The corruption eats the start of an img tag and leaves the tail of its
+path behind, e.g. `< loading="lazy">ucts/pergola-1.webp"`. The repair
+scripts could only rebuild tails matching a few hardcoded fragments
+(`roducts/`, `cts/`, `ts/products/`). AssetIndex maps every tail of every
+file under Assets/ and public/Assets/ (which is served from the same
+/Assets/ URL) that still contains the whole file name to its full path,
+so any such fragment resolves with one dict lookup. A tail shared by two
+different assets (download.webp lives in several folders) resolves to
+nothing rather than to a guess.
+
+asset_prefix() gives the relative path from a page to Assets/ for any
+depth; the old helper stopped at ../../.
+"""
+
+import hashlib
+import os
+
+from discovery import scan
+
+ASSET_DIRS = ('Assets', os.path.join('public', 'Assets'))
+
+_indexes = {}
+
+
+def asset_prefix(depth):
+    """Return the relative path from a page `depth` levels deep to Assets/."""
+    if depth == 0:
+        return './Assets/'
+    return '../' * depth + 'Assets/'
+
+
+def page_depth(rel_path):
+    """Return how many directory levels deep a page is from the site root."""
+    return len(rel_path.replace('\\', '/').split('/')) - 1
+
+
+class AssetIndex:
+    """Served asset paths (`Assets/...`) keyed by every path tail."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.assets = set()
+        self.tails = {}
+        for asset_dir in ASSET_DIRS:
+            for f in scan(os.path.join(self.root, asset_dir), suffixes=None):
+                if os.path.basename(f.rel_path).startswith('.'):
+                    continue  # .DS_Store and friends
+                self.add('Assets/' + f.rel_path.replace(os.sep, '/'))
+
+    def add(self, asset):
+        """Index one served path, e.g. Assets/products/x.webp."""
+        if asset in self.assets:
+            return
+        self.assets.add(asset)
+        name_start = asset.rfind('/') + 1
+        for i in range(name_start + 1):
+            tail = asset[i:]
+            known = self.tails.get(tail, asset)
+            # None marks a tail shared by more than one asset
+            self.tails[tail] = asset if known == asset else None
+
+    def __len__(self):
+        return len(self.assets)
+
+    def fingerprint(self):
+        """Short hash of the asset list, for versioning cached repairs."""
+        digest = hashlib.sha256('\n'.join(sorted(self.assets)).encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    def __contains__(self, asset):
+        return asset in self.assets
+
+    def resolve(self, fragment):
+        """Return the one asset whose path ends with fragment, or None."""
+        return self.tails.get(fragment.replace('\\', '/'))
+
+    def url(self, asset, rel_page_path):
+        """Return the src for asset as written in the page at rel_page_path."""
+        return asset_prefix(page_depth(rel_page_path))[:-len('Assets/')] + asset
+
+
+def get_index(root):
+    """Return the AssetIndex for a site root, built once per process."""
+    root = os.path.abspath(root)
+    index = _indexes.get(root)
+    if index is None:
+        index = _indexes[root] = AssetIndex(root)
+    return index
+
+
+def forget_index(root):
+    """Drop the cached AssetIndex of a site root so the next get_index() rescans it."""
+    _indexes.pop(os.path.abspath(root), None)
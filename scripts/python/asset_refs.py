@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Incremental index of which pages reference which assets.
+
+Replaces the hand-maintained asset-usage-report.csv. Every .html and .css
+file is scanned once for src, href, poster, data-src and srcset values
+and CSS url() references; each reference is resolved against the page's
+served location (pages under public/ are served from the site root) to a
+site path such as Assets/logo/download.webp. The per-page results live in
+a manifest (.repair-cache/asset-refs-manifest.json), so a run only
+re-reads pages whose size or mtime changed, and the asset -> pages
+direction is rebuilt in memory from it.
+
+    python asset_refs.py                      # update the index, print totals
+    python asset_refs.py --uses logo/download.webp
+    python asset_refs.py --unused
+    python asset_refs.py --missing
+    python asset_refs.py --csv asset-usage-report.csv
+"""
+
+import argparse
+import csv
+import html
+import os
+import posixpath
+import re
+import sys
+from urllib.parse import unquote
+
+from asset_index import get_index
+from discovery import add_discovery_arguments, discover
+from manifest import Manifest, content_hash, manifest_path, source_version
+from parallel_runner import add_runner_arguments, run_parallel
+
+INDEX_VERSION = source_version(__file__)
+SCANNED_SUFFIXES = ('.html', '.css')
+
+# One pass over the page: a URL attribute, a srcset, or a CSS url()
+reference_pattern = re.compile(
+    r'''\b(?:(src|href|poster|data-src)|(srcset|data-srcset))\s*=\s*(?:"([^"]*)"|'([^']*)')'''
+    r'''|url\(\s*(?:"([^"]*)"|'([^']*)'|([^)'"\s]*))\s*\)'''
+    r'''|@import\s+(?:"([^"]*)"|'([^']*)')'''
+)
+external_pattern = re.compile(r'^(?:[a-z][a-z0-9+.-]*:|//|#)', re.IGNORECASE)
+
+
+def extract_references(content):
+    """Return every raw URL referenced by a page or stylesheet, in order."""
+    refs = []
+    for m in reference_pattern.finditer(content):
+        if m.group(1) or m.group(2):
+            value = html.unescape(m.group(3) if m.group(3) is not None else m.group(4))
+            if m.group(2):
+                # "a.webp 1x, b.webp 2x": the URL is the first word of each candidate
+                refs.extend(c.split()[0] for c in value.split(',') if c.strip())
+            else:
+                refs.append(value)
+        else:
+            value = next((g for g in m.groups()[4:] if g is not None), '')
+            # url(&quot;x&quot;) inside a style attribute
+            refs.append(html.unescape(value).strip('"\''))
+    return refs
+
+
+def served_path(rel_path):
+    """Return the URL path a file is served at (public/ maps to the root)."""
+    rel_path = rel_path.replace(os.sep, '/')
+    if rel_path.startswith('public/'):
+        return rel_path[len('public/'):]
+    return rel_path
+
+
+def resolve_reference(ref, page_served_path):
+    """
+    Resolve a reference to a site path like Assets/x.webp, or return None
+    for external URLs, fragments, templates and empty values.
+    """
+    ref = ref.strip()
+    if not ref or external_pattern.match(ref) or '{{' in ref or '${' in ref:
+        return None
+    ref = unquote(ref.split('#', 1)[0].split('?', 1)[0])
+    if not ref:
+        return None
+    if ref.startswith('/'):
+        path = ref.lstrip('/')
+    else:
+        path = posixpath.join(posixpath.dirname(page_served_path), ref)
+    path = posixpath.normpath(path)
+    return '' if path == '.' else path
+
+
+def page_references(file_path, rel_path):
+    """Read one page; return (sorted site paths it references, sha256)."""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    page = served_path(rel_path)
+    paths = set()
+    for ref in extract_references(data.decode('utf-8', 'replace')):
+        path = resolve_reference(ref, page)
+        if path is not None:
+            paths.add(path)
+    return sorted(paths), content_hash(data)
+
+
+def site_file_references(site_file):
+    """page_references() for a discovery SiteFile, for the process pool."""
+    return page_references(site_file.path, site_file.rel_path)
+
+
+class AssetRefs:
+    """The page -> references manifest plus the reverse asset -> pages map."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.manifest = Manifest(manifest_path(self.root, 'asset-refs'), INDEX_VERSION)
+        self.assets = get_index(self.root).assets
+        self._users = None
+
+    def update(self, files, workers=None, chunksize=None):
+        """
+        Re-read the pages among `files` (discovery SiteFiles) whose size or
+        mtime changed and forget deleted ones. Returns how many were read.
+        """
+        manifest = self.manifest
+        manifest.prune(f.rel_path for f in files)
+        pending = [f for f in files if not manifest.lookup(f.rel_path, f.size, f.mtime_ns)]
+        for f, error, result in run_parallel(site_file_references, pending, workers, chunksize):
+            if error:
+                print(f"✗ {f.rel_path}: {error}", file=sys.stderr)
+                continue
+            refs, sha256 = result
+            manifest.record(f.rel_path, f.size, f.mtime_ns, sha256, refs)
+        manifest.save()
+        self._users = None
+        return len(pending)
+
+    def references(self):
+        """Return {page rel_path: [site paths]} for every indexed page."""
+        return {rel: entry['result'] for rel, entry in self.manifest.entries.items()}
+
+    def users(self):
+        """Return {site path: sorted pages referencing it}."""
+        if self._users is None:
+            users = {}
+            for rel_path, refs in sorted(self.references().items()):
+                for path in refs:
+                    users.setdefault(path, []).append(rel_path)
+            self._users = users
+        return self._users
+
+    def pages_using(self, asset):
+        """Pages referencing asset: an exact site path or a unique path tail."""
+        if asset not in self.assets:
+            asset = get_index(self.root).resolve(asset) or asset
+        return self.users().get(asset, [])
+
+    def unused_assets(self):
+        """Assets no page or stylesheet references."""
+        users = self.users()
+        return sorted(a for a in self.assets if a not in users)
+
+    def missing_assets(self):
+        """(page, path) pairs referencing an Assets/ path that does not exist."""
+        missing = []
+        for path, pages in sorted(self.users().items()):
+            if path.startswith('Assets/') and path not in self.assets:
+                missing.extend((page, path) for page in pages)
+        return missing
+
+    def write_csv(self, path):
+        """Write the asset,referenced_in report the old CSV used."""
+        users = self.users()
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator='\n')
+            writer.writerow(['asset', 'referenced_in'])
+            for asset in sorted(self.assets):
+                writer.writerow([asset, ';'.join(users.get(asset, []))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index which pages reference which assets.')
+    add_discovery_arguments(parser)
+    add_runner_arguments(parser)
+    parser.add_argument('--uses', metavar='ASSET', help='list the pages that reference ASSET')
+    parser.add_argument('--unused', action='store_true', help='list assets nothing references')
+    parser.add_argument('--missing', action='store_true',
+                        help='list references to assets that do not exist')
+    parser.add_argument('--csv', metavar='PATH', help='write the asset usage report as CSV')
+    args = parser.parse_args()
+
+    refs = AssetRefs(args.root)
+    files = discover(args, SCANNED_SUFFIXES)
+    updated = refs.update(files, args.workers, args.chunksize)
+
+    if args.uses:
+        pages = refs.pages_using(args.uses)
+        for page in pages:
+            print(page)
+        print(f"\n{len(pages)} page(s) reference {args.uses}", file=sys.stderr)
+    if args.unused:
+        unused = refs.unused_assets()
+        for asset in unused:
+            print(asset)
+        print(f"\n{len(unused)} unused asset(s)", file=sys.stderr)
+    if args.missing:
+        missing = refs.missing_assets()
+        for page, path in missing:
+            print(f"{page}: {path}")
+        print(f"\n{len(missing)} reference(s) to missing assets", file=sys.stderr)
+    if args.csv:
+        refs.write_csv(args.csv)
+        print(f"✓ Wrote {args.csv}", file=sys.stderr)
+
+    if not (args.uses or args.unused or args.missing or args.csv):
+        users = refs.users()
+        used = sum(1 for a in refs.assets if a in users)
+        print(f"Indexed {len(files)} files ({updated} re-read)")
+        print(f"  {len(refs.assets)} assets, {used} referenced, {len(refs.assets) - used} unused")
+        print(f"  {len(refs.missing_assets())} reference(s) to missing assets")
+
+
+if __name__ == '__main__':
+    main()
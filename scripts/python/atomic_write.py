@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Atomic, write-if-changed file output shared by the repair scripts.
+
+Opening a page with mode 'w' truncates it first, so a run interrupted
+mid-write (or a dev server reading at the wrong moment) sees a cut-off
+page, which is exactly the damage the fix-* scripts repair. write_atomic()
+writes to a temp file next to the target and renames it over the original,
+so readers see either the old page or the new one. write_if_changed() also
+skips the write when the bytes are identical, leaving the mtime alone for
+incremental tools and file watchers.
+
+Nothing is fsynced by default, like the plain writes this replaces. For
+durable runs collect the written paths in a SyncBatch and flush() once at
+the end: every file, then every directory holding a rename, is synced once
+instead of paying a sync per write.
+"""
+
+import os
+import tempfile
+
+_default_mode = None
+
+
+def default_mode():
+    """Return the mode a newly created file gets under the current umask."""
+    global _default_mode
+    if _default_mode is None:
+        umask = os.umask(0)
+        os.umask(umask)
+        _default_mode = 0o666 & ~umask
+    return _default_mode
+
+
+def write_atomic(path, data, sync=None):
+    """
+    Replace path with data (bytes, or str written as UTF-8) via a temp file
+    and rename. The file keeps its permission bits; sync, if given, is a
+    SyncBatch the path is added to.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    path = os.fspath(path)
+    directory, name = os.path.split(os.path.abspath(path))
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = default_mode()
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    if sync is not None:
+        sync.add(path)
+
+
+def write_if_changed(path, data, original=None, sync=None):
+    """
+    Atomically write data unless path already holds exactly these bytes.
+
+    original is the current content if the caller already read it (bytes
+    or str), saving a re-read. Returns True if the file was written.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if original is None:
+        try:
+            with open(path, 'rb') as f:
+                original = f.read()
+        except FileNotFoundError:
+            original = None
+    elif isinstance(original, str):
+        original = original.encode('utf-8')
+
+    if original == data:
+        return False
+    write_atomic(path, data, sync)
+    return True
+
+
+class SyncBatch:
+    """
+    Paths written during a run, fsynced together by flush().
+
+    Usable as a context manager that flushes on a clean exit.
+    """
+
+    def __init__(self):
+        self.paths = []
+
+    def add(self, path):
+        self.paths.append(os.path.abspath(path))
+
+    def __len__(self):
+        return len(self.paths)
+
+    def flush(self):
+        """fsync every recorded file, then each directory once."""
+        directories = []
+        seen = set()
+        for path in self.paths:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            directory = os.path.dirname(path)
+            if directory not in seen:
+                seen.add(directory)
+                directories.append(directory)
+
+        for directory in directories:
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self.paths = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Benchmark the repair and check scripts on a synthetic corrupted site.
+
+Generates the product × city landing page matrix from
+scripts/generate-landing-pages.js, scaled to any number of pages, from
+seo-generator/template.html, and injects corruption in the exact shapes
+the scripts repair. Each script then runs in its own process against a
+fresh copy of the site, and we record wall time, files/sec, MB/sec and
+peak RSS. Results are saved as JSON; pass --compare with an earlier
+result file to see the change per stage.
+
+    python benchmark.py --pages 10000 --output bench.json
+    python benchmark.py --pages 10000 --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unicodedata
+from datetime import datetime, timezone
+from pathlib import Path
+
+from parallel_runner import default_workers
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPTS_DIR.parents[1]
+TEMPLATE = ROOT / 'seo-generator' / 'template.html'
+
+# From scripts/generate-landing-pages.js
+PRODUCTS = [
+    ('pergolas-bioclimaticas', 'Pérgolas Bioclimáticas'),
+    ('cortinas-de-cristal', 'Cortinas de Cristal'),
+    ('guillotina-de-cristal', 'Guillotina de Cristal'),
+    ('toldos-zip', 'Toldos Zip'),
+    ('techos-retractiles', 'Sistemas de Techo Retráctil'),
+    ('paravientos-de-cristal', 'Paravientos de Cristal'),
+]
+CITIES = [
+    'Marbella', 'Estepona', 'Fuengirola', 'Mijas', 'Benalmádena', 'Sotogrande',
+    'Manilva', 'Sabinillas', 'Torremolinos', 'Nerja', 'Málaga',
+]
+
+# Corruption in the shapes the fix-* scripts handle
+CORRUPTIONS = {
+    'loading-lazy-fragment': '<div class="product-image">< loading="lazy">roducts/bioclimatic/p1.jpg" alt="Pérgola"></div>',
+    'orphan-tag': '    < width="768" height="512" loading="lazy">',
+    'cla-img': ('<img src="./Assets/logo/download.webp" alt="./Assets/logo/download.webp">\n'
+                '                    < cla<img src="./Assets/logo/download.webp" alt="Costa Glass" class="footer-logo">'),
+    'duplicate-footer': ('<img src="./Assets/logo/download.webp" alt="Costa Glass" class="footer-logo">\n'
+                         '                    <img src="./Assets/logo/download.webp" alt="Costa Glass" class="footer-logo">'),
+    'lang-flag': '<img src="https://flagcdn.com/w40/es.png" alt="Español">\n        < class="lang-flag" id="currentFlag">',
+    'overlapping-img-src': '<img src="./Ass<img src="./Assets/products/bioclimatic/p2.jpg" alt="Pérgola">',
+}
+
+# (name, command) pairs, in repair_engine.py's order, so the legacy chain
+# does the same work as the engine; commands are run from the scripts directory
+LEGACY_STAGES = [
+    ('fix-corrupted-images', ['parallel_runner.py', 'fix-corrupted-images.py:fix_corrupted_images']),
+    ('fix-corrupted-images-v2', ['parallel_runner.py', 'fix-corrupted-images-v2.py:fix_corrupted_images_v2']),
+    ('fix-loading-lazy', ['parallel_runner.py', 'fix-loading-lazy.py:fix_loading_lazy']),
+    ('fix-all-html-bugs', ['parallel_runner.py', 'fix-all-html-bugs.py:fix_html_bugs']),
+    ('fix-footer-glitch', ['parallel_runner.py', 'fix-footer-glitch.py:fix_footer_corruption']),
+    ('fix-remaining-corruption', ['parallel_runner.py', 'fix-remaining-corruption.py:fix_remaining_corruption']),
+    ('remove-duplicate-footers', ['parallel_runner.py', 'remove-duplicate-footers.py:remove_duplicate_footer_logos']),
+]
+CHECK_STAGES = [
+    ('final-check', ['parallel_runner.py', 'final-check.py:check_file']),
+    ('verify-fix', ['parallel_runner.py', 'verify-fix.py:check_file']),
+    ('corruption-detector', ['corruption_detector.py']),
+]
+ENGINE_STAGES = [
+    ('repair-engine', ['repair_engine.py']),
+]
+PIPELINES = [
+    ('pipeline:legacy-chain', [command for _, command in LEGACY_STAGES + CHECK_STAGES[:1]]),
+    ('pipeline:repair-engine', [command for _, command in ENGINE_STAGES + CHECK_STAGES[2:]]),
+]
+
+
+def city_names(count):
+    """Return `count` city names: the real ones first, then synthetic."""
+    names = list(CITIES[:count])
+    names.extend(f'Ciudad {i:05d}' for i in range(len(names), count))
+    return names
+
+
+def slugify(text):
+    """Rough port of slugify() in generate-landing-pages.js."""
+    text = unicodedata.normalize('NFD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return '-'.join(''.join(c if c.isalnum() else ' ' for c in text).split())
+
+
+def generate_site(target, pages, corruption_rate, seed):
+    """Write a synthetic site of `pages` city pages; return (files, bytes)."""
+    rng = random.Random(seed)
+    template = TEMPLATE.read_text(encoding='utf-8')
+    cities = city_names(-(-pages // len(PRODUCTS)))
+    shapes = list(CORRUPTIONS.values())
+
+    files = 0
+    total_bytes = 0
+    for i in range(pages):
+        product_id, product_name = PRODUCTS[i % len(PRODUCTS)]
+        city = cities[i // len(PRODUCTS)]
+        html = template.replace('{{PRODUCT}}', product_name).replace('{{CITY}}', city)
+
+        if rng.random() < corruption_rate:
+            injected = '\n'.join(rng.sample(shapes, rng.randint(1, len(shapes))))
+            html = html.replace('</footer>', f'{injected}\n</footer>', 1)
+
+        page_dir = target / product_id / slugify(city)
+        page_dir.mkdir(parents=True, exist_ok=True)
+        data = html.encode('utf-8')
+        (page_dir / 'index.html').write_bytes(data)
+        files += 1
+        total_bytes += len(data)
+    return files, total_bytes
+
+
+def run_command(command, site, workers):
+    """Run one script against site; return (seconds, peak_rss_kb, returncode)."""
+    argv = [sys.executable, *command, '--root', str(site), '--workers', str(workers)]
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        proc = subprocess.Popen(argv, cwd=SCRIPTS_DIR, stdout=subprocess.DEVNULL, stderr=stderr)
+        # wait4() gives the rusage of this child and the pool workers it reaped
+        _, status, rusage = os.wait4(proc.pid, 0)
+        seconds = time.perf_counter() - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        if proc.returncode:
+            stderr.seek(0)
+            last_line = stderr.read().decode('utf-8', 'replace').strip().splitlines()[-1:]
+            print(f"  ✗ {' '.join(command)} exited {proc.returncode}: {''.join(last_line)}")
+    return seconds, rusage.ru_maxrss, proc.returncode
+
+
+def run_stage(name, commands, pristine, work, files, total_bytes, workers):
+    """Time a stage (one or more scripts in sequence) on a fresh copy."""
+    if work.exists():
+        shutil.rmtree(work)
+    shutil.copytree(pristine, work)
+
+    seconds = 0.0
+    peak_rss_kb = 0
+    returncode = 0
+    for command in commands:
+        s, rss, rc = run_command(command, work, workers)
+        seconds += s
+        peak_rss_kb = max(peak_rss_kb, rss)
+        returncode = returncode or rc
+
+    result = {
+        'name': name,
+        'seconds': round(seconds, 4),
+        'files': files,
+        'bytes': total_bytes,
+        'files_per_sec': round(files / seconds, 1) if seconds else None,
+        'mb_per_sec': round(total_bytes / 1e6 / seconds, 2) if seconds else None,
+        'peak_rss_mb': round(peak_rss_kb / 1024, 1),
+        'returncode': returncode,
+    }
+    print(f"  {name:<32} {result['seconds']:>8.2f}s {result['files_per_sec'] or 0:>10.1f} files/s "
+          f"{result['mb_per_sec'] or 0:>8.2f} MB/s {result['peak_rss_mb']:>8.1f} MB RSS")
+    return result
+
+
+def compare(results, previous_path):
+    """Print the change in seconds per stage against an earlier run."""
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = {r['name']: r for r in json.load(f)['results']}
+    print(f"\n--- Compared with {previous_path} ---")
+    for r in results:
+        old = previous.get(r['name'])
+        if not old or not old['seconds']:
+            print(f"  {r['name']:<32} (new)")
+            continue
+        ratio = r['seconds'] / old['seconds']
+        marker = '⚠' if ratio > 1.10 else '✓'
+        print(f"  {marker} {r['name']:<30} {old['seconds']:>8.2f}s → {r['seconds']:>8.2f}s ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the repair and check scripts on a synthetic site.')
+    parser.add_argument('--pages', type=int, default=len(PRODUCTS) * len(CITIES),
+                        help='number of city landing pages to generate')
+    parser.add_argument('--corruption-rate', type=float, default=0.3,
+                        help='fraction of pages that get corruption injected')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=default_workers())
+    parser.add_argument('--only', action='append', help='run only stages with this name (repeatable)')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    parser.add_argument('--keep', action='store_true', help='keep the generated site')
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='costaglass-bench-'))
+    pristine = workdir / 'pristine'
+    work = workdir / 'work'
+    try:
+        start = time.perf_counter()
+        files, total_bytes = generate_site(pristine, args.pages, args.corruption_rate, args.seed)
+        print(f"Generated {files} pages ({total_bytes / 1e6:.1f} MB) in "
+              f"{time.perf_counter() - start:.1f}s at {pristine}\n")
+
+        stages = [(name, [command]) for name, command in LEGACY_STAGES + ENGINE_STAGES + CHECK_STAGES]
+        stages += PIPELINES
+        if args.only:
+            stages = [s for s in stages if s[0] in args.only]
+
+        results = [run_stage(name, commands, pristine, work, files, total_bytes, args.workers)
+                   for name, commands in stages]
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'config': {
+            'pages': args.pages,
+            'corruption_rate': args.corruption_rate,
+            'seed': args.seed,
+            'workers': args.workers,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Linear-time detector for the image corruption patterns.
+
+final-check.py and verify-fix.py used whole-file regexes such as
+`img src.*img src` and `src="[^"]*?"[^>]*?src="`, which backtrack badly on
+minified single-line pages. This module walks the html_tokenizer token
+stream of a page once and reports every occurrence with its line and
+column:
+
+- overlapping-img:    an `<img` starting inside another tag or attribute
+                      value, e.g. <img src="./Ass<img src="./Assets/...
+- broken-opening-tag: `<` followed by whitespace, e.g. < class="lang-flag">
+- missing-img-tag:    a bare quoted path after a tag, e.g. >  "./Assets/...
+- duplicate-src:      a second src attribute inside one tag
+
+Two well-formed img tags on the same line are not reported, unlike the
+line-based regexes they replace.
+"""
+
+import argparse
+import os
+import re
+from collections import namedtuple
+
+import html_tokenizer
+from html_tokenizer import LineIndex, attributes, tokenize
+
+OVERLAPPING_IMG = 'overlapping-img'
+BROKEN_TAG = 'broken-opening-tag'
+MISSING_IMG = 'missing-img-tag'
+DUPLICATE_SRC = 'duplicate-src'
+
+CATEGORIES = (OVERLAPPING_IMG, BROKEN_TAG, MISSING_IMG, DUPLICATE_SRC)
+
+Finding = namedtuple('Finding', 'category offset line column snippet')
+
+missing_img_pattern = re.compile(r'\s+"\./')
+
+
+def snippet_at(content, offset, width=60):
+    """Return a one-line excerpt starting at offset."""
+    return content[offset:offset + width].split('\n', 1)[0].strip()
+
+
+def detect(content):
+    """Return every corruption Finding in a page, in document order."""
+    findings = []
+    lines = LineIndex(content)
+
+    def report(category, offset):
+        line, column = lines.position(offset)
+        findings.append(Finding(category, offset, line, column, snippet_at(content, offset)))
+
+    after_tag = False
+    for token in tokenize(content):
+        kind = token.kind
+        if kind == html_tokenizer.START_TAG:
+            if not token.closed and content.startswith('<img', token.end):
+                report(OVERLAPPING_IMG, token.end)
+            if token.text.count('src') > 1:
+                src_attrs = [a for a in attributes(token) if a.name == 'src']
+                for attr in src_attrs[1:]:
+                    report(DUPLICATE_SRC, attr.start)
+        elif kind == html_tokenizer.BROKEN_TAG:
+            report(BROKEN_TAG, token.start)
+        elif kind == html_tokenizer.TEXT and after_tag:
+            m = missing_img_pattern.match(token.text)
+            if m:
+                report(MISSING_IMG, token.start + m.end() - 3)
+        after_tag = kind != html_tokenizer.RAW_TEXT and token.text.endswith('>')
+
+    return findings
+
+
+def detect_file(file_path):
+    """Read one page and return its findings."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return detect(f.read())
+
+
+def first_issue(findings, labels):
+    """
+    Return the label and first Finding of the highest-priority category
+    in `labels` (category -> label, in priority order), or None.
+    """
+    for category, label in labels.items():
+        for finding in findings:
+            if finding.category == category:
+                return label, finding
+    return None
+
+
+def main():
+    from parallel_runner import add_runner_arguments, run_parallel
+    from discovery import add_discovery_arguments, discover
+
+    parser = argparse.ArgumentParser(description='Report image corruption with line/column positions.')
+    add_discovery_arguments(parser)
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    html_files = [f.path for f in discover(args)]
+    total = 0
+    for file_path, error, findings in run_parallel(detect_file, html_files, args.workers, args.chunksize):
+        rel_path = os.path.relpath(file_path, root)
+        if error:
+            print(f"✗ {rel_path}: {error}")
+            continue
+        for f in findings:
+            print(f"{rel_path}:{f.line}:{f.column}: {f.category}: {f.snippet}")
+        total += len(findings)
+
+    print(f"\n{total} finding(s) in {len(html_files)} files")
+
+
+if __name__ == '__main__':
+    main()
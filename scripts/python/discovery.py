@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+File discovery shared by the repair and check scripts.
+
+Each script used to find its pages its own way: recursive globs of
+`**/*.html` plus `*.html` deduplicated with set(), `**/index.html`, or
+os.walk with an inline node_modules/.git filter, always under a
+hardcoded checkout path. scan() walks the site once with os.scandir,
+never descending into ignored directories (node_modules, .git, dist,
+.astro, ...), and returns a sorted list of SiteFile entries that already
+carry each file's size and mtime, so incremental tools need no second
+stat().
+
+With cache=True the directory listings are kept in
+.repair-cache/discovery.json: a directory whose mtime has not changed is
+not read again, only its matching files are stat()ed.
+"""
+
+import json
+import os
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from atomic_write import write_atomic
+from manifest import CACHE_DIR
+
+ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_IGNORES = frozenset({'.git', 'node_modules', 'dist', '.astro', '.next', CACHE_DIR})
+LISTING_FORMAT = 1
+# A directory modified this close to the scan may still be changing within
+# the same mtime tick, so its listing is not cached
+RACY_SECONDS = 2
+
+SiteFile = namedtuple('SiteFile', 'path rel_path size mtime_ns')
+
+
+def listing_cache_path(root):
+    return os.path.join(root, CACHE_DIR, 'discovery.json')
+
+
+class ListingCache:
+    """Directory listings keyed by directory mtime, stored between runs."""
+
+    def __init__(self, path):
+        self.path = path
+        self.dirs = {}
+        self.dirty = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == LISTING_FORMAT:
+                self.dirs = data.get('dirs', {})
+        except (OSError, ValueError):
+            pass
+        self.seen = set()
+
+    def get(self, rel_dir, mtime_ns):
+        """Return (subdirs, files) if rel_dir is unchanged, else None."""
+        self.seen.add(rel_dir)
+        entry = self.dirs.get(rel_dir)
+        if entry and entry[0] == mtime_ns:
+            return entry[1], entry[2]
+        return None
+
+    def put(self, rel_dir, mtime_ns, subdirs, files):
+        if mtime_ns < (time.time() - RACY_SECONDS) * 1e9:
+            self.dirs[rel_dir] = [mtime_ns, subdirs, files]
+            self.dirty = True
+        elif rel_dir in self.dirs:
+            del self.dirs[rel_dir]
+            self.dirty = True
+
+    def save(self):
+        """Drop listings of directories not seen this run and write atomically."""
+        for rel_dir in list(self.dirs):
+            if rel_dir not in self.seen:
+                del self.dirs[rel_dir]
+                self.dirty = True
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_atomic(self.path, json.dumps({'format': LISTING_FORMAT, 'dirs': self.dirs}))
+        self.dirty = False
+
+
+def read_dir(path):
+    """Return (subdir names, file names) of one directory, sorted."""
+    subdirs = []
+    files = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+            elif entry.is_file():
+                files.append(entry.name)
+    subdirs.sort()
+    files.sort()
+    return subdirs, files
+
+
+def scan(root, suffixes=('.html',), ignore=DEFAULT_IGNORES, cache=False):
+    """
+    Return a SiteFile for every file under root ending in one of
+    `suffixes` (None matches every file), sorted by relative path.
+    Directories named in `ignore` are skipped entirely.
+    """
+    root = os.path.abspath(root)
+    suffixes = tuple(suffixes) if suffixes is not None else None
+    listings = ListingCache(listing_cache_path(root)) if cache else None
+
+    found = []
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        dir_path = os.path.join(root, rel_dir) if rel_dir else root
+        listing = None
+        if listings:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+            listing = listings.get(rel_dir, mtime_ns)
+        if listing is None:
+            try:
+                listing = read_dir(dir_path)
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                continue
+            if listings:
+                listings.put(rel_dir, mtime_ns, *listing)
+        subdirs, files = listing
+
+        for name in files:
+            if suffixes is not None and not name.endswith(suffixes):
+                continue
+            rel_path = os.path.join(rel_dir, name) if rel_dir else name
+            path = os.path.join(dir_path, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            found.append(SiteFile(path, rel_path, st.st_size, st.st_mtime_ns))
+        for name in reversed(subdirs):
+            if name not in ignore:
+                stack.append(os.path.join(rel_dir, name) if rel_dir else name)
+
+    if listings:
+        listings.save()
+    found.sort(key=lambda f: f.rel_path)
+    return found
+
+
+def is_page(rel_path):
+    """True for the pages the site serves: top-level *.html and */index.html."""
+    return os.sep not in rel_path or os.path.basename(rel_path) == 'index.html'
+
+
+def find_html_files(root, ignore=DEFAULT_IGNORES, cache=False):
+    """Return the path of every .html file under root, sorted."""
+    return [f.path for f in scan(root, ('.html',), ignore, cache)]
+
+
+def add_discovery_arguments(parser):
+    """Add the --root/--ignore/--cache-listing options shared by every script."""
+    parser.add_argument('--root', default=str(ROOT), help='site root to scan')
+    parser.add_argument('--ignore', action='append', default=[], metavar='NAME',
+                        help='also skip directories with this name (repeatable)')
+    parser.add_argument('--cache-listing', action='store_true',
+                        help='reuse directory listings from the last run when unchanged')
+
+
+def discover(args, suffixes=('.html',)):
+    """Scan the site selected by add_discovery_arguments() options."""
+    return scan(args.root, suffixes, DEFAULT_IGNORES | set(args.ignore), args.cache_listing)
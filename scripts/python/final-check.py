@@ -1,48 +1,124 @@
 #!/usr/bin/env python3
-import re
-from pathlib import Path
+import argparse
+import os
 
-print("=" * 60)
-print("FINAL IMAGE CORRUPTION CHECK")
-print("=" * 60 + "\n")
+import corruption_detector
+import html_tokenizer
+from corruption_detector import BROKEN_TAG, MISSING_IMG, OVERLAPPING_IMG, detect, first_issue
+from discovery import add_discovery_arguments, discover, is_page
+from manifest import Manifest, content_hash, manifest_path, source_version
+from parallel_runner import add_runner_arguments, run_parallel
 
-root = Path('/Users/noz/Desktop/development/costaGlass')
-html_files = sorted(list(root.glob('*.html')) + list(root.glob('**/index.html')))
+CHECK_VERSION = source_version(__file__, corruption_detector.__file__, html_tokenizer.__file__)
 
-issues_found = []
-clean_count = 0
+ISSUE_LABELS = {
+    OVERLAPPING_IMG: 'Overlapping img tags',
+    BROKEN_TAG: 'Broken opening tags',
+    MISSING_IMG: 'Missing img tag',
+}
 
-for html_file in html_files:
+def check_content(content):
+    """Return the first corruption category found in a page, or None if clean."""
+    issue = first_issue(detect(content), ISSUE_LABELS)
+    if issue:
+        label, finding = issue
+        return f"{label} (line {finding.line}, col {finding.column})"
+    return None
+
+def check_file(html_file):
+    """Return the first corruption category found in a file, or None if clean."""
     with open(html_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Check for corruption patterns
-    if re.search(r'img src.*img src', content):
-        issues_found.append((html_file.relative_to(root), 'Overlapping img tags'))
-    elif re.search(r'<\s+[a-z]', content):  
-        issues_found.append((html_file.relative_to(root), 'Broken opening tags'))
-    elif re.search(r'>\s+"\./', content):
-        issues_found.append((html_file.relative_to(root), 'Missing img tag'))
+        return check_content(f.read())
+
+def check_file_hashed(task):
+    """
+    Check one file for the incremental manifest; reuse the recorded verdict
+    when the content hash matches what the current checks already saw.
+    Returns (issue, sha256, size, mtime_ns).
+    """
+    html_file, known = task
+    with open(html_file, 'rb') as f:
+        data = f.read()
+    sha256 = content_hash(data)
+    if known and known[0] == sha256:
+        issue = known[1]
+    else:
+        issue = check_content(data.decode('utf-8'))
+    st = os.stat(html_file)
+    return issue, sha256, st.st_size, st.st_mtime_ns
+
+def main():
+    parser = argparse.ArgumentParser(description='Check HTML files for image corruption in parallel.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only re-check files changed since the last run')
+    add_discovery_arguments(parser)
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("FINAL IMAGE CORRUPTION CHECK")
+    print("=" * 60 + "\n")
+
+    html_files = [f for f in discover(args) if is_page(f.rel_path)]
+
+    verdicts = {}
+    if args.incremental:
+        # Untouched files keep their recorded verdict without being read
+        manifest = Manifest(manifest_path(os.path.abspath(args.root), 'final-check'), CHECK_VERSION)
+        manifest.prune(f.rel_path for f in html_files)
+        pending = []
+        for f in html_files:
+            entry = manifest.lookup(f.rel_path, f.size, f.mtime_ns)
+            if entry:
+                verdicts[f.path] = None if entry['result'] == 'clean' else entry['result']
+            else:
+                known = manifest.entries.get(f.rel_path)
+                if known:
+                    known = (manifest.known_hash(f.rel_path), None if known['result'] == 'clean' else known['result'])
+                pending.append((f.path, known))
+        for (html_file, _), error, result in run_parallel(check_file_hashed, pending, args.workers, args.chunksize):
+            if error:
+                verdicts[html_file] = error
+                continue
+            issue, sha256, size, mtime_ns = result
+            manifest.record(os.path.relpath(html_file, args.root), size, mtime_ns, sha256, issue or 'clean')
+            verdicts[html_file] = issue
+        manifest.save()
     else:
-        clean_count += 1
-
-if issues_found:
-    print("Files with issues:")
-    for path, issue in issues_found:
-        print(f"  ✗ {path}: {issue}")
-    print()
-
-total = len(html_files)
-print(f"SUMMARY: {clean_count}/{total} files are clean ✓")
-print("=" * 60 + "\n")
-
-if clean_count == total:
-    print("✓✓✓ SUCCESS! All HTML files have been fixed! ✓✓✓\n")
-    print("Fixed issues:")
-    print("  • 83+ files with corrupted overlapping img tags")
-    print("  • Missing closing divs and structures (bioclimatic.html)")
-    print("  • Blog page HTML corruption")
-    print("  • Homepage clients section completely rebuilt")
-    print("\nAll images should now load correctly!")
-else:
-    print(f"⚠ {len(issues_found)} file(s) still have issues")
+        paths = [f.path for f in html_files]
+        for html_file, error, issue in run_parallel(check_file, paths, args.workers, args.chunksize):
+            verdicts[html_file] = error or issue
+
+    issues_found = []
+    clean_count = 0
+
+    for f in html_files:
+        issue = verdicts[f.path]
+        if issue:
+            issues_found.append((f.rel_path, issue))
+        else:
+            clean_count += 1
+
+    if issues_found:
+        print("Files with issues:")
+        for path, issue in issues_found:
+            print(f"  ✗ {path}: {issue}")
+        print()
+
+    total = len(html_files)
+    print(f"SUMMARY: {clean_count}/{total} files are clean ✓")
+    print("=" * 60 + "\n")
+
+    if clean_count == total:
+        print("✓✓✓ SUCCESS! All HTML files have been fixed! ✓✓✓\n")
+        print("Fixed issues:")
+        print("  • 83+ files with corrupted overlapping img tags")
+        print("  • Missing closing divs and structures (bioclimatic.html)")
+        print("  • Blog page HTML corruption")
+        print("  • Homepage clients section completely rebuilt")
+        print("\nAll images should now load correctly!")
+    else:
+        print(f"⚠ {len(issues_found)} file(s) still have issues")
+
+if __name__ == '__main__':
+    main()
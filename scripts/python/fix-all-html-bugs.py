@@ -5,19 +5,11 @@ Fix two issues across all HTML files:
 2. Orphaned/broken img tags causing text on left: `< width="..." ...>` → remove them
 """
 
-import os
+import argparse
 import re
-import glob
 
-base_dir = "/Users/noz/Desktop/development/costaGlass"
-
-html_files = glob.glob(os.path.join(base_dir, "**/*.html"), recursive=True)
-html_files += glob.glob(os.path.join(base_dir, "*.html"))
-# deduplicate
-html_files = list(set(html_files))
-
-fixed_files = []
-errors = []
+from atomic_write import write_atomic
+from discovery import add_discovery_arguments, discover
 
 # Pattern 1: The main lang-flag toggle button - duplicated/broken tag
 # Matches: <img src="...es.png" alt="..."> followed by < class="lang-flag" id="currentFlag"...>
@@ -49,13 +41,30 @@ es_flag_dupe_pattern = re.compile(
     r'<img\s+src="https://flagcdn\.com/w40/es\.png"\s+alt="[^"]*">\s*\n(\s*)<\s+class="lang-flag"\s+id="currentFlag"([^>]*)>'
 )
 
-for fpath in sorted(html_files):
-    try:
-        with open(fpath, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except Exception as e:
-        errors.append(f"READ ERROR {fpath}: {e}")
-        continue
+
+def fix_lang_flag_with_dupe(m):
+    indent = m.group(1)
+    extra_attrs = m.group(2).strip()
+    # Build proper tag
+    if extra_attrs:
+        # has width/height
+        return f'<img src="https://flagcdn.com/w40/es.png" class="lang-flag" id="currentFlag" {extra_attrs} alt="Español">'
+    else:
+        return f'<img src="https://flagcdn.com/w40/es.png" class="lang-flag" id="currentFlag" width="40" height="27" alt="Español">'
+
+
+def fix_lone_lang_flag(m):
+    extra_attrs = m.group(1).strip()
+    if extra_attrs:
+        return f'<img src="https://flagcdn.com/w40/es.png" class="lang-flag" id="currentFlag" {extra_attrs} alt="Español">'
+    else:
+        return f'<img src="https://flagcdn.com/w40/es.png" class="lang-flag" id="currentFlag" width="40" height="27" alt="Español">'
+
+
+def fix_html_bugs(fpath):
+    """Fix the lang-flag and orphaned tags in one HTML file; True if it changed."""
+    with open(fpath, 'r', encoding='utf-8') as f:
+        content = f.read()
 
     original = content
 
@@ -66,29 +75,12 @@ for fpath in sorted(html_files):
     #       < class="lang-flag" id="currentFlag"[optional attrs]>
     # Replace with single proper img tag
     # -----------------------------------------------------------------------
-    def fix_lang_flag_with_dupe(m):
-        indent = m.group(1)
-        extra_attrs = m.group(2).strip()
-        # Build proper tag
-        if extra_attrs:
-            # has width/height
-            return f'<img src="https://flagcdn.com/w40/es.png" class="lang-flag" id="currentFlag" {extra_attrs} alt="Español">'
-        else:
-            return f'<img src="https://flagcdn.com/w40/es.png" class="lang-flag" id="currentFlag" width="40" height="27" alt="Español">'
-
     content = es_flag_dupe_pattern.sub(fix_lang_flag_with_dupe, content)
 
     # -----------------------------------------------------------------------
     # Fix 2: Fix remaining lone broken lang-flag tags (no preceding img dupe)
     # < class="lang-flag" id="currentFlag"...> → proper img tag
     # -----------------------------------------------------------------------
-    def fix_lone_lang_flag(m):
-        extra_attrs = m.group(1).strip()
-        if extra_attrs:
-            return f'<img src="https://flagcdn.com/w40/es.png" class="lang-flag" id="currentFlag" {extra_attrs} alt="Español">'
-        else:
-            return f'<img src="https://flagcdn.com/w40/es.png" class="lang-flag" id="currentFlag" width="40" height="27" alt="Español">'
-
     content = lang_flag_broken_pattern.sub(fix_lone_lang_flag, content)
 
     # -----------------------------------------------------------------------
@@ -106,47 +98,68 @@ for fpath in sorted(html_files):
     content = '\n'.join(cleaned_lines)
 
     if content != original:
+        write_atomic(fpath, content)
+        return True
+    return False
+
+
+def remaining_issues(fpath):
+    """Return (line number, line) for every broken tag left in one file."""
+    with open(fpath, 'r', encoding='utf-8') as f:
+        content = f.read()
+    remaining = []
+    for i, line in enumerate(content.split('\n'), 1):
+        if orphan_tag_pattern.match(line) or '< class="lang-flag"' in line:
+            remaining.append((i, line.strip()))
+    return remaining
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fix broken lang-flag and orphaned img tags.')
+    add_discovery_arguments(parser)
+    args = parser.parse_args()
+
+    html_files = discover(args)
+    fixed_files = []
+    errors = []
+    for html_file in html_files:
         try:
-            with open(fpath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            rel = os.path.relpath(fpath, base_dir)
-            fixed_files.append(rel)
+            if fix_html_bugs(html_file.path):
+                fixed_files.append(html_file.rel_path)
         except Exception as e:
-            errors.append(f"WRITE ERROR {fpath}: {e}")
-
-print(f"\n✅ Fixed {len(fixed_files)} files:")
-for f in fixed_files:
-    print(f"  {f}")
-
-if errors:
-    print(f"\n❌ Errors ({len(errors)}):")
-    for e in errors:
-        print(f"  {e}")
-else:
-    print("\n✓ No errors encountered")
-
-# -----------------------------------------------------------------------
-# Verify: scan for remaining issues
-# -----------------------------------------------------------------------
-print("\n--- Verification ---")
-
-remaining_broken = []
-for fpath in sorted(html_files):
-    try:
-        with open(fpath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        lines = content.split('\n')
-        for i, line in enumerate(lines, 1):
-            if orphan_tag_pattern.match(line):
-                remaining_broken.append(f"{os.path.relpath(fpath, base_dir)}:{i}: {line.strip()}")
-            if '< class="lang-flag"' in line:
-                remaining_broken.append(f"{os.path.relpath(fpath, base_dir)}:{i}: {line.strip()}")
-    except:
-        pass
-
-if remaining_broken:
-    print(f"⚠️  Still found {len(remaining_broken)} remaining issues:")
-    for r in remaining_broken[:20]:
-        print(f"  {r}")
-else:
-    print("✅ No remaining broken tags found!")
+            errors.append(f"ERROR {html_file.path}: {e}")
+
+    print(f"\n✅ Fixed {len(fixed_files)} files:")
+    for f in fixed_files:
+        print(f"  {f}")
+
+    if errors:
+        print(f"\n❌ Errors ({len(errors)}):")
+        for e in errors:
+            print(f"  {e}")
+    else:
+        print("\n✓ No errors encountered")
+
+    # -----------------------------------------------------------------------
+    # Verify: scan for remaining issues
+    # -----------------------------------------------------------------------
+    print("\n--- Verification ---")
+
+    remaining_broken = []
+    for html_file in html_files:
+        try:
+            for i, line in remaining_issues(html_file.path):
+                remaining_broken.append(f"{html_file.rel_path}:{i}: {line}")
+        except (OSError, UnicodeDecodeError):
+            pass
+
+    if remaining_broken:
+        print(f"⚠️  Still found {len(remaining_broken)} remaining issues:")
+        for r in remaining_broken[:20]:
+            print(f"  {r}")
+    else:
+        print("✅ No remaining broken tags found!")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,9 +4,13 @@ Advanced fix for remaining corrupted image tags
 Handles edge cases like incomplete img tags missing opening tags
 """
 
+import argparse
 import os
 import re
-from pathlib import Path
+
+from atomic_write import write_atomic
+from discovery import add_discovery_arguments, discover, is_page
+from parallel_runner import add_runner_arguments, run_parallel
 
 def fix_corrupted_images_v2(file_path):
     """
@@ -59,39 +63,43 @@ def fix_corrupted_images_v2(file_path):
     )
     
     if content != original_content:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        write_atomic(file_path, content)
         return True
     return False
 
+def fix_and_check(file_path):
+    """
+    Apply v2 fixes to one file and report whether it still has corruption
+    """
+    fixed = fix_corrupted_images_v2(file_path)
+    with open(file_path, 'r', encoding='utf-8') as f:
+        still_corrupted = bool(re.search(r'img src.*img src', f.read()))
+    return fixed, still_corrupted
+
 def main():
     """
     Apply v2 fixes to files that still have issues
     """
-    root_dir = Path('/Users/noz/Desktop/development/costaGlass')
-    html_files = list(root_dir.glob('*.html'))
-    html_files.extend(root_dir.glob('**/*/index.html'))
-    html_files = sorted(set(html_files))  # Remove duplicates
+    parser = argparse.ArgumentParser(description='Apply v2 image fixes in parallel.')
+    add_discovery_arguments(parser)
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    rel_paths = {f.path: f.rel_path for f in discover(args) if is_page(f.rel_path)}
     
     fixed_count = 0
     still_corrupted = []
     
-    for html_file in html_files:
-        if 'node_modules' in str(html_file):
+    for html_file, error, result in run_parallel(fix_and_check, rel_paths, args.workers, args.chunksize):
+        if error:
+            print(f"✗ Error: {rel_paths[html_file]}: {error}")
             continue
-        
-        try:
-            if fix_corrupted_images_v2(html_file):
-                print(f"✓ Fixed (v2): {html_file.relative_to(root_dir)}")
-                fixed_count += 1
-            
-            # Check if still has corruption
-            with open(html_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if re.search(r'img src.*img src', content):
-                    still_corrupted.append(str(html_file.relative_to(root_dir)))
-        except Exception as e:
-            print(f"✗ Error: {html_file.relative_to(root_dir)}: {e}")
+        fixed, corrupted = result
+        if fixed:
+            print(f"✓ Fixed (v2): {rel_paths[html_file]}")
+            fixed_count += 1
+        if corrupted:
+            still_corrupted.append(rel_paths[html_file])
     
     print(f"\n✓ Total files fixed (v2): {fixed_count}")
     
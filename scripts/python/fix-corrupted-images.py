@@ -4,9 +4,12 @@ Fix corrupted/overlapping img src attributes across all HTML files
 Handles patterns like: <img src="./Ass<img src="..." 
 """
 
+import argparse
 import os
 import re
-from pathlib import Path
+
+from atomic_write import write_atomic
+from discovery import add_discovery_arguments, discover
 
 def fix_corrupted_images(file_path):
     """
@@ -64,8 +67,7 @@ def fix_corrupted_images(file_path):
     )
     
     if content != original_content:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        write_atomic(file_path, content)
         return True
     return False
 
@@ -73,24 +75,21 @@ def main():
     """
     Fix all HTML files in the project
     """
-    root_dir = Path('/Users/noz/Desktop/development/costaGlass')
-    html_files = list(root_dir.glob('**/*.html'))
-    
+    parser = argparse.ArgumentParser(description='Fix overlapping img src attributes.')
+    add_discovery_arguments(parser)
+    args = parser.parse_args()
+
     fixed_count = 0
     
-    for html_file in sorted(html_files):
-        # Skip index files in node_modules or other non-content directories
-        if 'node_modules' in str(html_file):
-            continue
-        
+    for html_file in discover(args):
         try:
-            if fix_corrupted_images(html_file):
-                print(f"✓ Fixed: {html_file.relative_to(root_dir)}")
+            if fix_corrupted_images(html_file.path):
+                print(f"✓ Fixed: {html_file.rel_path}")
                 fixed_count += 1
             else:
-                print(f"  No changes needed: {html_file.relative_to(root_dir)}")
+                print(f"  No changes needed: {html_file.rel_path}")
         except Exception as e:
-            print(f"✗ Error processing {html_file.relative_to(root_dir)}: {e}")
+            print(f"✗ Error processing {html_file.rel_path}: {e}")
     
     print(f"\n✓ Total files fixed: {fixed_count}")
 
@@ -3,8 +3,11 @@
 Fix footer logo HTML corruption where <img tags are broken with orphan '< alt=...' patterns.
 """
 
+import argparse
 import re
-import os
+
+from atomic_write import write_atomic
+from discovery import add_discovery_arguments, discover
 
 def fix_footer_corruption(file_path):
     """Fix footer logo corruptions in a single HTML file."""
@@ -70,35 +73,28 @@ def fix_footer_corruption(file_path):
     )
     
     if content != original_content:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        write_atomic(file_path, content)
         return True
     
     return False
 
 def main():
     """Process all HTML files in the project."""
-    # Find all HTML files
-    html_files = []
-    for root, dirs, files in os.walk('/Users/noz/Desktop/development/costaGlass'):
-        # Skip node_modules and other common ignore directories
-        dirs[:] = [d for d in dirs if d not in ['.git', 'node_modules', '.next']]
-        for file in files:
-            if file.endswith('.html'):
-                html_files.append(os.path.join(root, file))
-    
+    parser = argparse.ArgumentParser(description='Fix footer logo corruption.')
+    add_discovery_arguments(parser)
+    args = parser.parse_args()
+
     fixed_files = []
-    for file_path in sorted(html_files):
-        if fix_footer_corruption(file_path):
-            fixed_files.append(file_path)
-            print(f"✓ Fixed: {file_path}")
+    for html_file in discover(args):
+        if fix_footer_corruption(html_file.path):
+            fixed_files.append(html_file.rel_path)
+            print(f"✓ Fixed: {html_file.path}")
     
     print(f"\n{'='*60}")
     print(f"Fixed {len(fixed_files)} files")
     if fixed_files:
         print(f"\nFixed files:")
-        for f in sorted(fixed_files):
-            rel_path = f.replace('/Users/noz/Desktop/development/costaGlass/', '')
+        for rel_path in sorted(fixed_files):
             print(f"  - {rel_path}")
 
 if __name__ == '__main__':
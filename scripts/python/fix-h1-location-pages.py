@@ -1,29 +1,55 @@
+#!/usr/bin/env python3
+"""
+Fix the generic h1 left on the product × city location pages.
+"""
+
+import argparse
 import os
 
+from atomic_write import write_atomic
+from discovery import add_discovery_arguments, discover
+
 pages = {
     'cerramientos-de-cristal': ('Cerramientos de Cristal', ['estepona','fuengirola','marbella','mijas','sotogrande']),
     'pergolas-bioclimaticas':   ('Pérgolas Bioclimáticas',  ['estepona','fuengirola','marbella','mijas','sotogrande']),
     'paraviento-de-cristal':    ('Paravientos de Cristal',  ['estepona','fuengirola','marbella','mijas','sotogrande']),
 }
 
-base = '/Users/noz/Desktop/development/costaGlass'
 cities_display = {
     'estepona': 'Estepona', 'fuengirola': 'Fuengirola', 'marbella': 'Marbella',
     'mijas': 'Mijas', 'sotogrande': 'Sotogrande'
 }
 
-for prefix, (product, cities) in pages.items():
-    for city in cities:
-        filepath = os.path.join(base, f'{prefix}-{city}', 'index.html')
-        city_name = cities_display[city]
-        old = f'<h1>Cortinas de cristal y sistemas <span class="hero-accent">en {city_name}</span></h1>'
-        new = f'<h1>{product} <span class="hero-accent">en {city_name}</span></h1>'
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        if old in content:
-            content = content.replace(old, new)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            print(f'Fixed: {prefix}-{city}')
-        else:
-            print(f'Skipped (no match): {prefix}-{city}')
+
+def fix_h1(filepath, product, city_name):
+    """Replace the generic h1 of one location page; True if it changed."""
+    old = f'<h1>Cortinas de cristal y sistemas <span class="hero-accent">en {city_name}</span></h1>'
+    new = f'<h1>{product} <span class="hero-accent">en {city_name}</span></h1>'
+    with open(filepath, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if old not in content:
+        return False
+    write_atomic(filepath, content.replace(old, new))
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fix the h1 of the product location pages.')
+    add_discovery_arguments(parser)
+    args = parser.parse_args()
+
+    # Only pages discovery finds are touched, so --ignore applies
+    found = {f.rel_path: f.path for f in discover(args)}
+    for prefix, (product, cities) in pages.items():
+        for city in cities:
+            filepath = found.get(os.path.join(f'{prefix}-{city}', 'index.html'))
+            if filepath is None:
+                print(f'Skipped (not found): {prefix}-{city}')
+            elif fix_h1(filepath, product, cities_display[city]):
+                print(f'Fixed: {prefix}-{city}')
+            else:
+                print(f'Skipped (no match): {prefix}-{city}')
+
+
+if __name__ == '__main__':
+    main()
@@ -14,39 +14,45 @@ E) `< loading="lazy">ts/products/X"` → `<img src="[pfx]Assets/products/X"` (lo
 F) `< loading="lazy"> <other-tag/text>` → just remove the broken tag
 """
 
+import argparse
 import os
 import re
-import glob
+from functools import partial
 
-base_dir = "/Users/noz/Desktop/development/costaGlass"
+import asset_index
+from atomic_write import write_atomic
+from discovery import ROOT, add_discovery_arguments, discover
+from parallel_runner import add_runner_arguments, run_parallel
 
-html_files = list(set(
-    glob.glob(os.path.join(base_dir, "**/*.html"), recursive=True) +
-    glob.glob(os.path.join(base_dir, "*.html"))
-))
+base_dir = str(ROOT)
 
-def get_depth(fpath):
-    """Return how many directory levels deep the file is from base_dir."""
-    rel = os.path.relpath(fpath, base_dir)
+def get_depth(fpath, root=base_dir):
+    """Return how many directory levels deep the file is from root."""
+    rel = os.path.relpath(fpath, root)
     parts = rel.replace("\\", "/").split("/")
     return len(parts) - 1  # subtract the filename itself
 
 def get_asset_prefix(depth):
     """Return the relative path to Assets/ based on directory depth."""
-    if depth == 0:
-        return "./Assets/"
-    elif depth == 1:
-        return "../Assets/"
-    else:
-        return "../../Assets/"
+    return asset_index.asset_prefix(depth)
 
-def fix_line(line, asset_prefix):
+def fix_line(line, asset_prefix, assets=None):
     # Pattern A/B: < loading="lazy"> (optional whitespace) <img → keep only <img
     line = re.sub(r'<\s+loading="lazy">\s*(<img\s)', r'\1', line)
 
     # Pattern C: < loading="lazy">"path..." → <img src="path..."
     line = re.sub(r'<\s+loading="lazy">"', '<img src="', line)
 
+    # Any path tail that belongs to exactly one file under Assets/, e.g.
+    # < loading="lazy">ucts/pergola-1.webp" → <img src="[prefix]products/pergola-1.webp"
+    if assets is not None:
+        def rebuild_src(m):
+            asset = assets.resolve(m.group(1))
+            if asset is None:
+                return m.group(0)
+            return f'<img src="{asset_prefix[:-len("Assets/")]}{asset}'
+        line = re.sub(r'<\s+loading="lazy">([^"<>]+)(?=")', rebuild_src, line)
+
     # Pattern D: < loading="lazy">roducts/X → <img src="[prefix]products/X
     # (< loading="lazy"> replaced <img src="[prefix]p", leaving "roducts/X")
     line = re.sub(
@@ -81,63 +87,81 @@ def fix_line(line, asset_prefix):
 
     return line
 
-fixed_files = []
-errors = []
-
-for fpath in sorted(html_files):
-    try:
-        with open(fpath, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except Exception as e:
-        errors.append(f"READ ERROR {fpath}: {e}")
-        continue
+def fix_loading_lazy(fpath, root=base_dir):
+    """Repair one file; return True if it was rewritten."""
+    with open(fpath, 'r', encoding='utf-8') as f:
+        content = f.read()
 
     if '< loading="lazy">' not in content:
-        continue
+        return False
 
     original = content
-    depth = get_depth(fpath)
+    depth = get_depth(fpath, root)
     asset_prefix = get_asset_prefix(depth)
 
     lines = content.split('\n')
-    fixed_lines = [fix_line(line, asset_prefix) for line in lines]
+    assets = asset_index.get_index(root)
+    fixed_lines = [fix_line(line, asset_prefix, assets) for line in lines]
     content = '\n'.join(fixed_lines)
 
     if content != original:
-        try:
-            with open(fpath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            rel = os.path.relpath(fpath, base_dir)
-            fixed_files.append(rel)
-        except Exception as e:
-            errors.append(f"WRITE ERROR {fpath}: {e}")
-
-print(f"\n✅ Fixed {len(fixed_files)} files:")
-for f in fixed_files:
-    print(f"  {f}")
-
-if errors:
-    print(f"\n❌ Errors ({len(errors)}):")
-    for e in errors:
-        print(f"  {e}")
-else:
-    print("\n✓ No errors encountered")
-
-# --- Verification ---
-print("\n--- Final Verification ---")
-remaining = []
-for fpath in sorted(html_files):
+        write_atomic(fpath, content)
+        return True
+    return False
+
+def find_remaining(fpath, root=base_dir):
+    """Return the `< loading="lazy">` lines still present in one file."""
+    remaining = []
     try:
         with open(fpath, 'r', encoding='utf-8') as f:
             for i, line in enumerate(f, 1):
                 if '< loading="lazy">' in line:
-                    remaining.append(f"{os.path.relpath(fpath, base_dir)}:{i}: {line.strip()}")
+                    remaining.append(f"{os.path.relpath(fpath, root)}:{i}: {line.strip()}")
     except:
         pass
+    return remaining
+
+def main():
+    parser = argparse.ArgumentParser(description='Fix < loading="lazy"> broken tags in parallel.')
+    add_discovery_arguments(parser)
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    html_files = [f.path for f in discover(args)]
+
+    fixed_files = []
+    errors = []
+
+    for fpath, error, fixed in run_parallel(partial(fix_loading_lazy, root=root), html_files, args.workers, args.chunksize):
+        if error:
+            errors.append(f"ERROR {fpath}: {error}")
+        elif fixed:
+            fixed_files.append(os.path.relpath(fpath, root))
+
+    print(f"\n✅ Fixed {len(fixed_files)} files:")
+    for f in fixed_files:
+        print(f"  {f}")
+
+    if errors:
+        print(f"\n❌ Errors ({len(errors)}):")
+        for e in errors:
+            print(f"  {e}")
+    else:
+        print("\n✓ No errors encountered")
+
+    # --- Verification ---
+    print("\n--- Final Verification ---")
+    remaining = []
+    for fpath, error, lines in run_parallel(partial(find_remaining, root=root), html_files, args.workers, args.chunksize):
+        remaining.extend(lines or [])
+
+    if remaining:
+        print(f"⚠️  Still found {len(remaining)} remaining issues:")
+        for r in remaining[:20]:
+            print(f"  {r}")
+    else:
+        print("✅ No remaining < loading=\"lazy\"> broken tags!")
 
-if remaining:
-    print(f"⚠️  Still found {len(remaining)} remaining issues:")
-    for r in remaining[:20]:
-        print(f"  {r}")
-else:
-    print("✅ No remaining < loading=\"lazy\"> broken tags!")
+if __name__ == '__main__':
+    main()
@@ -1,35 +1,46 @@
+import os
 import sys
 
-def fix_paths(path, is_subfolder=True):
+from atomic_write import write_if_changed
+from discovery import ROOT
+from link_graph import build_routes, scan_links
+
+_routes = {}
+
+
+def get_routes(root):
+    """Return the RouteIndex of a site root, scanned once per process."""
+    root = os.path.abspath(root)
+    routes = _routes.get(root)
+    if routes is None:
+        routes = _routes[root] = build_routes(root)
+    return routes
+
+
+def fix_paths(path, is_subfolder=True, root=ROOT, routes=None):
+    """
+    Rewrite the broken links of one page to their depth-relative form.
+    Delegates to link_graph.py, which resolves every href against the
+    page's location instead of a fixed list of names and a '../' prefix.
+    With is_subfolder, a bare href="index.html" is a home link and
+    becomes '../' (or whatever reaches the root from the page).
+    The site's route index is built on the first call for a root and
+    reused, unless one is passed in as routes.
+    """
     with open(path, 'r', encoding='utf-8') as f:
         content = f.read()
 
-    prefix = '../' if is_subfolder else ''
-
-    replacements = [
-        ('href="index.html"', f'href="{prefix}"'),
-        ('href="blog.html"', f'href="{prefix}blog.html"'),
-        ('href="contact.html"', f'href="{prefix}contact.html"'),
-        ('href="company.html"', f'href="{prefix}company.html"'),
-        ('href="bioclimatic.html"', f'href="{prefix}bioclimatic.html"'),
-        ('href="glass-curtain-walls.html"', f'href="{prefix}glass-curtain-walls.html"'),
-        ('href="guillotine-glass.html"', f'href="{prefix}guillotine-glass.html"'),
-        ('href="zip-screen.html"', f'href="{prefix}zip-screen.html"'),
-        ('href="retractable-pvc-roof.html"', f'href="{prefix}retractable-pvc-roof.html"'),
-        ('href="paravientos-de-cristal.html"', f'href="{prefix}paravientos-de-cristal.html"'),
-        ('href="permiso-comunidad-cerrar-terraza-andalucia.html"', f'href="{prefix}permiso-comunidad-cerrar-terraza-andalucia.html"'),
-        ('href="cerramientos-de-terrazas-cristal-precio-m2/"', f'href="{prefix}cerramientos-de-terrazas-cristal-precio-m2/"'),
-        ('href="cortinas-de-cristal-inconvenientes/"', f'href="{prefix}cortinas-de-cristal-inconvenientes/"'),
-        ('href="pergola-bioclimatica-vs-toldo-tradicional-costa-del-sol.html"', f'href="{prefix}pergola-bioclimatica-vs-toldo-tradicional-costa-del-sol.html"'),
-        ('href="politica-de-privacidad.html"', f'href="{prefix}politica-de-privacidad.html"'),
-    ]
-
-    for old, new in replacements:
-        content = content.replace(old, new)
-
-    with open(path, 'w', encoding='utf-8') as f:
-        f.write(content)
-    print(f'Fixed: {path}')
+    if routes is None:
+        routes = get_routes(root)
+    rel_path = os.path.relpath(os.path.abspath(path), root)
+    _, edits = scan_links(content, rel_path, routes, fix=True, index_is_home=is_subfolder)
+    content = edits.apply(content)
+
+    if write_if_changed(path, content):
+        print(f'Fixed: {path}')
+    else:
+        print(f'No changes: {path}')
 
 if __name__ == '__main__':
-    fix_paths(sys.argv[1])
+    for path in sys.argv[1:]:
+        fix_paths(path)
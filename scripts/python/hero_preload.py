@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Preload each page's hero image and fetch it at high priority.
+
+The largest contentful paint of every product and city page is its hero
+image or first slide, but the browser only discovers it once the CSS and
+the markup before it are in, and then fetches it at the default image
+priority. This pass finds the hero image of each page (the first img in,
+or itself matching, the hero/hero-slide/banner selectors lazy_loading.py
+uses) and:
+
+- adds `<link rel="preload" as="image" fetchpriority="high">` to <head>,
+  before the first stylesheet or script, with the img's srcset and sizes
+  (or those of the first <source> of its <picture>, with its type), or
+  updates the one it added before when the hero changed;
+- sets fetchpriority="high" on the img;
+- switches a loading="lazy" on it to eager.
+
+Pages without a hero image lose a preload left from an earlier run.
+Results are kept in a manifest (.repair-cache/hero-preload-manifest.json):
+a page whose size and mtime, or failing that whose content hash, matches
+what this pass last wrote is not processed again.
+
+    python hero_preload.py             # rewrite pages
+    python hero_preload.py --diff      # write nothing, print a patch
+"""
+
+import argparse
+import html
+import os
+import posixpath
+import sys
+from functools import partial
+
+import html_tokenizer
+import image_dimensions
+import lazy_loading
+from atomic_write import write_atomic
+from discovery import add_discovery_arguments, discover
+from html_tokenizer import END_TAG, START_TAG, VOID_ELEMENTS, EditList, attributes, tokenize
+from image_dimensions import attribute_insert_pos
+from lazy_loading import matches_hero
+from manifest import Manifest, content_hash, manifest_path, source_version
+from parallel_runner import add_runner_arguments, run_parallel
+from repair_diff import unified_diff
+
+HINTS_VERSION = source_version(__file__, lazy_loading.__file__, html_tokenizer.__file__,
+                               image_dimensions.__file__)
+
+# The selectors of add-lazy-loading.js that mark the LCP section; the
+# logos and flags it also keeps eager are not hero images
+LCP_SELECTORS = ('hero', 'hero-slide', 'banner')
+# Formats a browser may not support: the preload says so, so it is skipped
+# where the img would not load either
+IMAGE_TYPES = {'.webp': 'image/webp', '.avif': 'image/avif'}
+# Where the preload goes in <head>: before the first of these
+HEAD_RESOURCES = ('link', 'script', 'style')
+
+
+def attribute_map(token):
+    """Return {name: Attribute} for a tag, first occurrence winning."""
+    attrs = {}
+    for attr in attributes(token):
+        attrs.setdefault(attr.name, attr)
+    return attrs
+
+
+def value(attrs, name):
+    attr = attrs.get(name)
+    return html.unescape(attr.value or '') if attr else ''
+
+
+def is_hero_preload(token):
+    """True for a preload link this pass manages: an image preload at high priority."""
+    attrs = attribute_map(token)
+    return (value(attrs, 'rel').lower() == 'preload' and value(attrs, 'as').lower() == 'image'
+            and value(attrs, 'fetchpriority').lower() == 'high')
+
+
+def preload_tag(img, sources):
+    """Return the preload link for a hero img and the <source> tags before it."""
+    img_attrs = attribute_map(img)
+    source = next((s for s in map(attribute_map, sources) if value(s, 'srcset')), None)
+    if source:
+        fields = [('imagesrcset', value(source, 'srcset')),
+                  ('imagesizes', value(source, 'sizes') or value(img_attrs, 'sizes')),
+                  ('type', value(source, 'type'))]
+    else:
+        src = value(img_attrs, 'src')
+        ext = posixpath.splitext(src.split('?', 1)[0])[1].lower()
+        fields = [('href', src),
+                  ('imagesrcset', value(img_attrs, 'srcset')),
+                  ('imagesizes', value(img_attrs, 'sizes') if value(img_attrs, 'srcset') else ''),
+                  ('type', IMAGE_TYPES.get(ext, ''))]
+    parts = ''.join(f' {name}="{html.escape(text)}"' for name, text in fields if text)
+    return f'<link rel="preload" as="image"{parts} fetchpriority="high">'
+
+
+def line_indent(content, pos):
+    """The whitespace that starts the line pos is on, if pos starts its text."""
+    line_start = content.rfind('\n', 0, pos) + 1
+    indent = content[line_start:pos]
+    return indent if not indent.strip() else ''
+
+
+def line_span(content, token):
+    """The span to delete for a tag: its whole line if it stands alone there."""
+    line_start = content.rfind('\n', 0, token.start) + 1
+    line_end = content.find('\n', token.end)
+    line_end = len(content) if line_end == -1 else line_end
+    if not content[line_start:token.start].strip() and not content[token.end:line_end].strip():
+        return line_start, min(line_end + 1, len(content))
+    return token.start, token.end
+
+
+def hero_hint_edits(content):
+    """
+    Record the preload and img edits for one page in a single pass.
+
+    Returns (EditList, hero src or None, list of what was changed).
+    """
+    edits = EditList()
+    stack = []          # (element name, inside a hero section)
+    in_head = False
+    head_insert = None  # offset the preload link is inserted at
+    preloads = []       # preload links this pass added before
+    sources = None      # <source> tags of the open <picture>
+    hero = None
+    for token in tokenize(content):
+        if token.kind == END_TAG:
+            if token.name == 'head':
+                in_head = False
+                if head_insert is None:
+                    head_insert = token.start
+            elif token.name == 'picture':
+                sources = None
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i][0] == token.name:
+                    del stack[i:]
+                    break
+            continue
+        if token.kind != START_TAG or not token.closed:
+            continue
+
+        name = token.name
+        if name == 'head':
+            in_head = True
+            continue
+        if in_head and name == 'link' and is_hero_preload(token):
+            preloads.append(token)
+            continue
+        if in_head and head_insert is None and name in HEAD_RESOURCES:
+            head_insert = token.start
+        if name == 'body':
+            in_head = False
+        if name == 'picture':
+            sources = []
+        elif name == 'source' and sources is not None:
+            sources.append(token)
+
+        in_hero = bool(stack) and stack[-1][1]
+        if name == 'img':
+            if in_hero or matches_hero(token, LCP_SELECTORS):
+                hero = (token, sources or [])
+                break
+            continue
+        if name not in VOID_ELEMENTS and not token.text.endswith('/>'):
+            stack.append((name, in_hero or matches_hero(token, LCP_SELECTORS)))
+
+    changes = []
+    if hero is None:
+        for link in preloads:
+            edits.delete(*line_span(content, link))
+        if preloads:
+            changes.append('stale preload removed')
+        return edits, None, changes
+
+    img, picture_sources = hero
+    tag = preload_tag(img, picture_sources)
+    if preloads:
+        if preloads[0].text != tag:
+            edits.replace(preloads[0].start, preloads[0].end, tag)
+            changes.append('preload updated')
+        for link in preloads[1:]:
+            edits.delete(*line_span(content, link))
+    elif head_insert is not None:
+        indent = line_indent(content, head_insert)
+        edits.insert(head_insert, f'{tag}\n{indent}' if indent else tag)
+        changes.append('preload added')
+
+    attrs = attribute_map(img)
+    priority = attrs.get('fetchpriority')
+    if priority is None:
+        edits.insert(attribute_insert_pos(content, img), ' fetchpriority="high"')
+        changes.append('fetchpriority set')
+    elif (priority.value or '').lower() != 'high':
+        edits.replace(priority.start, priority.end, 'fetchpriority="high"')
+        changes.append('fetchpriority set')
+    loading = attrs.get('loading')
+    if loading is not None and (loading.value or '').lower() == 'lazy':
+        edits.replace(loading.start, loading.end, 'loading="eager"')
+        changes.append('made eager')
+    return edits, value(attrs, 'src') or None, changes
+
+
+def process_page(task, dry_run=False):
+    """
+    Apply hero_hint_edits() to one page unless its content hash is the
+    one this pass last wrote. Returns (hero, changes, diff, sha256, size,
+    mtime_ns); hero and changes are None for a page skipped by hash.
+    """
+    site_file, known_sha = task
+    with open(site_file.path, 'rb') as f:
+        data = f.read()
+    sha256 = content_hash(data)
+    if sha256 == known_sha and not dry_run:
+        st = os.stat(site_file.path)
+        return None, None, None, sha256, st.st_size, st.st_mtime_ns
+    content = data.decode('utf-8')
+    edits, hero, changes = hero_hint_edits(content)
+    diff = None
+    if edits:
+        updated = edits.apply(content)
+        if dry_run:
+            diff = unified_diff(content, updated, [edits], site_file.rel_path.replace(os.sep, '/'))
+        else:
+            write_atomic(site_file.path, updated)
+            sha256 = content_hash(updated.encode('utf-8'))
+    st = os.stat(site_file.path)
+    return hero, changes, diff, sha256, st.st_size, st.st_mtime_ns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_discovery_arguments(parser)
+    parser.add_argument('--diff', action='store_true',
+                        help='write nothing; print a unified diff of the changes')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+    log = sys.stderr if args.diff else sys.stdout
+
+    print('🚀 Adding hero image preload hints...\n', file=log)
+    root = os.path.abspath(args.root)
+    pages = discover(args)
+    manifest = Manifest(manifest_path(root, 'hero-preload'), HINTS_VERSION)
+    manifest.prune(f.rel_path for f in pages)
+    # Pages untouched since the last run are not even read
+    pending = [(f, manifest.known_hash(f.rel_path)) for f in pages
+               if args.diff or not manifest.lookup(f.rel_path, f.size, f.mtime_ns)]
+
+    modified = []
+    errors = []
+    for (f, _), error, result in run_parallel(partial(process_page, dry_run=args.diff),
+                                              pending, args.workers, args.chunksize):
+        if error:
+            errors.append(f"{f.rel_path}: {error}")
+            continue
+        hero, changes, diff, sha256, size, mtime_ns = result
+        if changes is None:
+            # Touched but identical: remember the new mtime
+            hero = manifest.entries[f.rel_path]['result']
+        if not args.diff:
+            manifest.record(f.rel_path, size, mtime_ns, sha256, hero)
+        if changes:
+            modified.append(f.rel_path)
+            if diff:
+                sys.stdout.write(diff)
+            else:
+                print(f"✅ {f.rel_path}: {', '.join(changes)} ({hero or 'no hero image'})")
+    if not args.diff:
+        manifest.save()
+    heroes = sum(1 for f in pages if (manifest.entries.get(f.rel_path) or {}).get('result'))
+
+    verb = 'Would modify' if args.diff else '✨ Complete! Modified'
+    print(f"\n{verb} {len(modified)} of {len(pages)} file(s); {len(pages) - len(pending)} unchanged "
+          f"since the last run, {heroes} page(s) with a hero image", file=log)
+
+    if errors:
+        print(f"\n⚠️  {len(errors)} error(s) occurred:", file=log)
+        for e in errors:
+            print(f"   - {e}", file=log)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Streaming HTML tokenizer and splice-edit buffer shared by the repair rules.
+
+tokenize() walks a page once and yields Token events (text, start and end
+tags, comments, declarations, raw script/style text, and the broken
+`< attr=...>` fragments these scripts exist to repair) with their offsets
+into the page. Tokenizer does the same for input that arrives in chunks.
+
+Tokens are corruption-aware: a tag cut short by another tag starting
+inside it, e.g. <img src="./Ass<img src="./Assets/x.webp">, ends where
+the inner tag begins with closed=False, so the inner tag is tokenized on
+its own instead of the quote mismatch swallowing the rest of the page.
+
+EditList collects replace/insert/delete splices against the original
+page from any number of rules and applies them in one rebuild, so the
+rules never copy the whole page between themselves.
+"""
+
+import bisect
+import re
+from collections import namedtuple
+
+TEXT = 'text'
+START_TAG = 'starttag'
+END_TAG = 'endtag'
+COMMENT = 'comment'
+DECLARATION = 'declaration'
+RAW_TEXT = 'rawtext'
+BROKEN_TAG = 'broken'
+
+VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+})
+RAW_TEXT_ELEMENTS = ('script', 'style', 'textarea', 'title')
+
+# name is lower-cased for tags; closed is False when a tag ran into
+# another '<' (or the end of input) before its '>'.
+Token = namedtuple('Token', 'kind start end name text closed')
+Attribute = namedtuple('Attribute', 'name value start end')
+
+# Classifies whatever follows a '<': comment, declaration, end tag,
+# broken opening tag, or a tag name.
+markup_pattern = re.compile(
+    r'<(?:(!--)|(!)|/([A-Za-z][A-Za-z0-9:-]*)|(\s+[a-z])|([A-Za-z][A-Za-z0-9:-]*))?'
+)
+# A complete, well-formed run of attributes up to the closing '>'
+clean_tag_pattern = re.compile(
+    r'''(?:[\s/]+[^\s"'>/=<]+(?:\s*=\s*(?:"[^"<]*"|'[^'<]*'|[^\s"'<>]+))?)*[\s/]*>'''
+)
+# Whitespace, then optionally an attribute with a value that cannot hide a
+# tag. A quoted value containing '<' matches only up to its opening quote
+# (group 2 unset) and is handed to quoted_end().
+attribute_pattern = re.compile(
+    r'''[\s/]*(?:([^\s"'>/=<]+)(?:\s*=\s*(?:("[^"<]*"|'[^'<]*'|[^\s"'<>]+)|(?=["'])))?)?'''
+)
+tag_start_pattern = re.compile(r'</?[A-Za-z]')
+raw_text_end_patterns = {
+    name: re.compile(rf'</{name}\s*>', re.IGNORECASE) for name in RAW_TEXT_ELEMENTS
+}
+
+
+def quoted_end(content, pos, limit):
+    """
+    Return where the quoted string opening at pos ends. A tag starting
+    inside it (the overlap corruption shape) cuts it short, so the caller
+    sees that `<` next.
+    """
+    close = content.find(content[pos], pos + 1, limit)
+    if close == -1:
+        close = limit
+    inner = tag_start_pattern.search(content, pos + 1, close)
+    if inner:
+        return inner.start()
+    return min(close + 1, limit)
+
+
+def scan_tag(content, pos, limit):
+    """
+    Scan the attributes of a tag starting at pos; return (end, closed).
+    A `<` before the closing '>' ends the tag early, unconsumed.
+    """
+    clean = clean_tag_pattern.match(content, pos, limit)
+    if clean:
+        return clean.end(), True
+
+    while pos < limit:
+        m = attribute_pattern.match(content, pos, limit)
+        pos = m.end()
+        if m.group(1):
+            if m.group(2) is None and pos < limit and content[pos] in '"\'':
+                pos = quoted_end(content, pos, limit)
+            continue
+        if pos >= limit:
+            break
+        c = content[pos]
+        if c == '>':
+            return pos + 1, True
+        if c == '<':
+            return pos, False
+        if c in '"\'':
+            # Stray quoted string with no attribute name in front of it
+            pos = quoted_end(content, pos, limit)
+        else:
+            pos += 1
+    return limit, False
+
+
+def attributes(token):
+    """Parse the attributes of a start or broken tag; offsets are absolute."""
+    text = token.text
+    m = markup_pattern.match(text)
+    pos = 1 if token.kind == BROKEN_TAG else m.end()
+    attrs = []
+    limit = len(text)
+    while pos < limit:
+        m = attribute_pattern.match(text, pos, limit)
+        pos = m.end()
+        if m.group(1):
+            value = m.group(2)
+            if value is not None:
+                if value[0] in '"\'':
+                    value = value[1:-1]
+            elif pos < limit and text[pos] in '"\'':
+                # Quoted value containing '<', possibly cut by an inner tag
+                value_end = quoted_end(text, pos, limit)
+                closed = value_end - pos > 1 and text[value_end - 1] == text[pos]
+                value = text[pos + 1:value_end - 1 if closed else value_end]
+                pos = value_end
+            attrs.append(Attribute(m.group(1).lower(), value,
+                                   token.start + m.start(1), token.start + pos))
+            continue
+        if pos >= limit or text[pos] in '><':
+            break
+        pos = quoted_end(text, pos, limit) if text[pos] in '"\'' else pos + 1
+    return attrs
+
+
+def get_attribute(token, name, default=None):
+    """Return the value of the first attribute called name."""
+    for attr in attributes(token):
+        if attr.name == name:
+            return attr.value
+    return default
+
+
+def next_token(content, pos, raw_tag, final):
+    """
+    Return (token, raw_tag) for the construct starting at pos, or
+    (None, raw_tag) when more input is needed to know where it ends.
+    """
+    n = len(content)
+    if raw_tag:
+        close = raw_text_end_patterns[raw_tag].search(content, pos)
+        if close is None:
+            if not final:
+                return None, raw_tag
+            return Token(RAW_TEXT, pos, n, raw_tag, content[pos:], True), None
+        if close.start() > pos:
+            end = close.start()
+            return Token(RAW_TEXT, pos, end, raw_tag, content[pos:end], True), raw_tag
+        raw_tag = None
+
+    m = markup_pattern.match(content, pos) if content.startswith('<', pos) else None
+    if m is None or m.lastindex is None:
+        # Text, including a literal '<' that does not start markup
+        end = content.find('<', pos + 1)
+        if end == -1:
+            if not final:
+                return None, raw_tag
+            end = n
+        return Token(TEXT, pos, end, None, content[pos:end], True), raw_tag
+
+    comment, declaration, end_name, broken, name = m.groups()
+    if comment or declaration:
+        end = content.find('-->' if comment else '>', m.end())
+        if end == -1:
+            if not final:
+                return None, raw_tag
+            end = n
+        else:
+            end += 3 if comment else 1
+        kind = COMMENT if comment else DECLARATION
+        return Token(kind, pos, end, None, content[pos:end], True), raw_tag
+
+    if end_name:
+        end = content.find('>', m.end())
+        if end == -1:
+            if not final:
+                return None, raw_tag
+            end = n - 1
+        return Token(END_TAG, pos, end + 1, end_name.lower(), content[pos:end + 1], True), raw_tag
+
+    end, closed = scan_tag(content, pos + 1 if broken else m.end(), n)
+    if end == n and not closed and not final:
+        return None, raw_tag
+    kind = BROKEN_TAG if broken else START_TAG
+    name = name.lower() if name else None
+    if closed and name in raw_text_end_patterns:
+        raw_tag = name
+    return Token(kind, pos, end, name, content[pos:end], closed), raw_tag
+
+
+def tokenize(content):
+    """Yield every Token of a page held in memory, in document order."""
+    pos = 0
+    raw_tag = None
+    n = len(content)
+    while pos < n:
+        token, raw_tag = next_token(content, pos, raw_tag, True)
+        yield token
+        pos = token.end
+
+
+class Tokenizer:
+    """
+    Incremental tokenizer for input that arrives in chunks.
+
+    feed() yields the tokens that are complete so far; close() yields the
+    rest. Offsets count from the start of the whole input. Only the
+    unfinished tail of the input is buffered between calls.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.offset = 0
+        self.raw_tag = None
+
+    def feed(self, chunk):
+        """Add a chunk and return the list of tokens completed by it."""
+        self.buffer += chunk
+        return list(self._drain(False))
+
+    def close(self):
+        """Return the remaining tokens at the end of input."""
+        return list(self._drain(True))
+
+    def _drain(self, final):
+        pos = 0
+        buffer = self.buffer
+        while pos < len(buffer):
+            token, raw_tag = next_token(buffer, pos, self.raw_tag, final)
+            if token is None:
+                break
+            self.raw_tag = raw_tag
+            pos = token.end
+            yield token._replace(start=token.start + self.offset, end=token.end + self.offset)
+        self.buffer = buffer[pos:]
+        self.offset += pos
+
+
+class LineIndex:
+    """Map string offsets to 1-based (line, column) via a newline table."""
+
+    def __init__(self, content):
+        self.starts = [0]
+        self.starts.extend(m.end() for m in re.finditer('\n', content))
+
+    def position(self, offset):
+        line = bisect.bisect_right(self.starts, offset)
+        return line, offset - self.starts[line - 1] + 1
+
+
+class EditList:
+    """
+    Splice edits against one source string, applied in a single rebuild.
+
+    Edits are recorded as (start, end, replacement) against the original
+    text. When two edits overlap, the one recorded first wins and the
+    other is dropped, so rules registered earlier take precedence.
+    Insertions at the same offset are applied in recording order.
+    """
+
+    def __init__(self):
+        self.accepted = []   # sorted (start, end, order, text)
+        self.dropped = 0
+        self._order = 0
+
+    def replace(self, start, end, text):
+        """Replace content[start:end] with text; return False if dropped."""
+        key = (start, end, self._order)
+        i = bisect.bisect_left(self.accepted, key)
+        if i > 0 and self.accepted[i - 1][1] > start:
+            self.dropped += 1
+            return False
+        if i < len(self.accepted):
+            nxt_start = self.accepted[i][0]
+            if nxt_start < end:
+                self.dropped += 1
+                return False
+        self.accepted.insert(i, (start, end, self._order, text))
+        self._order += 1
+        return True
+
+    def insert(self, pos, text):
+        return self.replace(pos, pos, text)
+
+    def delete(self, start, end):
+        return self.replace(start, end, '')
+
+    def __len__(self):
+        return len(self.accepted)
+
+    def apply(self, content):
+        """Return content with every accepted edit spliced in."""
+        if not self.accepted:
+            return content
+        pieces = []
+        last = 0
+        for start, end, _, text in self.accepted:
+            pieces.append(content[last:start])
+            pieces.append(text)
+            last = end
+        pieces.append(content[last:])
+        return ''.join(pieces)
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Add the missing width/height attributes to img tags.
+
+An img without dimensions reserves no space until its file arrives, so
+the layout shifts under the reader. The `< width="768" height="512"
+loading="lazy">` fragments the repair rules delete are what is left of
+the attributes the pages were meant to carry.
+
+image_size() reads the intrinsic size of a JPEG, PNG, WebP or GIF from
+its header (the PNG IHDR chunk, the JPEG SOFn segment, the WebP
+VP8/VP8L/VP8X chunk) without decoding any pixels; a JPEG is walked
+segment by segment with seeks. Sizes are cached in
+.repair-cache/image-dimensions-manifest.json next to each asset's
+content hash: an asset whose size and mtime are unchanged
+is not opened again, and a new or changed file whose bytes match a
+known hash reuses that size.
+
+Every img whose src resolves to a site asset gets the size it lacks;
+when only one of the two is present the other is derived from the
+intrinsic aspect ratio. Tags whose declared ratio disagrees with the
+file are reported, not rewritten.
+
+    python image_dimensions.py             # add missing width/height
+    python image_dimensions.py --diff      # write nothing, print a patch
+"""
+
+import argparse
+import os
+import struct
+import sys
+import time
+from collections import namedtuple
+from functools import partial
+
+from asset_index import ASSET_DIRS
+from asset_refs import resolve_reference, served_path
+from atomic_write import write_atomic
+from discovery import add_discovery_arguments, discover, scan
+from html_tokenizer import START_TAG, EditList, LineIndex, attributes, tokenize
+from manifest import Manifest, content_hash, manifest_path, source_version
+from parallel_runner import add_runner_arguments, run_parallel
+from repair_diff import unified_diff
+
+PROBE_VERSION = source_version(__file__)
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+# Declared and intrinsic aspect ratios further apart than this are reported
+RATIO_TOLERANCE = 0.02
+
+# JPEG start-of-frame markers (SOF0-SOF15 minus DHT, JPG and DAC)
+SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers that stand alone, without a length field
+STANDALONE_MARKERS = frozenset(range(0xD0, 0xDA)) | {0x01}
+
+ImageInfo = namedtuple('ImageInfo', 'path width height bytes sha256')
+
+
+def _jpeg_size(f):
+    """Walk the JPEG segments after SOI up to the first SOFn."""
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b'\xff':
+            continue
+        marker = f.read(1)
+        while marker == b'\xff':  # fill bytes
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code in STANDALONE_MARKERS or code == 0x00:
+            continue
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        if code in SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+        f.seek(struct.unpack('>H', length)[0] - 2, os.SEEK_CUR)
+
+
+def _webp_size(header):
+    """Parse the first chunk of a RIFF/WEBP header (30 bytes)."""
+    chunk = header[12:16]
+    if chunk == b'VP8X':
+        width = int.from_bytes(header[24:27], 'little') + 1
+        height = int.from_bytes(header[27:30], 'little') + 1
+        return width, height
+    if chunk == b'VP8L' and header[20:21] == b'\x2f':
+        bits = int.from_bytes(header[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8 ' and header[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    return None
+
+
+def image_size(f):
+    """
+    Return (width, height) of the image in the binary file object f,
+    reading only its header, or None if the format is not recognised.
+    """
+    header = f.read(30)
+    if header.startswith(b'\x89PNG\r\n\x1a\n') and header[12:16] == b'IHDR':
+        return struct.unpack('>II', header[16:24])
+    if header.startswith(b'\xff\xd8'):
+        f.seek(2)
+        return _jpeg_size(f)
+    if header.startswith(b'RIFF') and header[8:12] == b'WEBP':
+        return _webp_size(header)
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return struct.unpack('<HH', header[6:10])
+    return None
+
+
+def probe_file(path):
+    """Return ([width, height] or None, sha256) for one image file."""
+    with open(path, 'rb') as f:
+        size = image_size(f)
+        f.seek(0)
+        sha256 = content_hash(f.read())
+    return (list(size) if size else None), sha256
+
+
+def probe_assets(root):
+    """
+    Return ({served path: ImageInfo}, number of files read) for every
+    image under the asset directories. Only files the manifest has not
+    seen with their current size and mtime are opened.
+    """
+    manifest = Manifest(manifest_path(root, 'image-dimensions'), PROBE_VERSION)
+    files = []
+    for asset_dir in ASSET_DIRS:
+        for f in scan(os.path.join(root, asset_dir), IMAGE_SUFFIXES):
+            files.append((os.path.join(asset_dir, f.rel_path), f))
+    manifest.prune(rel_path for rel_path, _ in files)
+    by_hash = {entry['sha256']: entry['result'] for entry in manifest.entries.values()
+               if entry['rules_version'] == PROBE_VERSION}
+
+    images = {}
+    probed = 0
+    for rel_path, f in files:
+        entry = manifest.lookup(rel_path, f.size, f.mtime_ns)
+        if entry:
+            size, sha256 = entry['result'], entry['sha256']
+        else:
+            try:
+                size, sha256 = probe_file(f.path)
+            except OSError as e:
+                print(f"✗ {rel_path}: {e}", file=sys.stderr)
+                continue
+            probed += 1
+            # A copy of a known image keeps the size already recorded for it
+            size = by_hash.setdefault(sha256, size)
+            manifest.record(rel_path, f.size, f.mtime_ns, sha256, size)
+        if size:
+            # Assets/ wins over public/Assets/ for the same served path
+            images.setdefault('Assets/' + f.rel_path.replace(os.sep, '/'),
+                              ImageInfo(f.path, size[0], size[1], f.size, sha256))
+    manifest.save()
+    return images, probed
+
+
+def image_sizes(images):
+    """Reduce probe_assets() results to {served path: (width, height)}."""
+    return {asset: (info.width, info.height) for asset, info in images.items()}
+
+
+def _int_attribute(value):
+    """Return a width/height attribute as an int, or None if not plain pixels."""
+    if value is None:
+        return None
+    value = value.strip()
+    if value.endswith('px'):
+        value = value[:-2]
+    return int(value) if value.isdigit() and int(value) > 0 else None
+
+
+def attribute_insert_pos(content, token):
+    """Offset just after the last attribute of a closed tag (before any '/>')."""
+    pos = token.end - 1
+    while pos > token.start and content[pos - 1].isspace():
+        pos -= 1
+    if content[pos - 1] == '/' and content[pos - 2].isspace():
+        pos -= 1
+        while content[pos - 1].isspace():
+            pos -= 1
+    return pos
+
+
+def add_dimensions(content, rel_path, sizes):
+    """
+    Record the missing width/height of every img in a page.
+
+    Returns (EditList, mismatches) where mismatches lists (offset, src,
+    declared, intrinsic) for tags whose declared aspect ratio is off.
+    """
+    edits = EditList()
+    mismatches = []
+    page = served_path(rel_path)
+    for token in tokenize(content):
+        if token.kind != START_TAG or token.name != 'img' or not token.closed:
+            continue
+        attrs = {}
+        for attr in attributes(token):
+            attrs.setdefault(attr.name, attr.value)
+        src = attrs.get('src')
+        size = sizes.get(resolve_reference(src, page)) if src else None
+        if not size:
+            continue
+        w, h = size
+        if 'width' not in attrs and 'height' not in attrs:
+            added = f' width="{w}" height="{h}"'
+        elif 'height' not in attrs and _int_attribute(attrs['width']):
+            added = f' height="{round(_int_attribute(attrs["width"]) * h / w)}"'
+        elif 'width' not in attrs and _int_attribute(attrs['height']):
+            added = f' width="{round(_int_attribute(attrs["height"]) * w / h)}"'
+        else:
+            width, height = _int_attribute(attrs.get('width')), _int_attribute(attrs.get('height'))
+            if width and height and abs(width / height - w / h) > RATIO_TOLERANCE * w / h:
+                mismatches.append((token.start, src, (width, height), size))
+            continue
+        edits.insert(attribute_insert_pos(content, token), added)
+    return edits, mismatches
+
+
+def process_page(site_file, sizes, dry_run=False):
+    """
+    Add missing dimensions to one page; return (added, mismatches, diff).
+    The page is rewritten unless dry_run, in which case diff holds the
+    unified diff of the change.
+    """
+    with open(site_file.path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    edits, mismatches = add_dimensions(content, site_file.rel_path, sizes)
+    diff = None
+    if edits:
+        updated = edits.apply(content)
+        if dry_run:
+            diff = unified_diff(content, updated, [edits], site_file.rel_path.replace(os.sep, '/'))
+        else:
+            write_atomic(site_file.path, updated)
+    if mismatches:
+        lines = LineIndex(content)
+        mismatches = [(lines.position(offset)[0], src, declared, size)
+                      for offset, src, declared, size in mismatches]
+    return len(edits), mismatches, diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_discovery_arguments(parser)
+    parser.add_argument('--diff', action='store_true',
+                        help='write nothing; print a unified diff of the changes')
+    parser.add_argument('--mismatches', action='store_true',
+                        help='list tags whose width/height disagree with the image')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+    log = sys.stderr if args.diff else sys.stdout
+
+    root = os.path.abspath(args.root)
+    start = time.perf_counter()
+    images, probed = probe_assets(root)
+    sizes = image_sizes(images)
+    print(f"Image sizes: {len(sizes)} assets ({probed} probed) "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms", file=log)
+
+    pages = discover(args)
+    updated = []
+    added_total = 0
+    mismatched = []
+    errors = []
+    results = run_parallel(partial(process_page, sizes=sizes, dry_run=args.diff),
+                           pages, args.workers, args.chunksize)
+    for f, error, result in results:
+        if error:
+            errors.append(f"{f.rel_path}: {error}")
+            continue
+        added, mismatches, diff = result
+        if added:
+            updated.append(f.rel_path)
+            added_total += added
+            if diff:
+                sys.stdout.write(diff)
+        mismatched.extend((f.rel_path, *m) for m in mismatches)
+
+    verb = 'Would add' if args.diff else '✅ Added'
+    print(f"\n{verb} dimensions to {added_total} img tags in {len(updated)} files", file=log)
+    if not args.diff:
+        for rel_path in updated:
+            print(f"  {rel_path}")
+
+    if mismatched:
+        print(f"\n⚠ {len(mismatched)} img tags declare a different aspect ratio than their image",
+              file=log)
+        if args.mismatches:
+            for rel_path, line, src, (width, height), (w, h) in mismatched:
+                print(f"  {rel_path}:{line}: {src} is {w}x{h}, declared {width}x{height}", file=log)
+
+    if errors:
+        print(f"\n❌ Errors ({len(errors)}):", file=log)
+        for e in errors:
+            print(f"  {e}", file=log)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Render the product × city landing pages from one compiled template.
+
+The landing pages used to be made by copying a source page and running
+text substitutions over the copy for every combination, and the H1s that
+came out wrong were patched afterwards (fix-h1-location-pages.py). Here
+seo-generator/template.html, or the page named by a product's
+"template" key, is compiled once: the title, meta description, canonical
+and Open Graph tags and the H1 become fields unless the template already
+spells them with {{PLACEHOLDERS}}, relative URLs are rebased for pages two
+levels deep, and the text is split into literal chunks around its fields.
+Rendering a page is then a single join.
+
+The matrix lives in seo-generator/landing-pages.json. Each page goes to
+<product slug>/<city slug>/index.html and is recorded in
+.repair-cache/landing-pages-manifest.json with a hash of its inputs
+(template bytes, product record, city record, base URL). A page whose
+inputs and output file are unchanged is not rendered again; pages are
+rendered on the shared process pool.
+
+    python landing_pages.py
+    python landing_pages.py --force          # re-render everything
+    python landing_pages.py --prune          # also delete dropped pages
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+from collections import namedtuple
+
+from atomic_write import write_if_changed
+from discovery import ROOT
+from html_tokenizer import EditList
+from manifest import Manifest, content_hash, manifest_path, source_version
+from parallel_runner import add_runner_arguments, run_parallel
+
+RENDERER_VERSION = source_version(__file__)
+DEFAULT_MATRIX = os.path.join('seo-generator', 'landing-pages.json')
+# Generated pages live at /<product>/<city>/index.html
+PAGE_DEPTH = 2
+DEFAULT_DESCRIPTION = ('Fabricante e instalador de {product} en {city}, Costa del Sol. '
+                       'Soluciones a medida de alta resistencia para disfrutar de tu terraza todo el año.')
+
+field_pattern = re.compile(r'\{\{\s*([A-Z][A-Z0-9_]*)\s*\}\}')
+# Spans of a plain page that become fields when compiled: (field, pattern
+# whose group 1 is the span)
+SLOTS = (
+    ('TITLE', re.compile(r'<title>(.*?)</title>', re.DOTALL)),
+    ('DESCRIPTION', re.compile(r'<meta\s+name="description"\s+content="([^"]*)"')),
+    ('CANONICAL', re.compile(r'<link\s+rel="canonical"\s+href="([^"]*)"')),
+    ('TITLE', re.compile(r'<meta\s+property="og:title"\s+content="([^"]*)"')),
+    ('DESCRIPTION', re.compile(r'<meta\s+property="og:description"\s+content="([^"]*)"')),
+    ('CANONICAL', re.compile(r'<meta\s+property="og:url"\s+content="([^"]*)"')),
+    ('H1', re.compile(r'<h1(?:\s[^>]*)?>(.*?)</h1>', re.DOTALL)),
+)
+FIELDS = frozenset({'PRODUCT', 'CITY', 'PRODUCT_SLUG', 'CITY_SLUG',
+                    'TITLE', 'DESCRIPTION', 'CANONICAL', 'H1'})
+# A relative href/src: not absolute, not a fragment, not a scheme, not a field
+relative_url_pattern = re.compile(r'''\b(href|src)=(["'])(?!/|#|[A-Za-z][A-Za-z0-9+.-]*:|\{\{)(?:\./)?''')
+
+RenderTask = namedtuple('RenderTask', 'rel_path path template fields key')
+
+
+class Template:
+    """A page split into literal chunks around its {{FIELD}} names."""
+
+    def __init__(self, text, depth=PAGE_DEPTH):
+        self.sha256 = content_hash(text.encode('utf-8'))
+        edits = EditList()
+        for field, pattern in SLOTS:
+            m = pattern.search(text)
+            if m and '{{' not in m.group(1):
+                edits.replace(m.start(1), m.end(1), '{{%s}}' % field)
+        text = edits.apply(text)
+        if depth:
+            text = relative_url_pattern.sub(lambda m: f'{m.group(1)}={m.group(2)}' + '../' * depth, text)
+        self.text = text
+        pieces = field_pattern.split(text)
+        self.literals = pieces[0::2]
+        self.fields = pieces[1::2]
+
+    def unknown_fields(self):
+        return sorted(set(self.fields) - FIELDS)
+
+    def render(self, values):
+        """Return the page with every field replaced by values[field]."""
+        out = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            out.append(values[field])
+            out.append(literal)
+        return ''.join(out)
+
+
+def page_fields(product, city, base_url):
+    """Return the escaped field values of one product × city page."""
+    name = html.escape(product['name'])
+    city_name = html.escape(city['name'])
+    description = product.get('description', DEFAULT_DESCRIPTION)
+    return {
+        'PRODUCT': name,
+        'CITY': city_name,
+        'PRODUCT_SLUG': product['slug'],
+        'CITY_SLUG': city['slug'],
+        'TITLE': f'{name} en {city_name} | CostaGlass',
+        'DESCRIPTION': html.escape(description.format(product=product['name'].lower(), city=city['name'])),
+        'CANONICAL': f"{base_url.rstrip('/')}/{product['slug']}/{city['slug']}/",
+        'H1': f'{name} <span class="hero-accent">en {city_name}</span>',
+    }
+
+
+def input_key(template, product, city, base_url):
+    """Hash of everything a page is rendered from."""
+    digest = hashlib.sha256()
+    for part in (RENDERER_VERSION, template.sha256, base_url,
+                 json.dumps(product, sort_keys=True), json.dumps(city, sort_keys=True)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
+
+
+def render_page(task):
+    """Render and write one page; return (changed, sha256, size, mtime_ns)."""
+    data = task.template.render(task.fields).encode('utf-8')
+    os.makedirs(os.path.dirname(task.path), exist_ok=True)
+    changed = write_if_changed(task.path, data)
+    st = os.stat(task.path)
+    return changed, content_hash(data), st.st_size, st.st_mtime_ns
+
+
+def load_matrix(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--root', default=str(ROOT), help='site root the pages are written under')
+    parser.add_argument('--matrix', help=f'products/cities JSON (default <root>/{DEFAULT_MATRIX})')
+    parser.add_argument('--force', action='store_true', help='re-render pages whose inputs are unchanged')
+    parser.add_argument('--prune', action='store_true',
+                        help='delete generated pages that are no longer in the matrix')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    matrix = load_matrix(args.matrix or os.path.join(root, DEFAULT_MATRIX))
+    base_url = matrix.get('base_url', '')
+
+    templates = {}
+    for product in matrix['products']:
+        source = product.get('template', matrix['template'])
+        if source in templates:
+            continue
+        with open(os.path.join(root, source), 'r', encoding='utf-8') as f:
+            templates[source] = template = Template(f.read())
+        unknown = template.unknown_fields()
+        if unknown:
+            print(f"❌ {source}: unknown field(s) {', '.join(unknown)}")
+            sys.exit(1)
+
+    manifest = Manifest(manifest_path(root, 'landing-pages'), RENDERER_VERSION)
+    tasks = []
+    expected = set()
+    skipped = 0
+    for product in matrix['products']:
+        template = templates[product.get('template', matrix['template'])]
+        for city in matrix['cities']:
+            rel_path = os.path.join(product['slug'], city['slug'], 'index.html')
+            path = os.path.join(root, rel_path)
+            expected.add(rel_path)
+            key = input_key(template, product, city, base_url)
+            if not args.force:
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    st = None
+                entry = st and manifest.lookup(rel_path, st.st_size, st.st_mtime_ns)
+                if entry and entry['result'] == key:
+                    skipped += 1
+                    continue
+            tasks.append(RenderTask(rel_path, path, template,
+                                    page_fields(product, city, base_url), key))
+
+    print(f"{len(matrix['products'])} products × {len(matrix['cities'])} cities: "
+          f"{len(tasks)} to render, {skipped} unchanged")
+
+    written = 0
+    errors = []
+    for task, error, result in run_parallel(render_page, tasks, args.workers, args.chunksize):
+        if error:
+            errors.append(f"{task.rel_path}: {error}")
+            continue
+        changed, sha256, size, mtime_ns = result
+        manifest.record(task.rel_path, size, mtime_ns, sha256, task.key)
+        if changed:
+            written += 1
+            print(f"✓ {task.rel_path}")
+
+    stale = sorted(rel for rel in manifest.entries if rel not in expected)
+    if stale:
+        if args.prune:
+            for rel_path in stale:
+                try:
+                    os.unlink(os.path.join(root, rel_path))
+                except FileNotFoundError:
+                    pass
+            print(f"✓ Deleted {len(stale)} page(s) no longer in the matrix")
+        else:
+            print(f"⚠ {len(stale)} generated page(s) no longer in the matrix (--prune deletes them)")
+    if args.prune or not stale:
+        manifest.prune(expected)
+    manifest.save()
+
+    print(f"\n✅ Wrote {written} page(s), {len(tasks) - written - len(errors)} already up to date")
+    if errors:
+        print(f"\n❌ Errors ({len(errors)}):")
+        for e in errors:
+            print(f"  {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Add loading="lazy" and decoding="async" to below-the-fold images.
+
+Python port of add-lazy-loading.js. The JS version decided whether an img
+was in a hero section by calling lastIndexOf('<div'), ('<section'), ...
+on the whole page prefix for every img (quadratic in page size), looked
+only at the nearest opening tag, and spliced its attribute in with a
+regex over `<img\\s+([^>]*?)>`, which on a tag already cut short by the
+corruption writes ` loading="lazy">` into the middle of the next tag.
+
+Here the page is tokenized once (html_tokenizer) while a stack of open
+elements carries a hero flag down from every ancestor whose class or id
+matches HERO_SELECTORS. Hero images (and images that match a selector
+themselves, like the nav and footer logos and the language flags) stay
+eager: a loading="lazy" on them is switched to eager. Every other img
+without a loading attribute gets loading="lazy", plus decoding="async"
+when it has no decoding attribute. Only complete img start tags are
+edited, and each rewritten tag is re-scanned before the edit is kept.
+
+    python lazy_loading.py             # rewrite pages
+    python lazy_loading.py --diff      # write nothing, print a patch
+"""
+
+import argparse
+import os
+import sys
+from functools import partial
+
+from atomic_write import write_atomic
+from discovery import add_discovery_arguments, discover
+from html_tokenizer import (END_TAG, START_TAG, VOID_ELEMENTS, EditList, attributes, markup_pattern,
+                            scan_tag, tokenize)
+from image_dimensions import attribute_insert_pos
+from parallel_runner import add_runner_arguments, run_parallel
+from repair_diff import unified_diff
+
+# Classes/IDs that indicate above-the-fold/hero sections. add-lazy-loading.js
+# also listed 'header' but never checked it; matched on class segments it
+# would make every section-header and blog-header image eager.
+HERO_SELECTORS = (
+    'hero',
+    'hero-slide',
+    'banner',
+    'nav-logo',
+    'langToggle',
+    'currentFlag',
+    'lang-option',
+    'footer-logo',
+    'lang-flag',
+)
+
+
+def matches_hero(token, selectors=HERO_SELECTORS):
+    """
+    True if a start tag's id or one of its classes matches a hero
+    selector. Classes match on whole dash-separated segments, so 'hero'
+    covers page-hero-bg and hero-slide but not heron.
+    """
+    words = []
+    for attr in attributes(token):
+        if attr.name == 'class' and attr.value:
+            words.extend(attr.value.split())
+        elif attr.name == 'id' and attr.value:
+            words.append(attr.value)
+    for word in words:
+        dashed = f'-{word}-'
+        for selector in selectors:
+            if f'-{selector}-' in dashed:
+                return True
+    return False
+
+
+def is_wellformed_tag(tag):
+    """True if tag scans as one complete start tag."""
+    end, closed = scan_tag(tag, markup_pattern.match(tag).end(), len(tag))
+    return closed and end == len(tag)
+
+
+def lazy_load_edits(content):
+    """
+    Record the loading/decoding edits for one page in a single pass.
+
+    Returns (EditList, lazy count, eager count): how many img tags were
+    made lazy and how many hero images had loading="lazy" removed.
+    """
+    edits = EditList()
+    lazy = eager = 0
+    stack = []  # (element name, inside a hero section)
+    for token in tokenize(content):
+        if token.kind == END_TAG:
+            # Pop back to the matching element; stray end tags are ignored
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i][0] == token.name:
+                    del stack[i:]
+                    break
+            continue
+        if token.kind != START_TAG or not token.closed:
+            continue
+
+        in_hero = bool(stack) and stack[-1][1]
+        if token.name != 'img':
+            if token.name not in VOID_ELEMENTS and not token.text.endswith('/>'):
+                stack.append((token.name, in_hero or matches_hero(token)))
+            continue
+
+        attrs = {}
+        for attr in attributes(token):
+            attrs.setdefault(attr.name, attr)
+        loading = attrs.get('loading')
+        if in_hero or matches_hero(token):
+            if loading is not None and (loading.value or '').lower() == 'lazy':
+                edits.replace(loading.start, loading.end, 'loading="eager"')
+                eager += 1
+            continue
+        if loading is not None:
+            continue
+
+        added = ' loading="lazy"'
+        if 'decoding' not in attrs:
+            added += ' decoding="async"'
+        pos = attribute_insert_pos(content, token)
+        rewritten = content[token.start:pos] + added + content[pos:token.end]
+        if is_wellformed_tag(rewritten):
+            edits.insert(pos, added)
+            lazy += 1
+    return edits, lazy, eager
+
+
+def process_page(site_file, dry_run=False):
+    """Apply lazy_load_edits() to one page; return (lazy, eager, diff)."""
+    with open(site_file.path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    edits, lazy, eager = lazy_load_edits(content)
+    diff = None
+    if edits:
+        updated = edits.apply(content)
+        if dry_run:
+            diff = unified_diff(content, updated, [edits], site_file.rel_path.replace(os.sep, '/'))
+        else:
+            write_atomic(site_file.path, updated)
+    return lazy, eager, diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_discovery_arguments(parser)
+    parser.add_argument('--diff', action='store_true',
+                        help='write nothing; print a unified diff of the changes')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+    log = sys.stderr if args.diff else sys.stdout
+
+    print('🖼️  Adding lazy loading to images...\n', file=log)
+    pages = discover(args)
+    modified = []
+    total_lazy = total_eager = 0
+    errors = []
+    for f, error, result in run_parallel(partial(process_page, dry_run=args.diff),
+                                         pages, args.workers, args.chunksize):
+        if error:
+            errors.append(f"{f.rel_path}: {error}")
+            continue
+        lazy, eager, diff = result
+        if lazy or eager:
+            modified.append(f.rel_path)
+            total_lazy += lazy
+            total_eager += eager
+            if diff:
+                sys.stdout.write(diff)
+            else:
+                print(f"✅ {f.rel_path} ({lazy} lazy, {eager} made eager)")
+
+    verb = 'Would modify' if args.diff else '✨ Complete! Modified'
+    print(f"\n{verb} {len(modified)} of {len(pages)} file(s): "
+          f"{total_lazy} images lazy, {total_eager} hero images made eager", file=log)
+
+    if errors:
+        print(f"\n⚠️  {len(errors)} error(s) occurred:", file=log)
+        for e in errors:
+            print(f"   - {e}", file=log)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Internal link graph and broken-link checker for the generated site.
+
+fix-paths.py repaired links with 15 hardcoded href replacements and a
+fixed '../' prefix, so a new page or a deeper route broke silently. Here
+every page is tokenized once and the href of every <a> and <area> is
+resolved against the page's served location (public/ is served from the
+site root, as in asset_refs.py). A RouteIndex built from one scan of the
+site answers whether a path is served, trying the file itself, the
+directory's index.html and the extensionless .html page.
+
+The report lists:
+  - broken links, with the page they most likely meant: the longest tail
+    of the broken path that is a route, i.e. a link written for a page
+    at another depth;
+  - redirect-worthy paths, the broken paths that have such a match and
+    what they should redirect to;
+  - orphan pages that no other page links to.
+
+--fix rewrites each broken link that has a match to the depth-relative
+form of its target (`../blog/`, `./`, `../../contact.html`) while the
+page is being scanned; --diff shows those edits as a patch instead.
+
+    python link_graph.py
+    python link_graph.py --fix
+"""
+
+import argparse
+import html
+import os
+import posixpath
+import sys
+import time
+from collections import namedtuple
+from functools import partial
+
+from asset_refs import resolve_reference, served_path
+from atomic_write import write_atomic
+from discovery import DEFAULT_IGNORES, add_discovery_arguments, discover, is_page, scan
+from html_tokenizer import START_TAG, EditList, attributes, tokenize
+from parallel_runner import add_runner_arguments, run_parallel
+from repair_diff import unified_diff
+
+LINK_ELEMENTS = ('a', 'area')
+# A home link as the old templates wrote it, whatever the page's depth
+HOME_INDEX_HREFS = ('index.html', './index.html')
+# Pages nothing is expected to link to
+ENTRY_PAGES = frozenset({'index.html', '404.html'})
+
+# target is the served page or file the href reaches, None if broken;
+# suggestion is the route a broken href most likely meant
+Link = namedtuple('Link', 'href target suggestion')
+
+
+def page_slug(path):
+    """Return the name a page is known by: x for x.html, x/ and x/index.html."""
+    if path.endswith('/index.html'):
+        path = path[:-len('/index.html')]
+    elif path.endswith('.html'):
+        path = path[:-len('.html')]
+    return path.rstrip('/').rsplit('/', 1)[-1]
+
+
+class RouteIndex:
+    """The site's served paths, and which page each URL path serves."""
+
+    def __init__(self, files):
+        self.files = set()
+        self.pages = set()
+        self.slugs = {}
+        for f in files:
+            path = served_path(f.rel_path)
+            self.files.add(path)
+            if path.endswith('.html'):
+                self.pages.add(path)
+                slug = page_slug(path)
+                known = self.slugs.get(slug, path)
+                # None marks a slug shared by more than one page
+                self.slugs[slug] = path if known == path else None
+
+    def page_for(self, path):
+        """Return the served file a normalised site path reaches, or None."""
+        if path in ('', '.'):
+            return 'index.html' if 'index.html' in self.files else None
+        if path.startswith('../') or path == '..':
+            return None
+        for candidate in (path, f'{path}/index.html', f'{path}.html'):
+            if candidate in self.files:
+                return candidate
+        return None
+
+    def suggest(self, path):
+        """
+        Return the route a broken path most likely meant: its longest tail
+        (after dropping any leading ../) that is served, as written or
+        as x/ for an x.html that moved into a directory. Failing that, the
+        one page anywhere with the same slug (file or directory name).
+        """
+        parts = [p for p in path.split('/') if p not in ('', '..')]
+        for i in range(len(parts)):
+            tail = '/'.join(parts[i:])
+            target = self.page_for(tail)
+            if target is None and tail.endswith('.html'):
+                target = self.page_for(tail[:-len('.html')])
+            if target:
+                return target
+        return self.slugs.get(page_slug(path)) if parts else None
+
+
+def relative_href(target, page):
+    """
+    Return the depth-relative href from one served page to a served
+    target: a directory index becomes `dir/`, the site root `./` or `../`.
+    """
+    if target == 'index.html' or target.endswith('/index.html'):
+        directory = posixpath.dirname(target) or '.'
+        rel = posixpath.relpath(directory, posixpath.dirname(page) or '.')
+        return './' if rel == '.' else rel + '/'
+    return posixpath.relpath(target, posixpath.dirname(page) or '.')
+
+
+def scan_links(content, rel_path, routes, fix=False, index_is_home=True):
+    """
+    Resolve every internal link of one page in a single token pass.
+
+    Returns (links, EditList); with fix=True the EditList rewrites each
+    broken link that has a suggestion, keeping any ?query and #fragment.
+    A bare href="index.html" on a page below the root was written for
+    the home page (what fix-paths.py turned into '../'), so it counts as
+    broken with the home page as its suggestion rather than as a link to
+    the page itself (unless index_is_home is False).
+    """
+    page = served_path(rel_path)
+    index_is_home = index_is_home and '/' in page
+    links = []
+    edits = EditList()
+    for token in tokenize(content):
+        if token.kind != START_TAG or token.name not in LINK_ELEMENTS:
+            continue
+        href = next((a for a in attributes(token) if a.name == 'href'), None)
+        if href is None or not href.value:
+            continue
+        value = html.unescape(href.value)
+        path = resolve_reference(value, page)
+        if path is None:
+            continue  # external, mailto:, #fragment or template
+        cut = min((i for i in (value.find('?'), value.find('#')) if i != -1), default=len(value))
+        if index_is_home and value[:cut] in HOME_INDEX_HREFS and 'index.html' in routes.files:
+            target, suggestion = None, 'index.html'
+        else:
+            target = routes.page_for(path)
+            suggestion = routes.suggest(path) if target is None else None
+        links.append(Link(value, target, suggestion))
+        if fix and suggestion:
+            new_href = relative_href(suggestion, page) + value[cut:]
+            edits.replace(href.start, href.end, f'href="{html.escape(new_href)}"')
+    return links, edits
+
+
+def process_page(site_file, routes, fix=False, dry_run=False):
+    """Scan (and with fix, rewrite) one page; return (links, fixes, diff)."""
+    with open(site_file.path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    links, edits = scan_links(content, site_file.rel_path, routes, fix)
+    diff = None
+    if edits:
+        updated = edits.apply(content)
+        if dry_run:
+            diff = unified_diff(content, updated, [edits], site_file.rel_path.replace(os.sep, '/'))
+        else:
+            write_atomic(site_file.path, updated)
+    return links, len(edits), diff
+
+
+def build_routes(root, ignore=DEFAULT_IGNORES):
+    """Return the RouteIndex of every file served from the site at root."""
+    return RouteIndex(scan(root, suffixes=None, ignore=ignore))
+
+
+def find_orphans(graph, routes):
+    """Served pages that no other page links to."""
+    linked = {target for page, targets in graph.items() for target in targets if target != page}
+    return sorted(p for p in routes.pages
+                  if p not in linked and p not in ENTRY_PAGES and is_page(p))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_discovery_arguments(parser)
+    parser.add_argument('--fix', action='store_true',
+                        help='rewrite broken links that have a match to their depth-relative form')
+    parser.add_argument('--diff', action='store_true',
+                        help='write nothing; print the --fix edits as a unified diff')
+    parser.add_argument('--orphans', action='store_true', help='list every orphan page')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+    log = sys.stderr if args.diff else sys.stdout
+
+    start = time.perf_counter()
+    root = os.path.abspath(args.root)
+    routes = build_routes(root, DEFAULT_IGNORES | set(args.ignore))
+    pages = discover(args)
+
+    graph = {}
+    broken = []
+    redirects = {}
+    fixed = 0
+    errors = []
+    results = run_parallel(partial(process_page, routes=routes, fix=args.fix or args.diff,
+                                   dry_run=args.diff),
+                           pages, args.workers, args.chunksize)
+    for f, error, result in results:
+        if error:
+            errors.append(f"{f.rel_path}: {error}")
+            continue
+        links, fixes, diff = result
+        fixed += fixes
+        if diff:
+            sys.stdout.write(diff)
+        page = served_path(f.rel_path)
+        targets = graph.setdefault(page, set())
+        for link in links:
+            if link.target:
+                targets.add(link.target)
+                continue
+            broken.append((f.rel_path, link))
+            if link.suggestion:
+                old = resolve_reference(link.href, page)
+                redirects.setdefault((old, link.suggestion), 0)
+                redirects[(old, link.suggestion)] += 1
+
+    edges = sum(len(t) for t in graph.values())
+    print(f"Link graph: {len(graph)} pages, {edges} internal edges, {len(routes.files)} routes "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms", file=log)
+
+    if broken:
+        print(f"\n❌ Broken links ({len(broken)}):", file=log)
+        for rel_path, link in broken:
+            hint = f" -> {relative_href(link.suggestion, served_path(rel_path))}" if link.suggestion else ''
+            print(f"  {rel_path}: {link.href}{hint}", file=log)
+    else:
+        print("\n✓ No broken links", file=log)
+
+    if redirects:
+        print(f"\n↪ Redirect-worthy paths ({len(redirects)}):", file=log)
+        for (old, new), count in sorted(redirects.items()):
+            print(f"  /{old} -> /{new} ({count} link(s))", file=log)
+
+    orphans = find_orphans(graph, routes)
+    if orphans:
+        print(f"\n⚠ {len(orphans)} orphan page(s) with no inbound links", file=log)
+        if args.orphans:
+            for page in orphans:
+                print(f"  {page}", file=log)
+
+    if args.fix or args.diff:
+        verb = 'Would fix' if args.diff else '✅ Fixed'
+        print(f"\n{verb} {fixed} link(s)", file=log)
+
+    if errors:
+        print(f"\n❌ Errors ({len(errors)}):", file=log)
+        for e in errors:
+            print(f"  {e}", file=log)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Content-hash manifest for incremental repair and check runs.
+
+For every page we remember its size, mtime, content hash, the version of
+the rule set that processed it and the verdict. On the next run a page
+whose size and mtime are unchanged is skipped after a single stat(); a
+page that was touched but not modified is recognised by its hash. Any
+change to the rule set changes its version and invalidates every entry.
+"""
+
+import hashlib
+import json
+import os
+
+from atomic_write import write_atomic
+
+CACHE_DIR = '.repair-cache'
+MANIFEST_FORMAT = 1
+
+
+def content_hash(data):
+    """Return the hex sha256 of a bytes object."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def source_version(*paths):
+    """Version a rule set by hashing the source files that define it."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def manifest_path(root, tool):
+    """Return where `tool` keeps its manifest for the site at root."""
+    return os.path.join(root, CACHE_DIR, f'{tool}-manifest.json')
+
+
+class Manifest:
+    """
+    Per-tool record of the files already processed by a given rule set.
+
+    Entries are keyed by path relative to the site root and hold
+    size, mtime_ns, sha256, rules_version and result.
+    """
+
+    def __init__(self, path, rules_version):
+        self.path = path
+        self.rules_version = rules_version
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == MANIFEST_FORMAT:
+                self.entries = data.get('files', {})
+        except (OSError, ValueError):
+            pass
+
+    def lookup(self, rel_path, size, mtime_ns):
+        """
+        Return the recorded entry if the file is unchanged since it was
+        processed by the current rule set, judged by size and mtime alone.
+        """
+        entry = self.entries.get(rel_path)
+        if (entry
+                and entry['rules_version'] == self.rules_version
+                and entry['size'] == size
+                and entry['mtime_ns'] == mtime_ns):
+            return entry
+        return None
+
+    def known_hash(self, rel_path):
+        """
+        Return the hash recorded for a file by the current rule set, so a
+        touched-but-identical file can be recognised after reading it.
+        """
+        entry = self.entries.get(rel_path)
+        if entry and entry['rules_version'] == self.rules_version:
+            return entry['sha256']
+        return None
+
+    def record(self, rel_path, size, mtime_ns, sha256, result):
+        """Remember the verdict for a file in its current state."""
+        self.entries[rel_path] = {
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'sha256': sha256,
+            'rules_version': self.rules_version,
+            'result': result,
+        }
+        self.dirty = True
+
+    def prune(self, rel_paths):
+        """Forget files that no longer exist in the tree."""
+        keep = set(rel_paths)
+        for rel_path in list(self.entries):
+            if rel_path not in keep:
+                del self.entries[rel_path]
+                self.dirty = True
+
+    def save(self):
+        """Write the manifest atomically if anything changed."""
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_atomic(self.path, json.dumps({'format': MANIFEST_FORMAT, 'files': self.entries},
+                                           indent=1, sort_keys=True))
+        self.dirty = False
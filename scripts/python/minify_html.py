@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Minify the HTML pages and write precompressed .gz/.zst sidecars.
+
+The pages are served exactly as the generators and repair scripts leave
+them: deeply indented, with comments, and compressed on the fly at the
+edge or not at all. This stage runs after the repair engine. It walks
+each page once with html_tokenizer and:
+  - collapses every whitespace run in text to one character (a newline
+    if the run had one, else a space), so inline spacing is unchanged;
+  - rewrites start tags with one space between attributes;
+  - drops comments, except conditional comments and with --keep-comments.
+Script, style, textarea and title content, everything inside <pre>, and
+tags the corruption left broken are copied unchanged.
+
+Each page then gets page.html.gz (gzip -9) and, when the zstandard
+module is installed, page.html.zst (level 19) beside it. Minifying and
+compressing run on the shared process pool. A manifest under
+.repair-cache/ skips pages whose size and mtime, or failing that content
+hash, have not changed since they were last processed.
+
+The pages are only rewritten when asked to: one of --output or
+--in-place is required.
+
+    python minify_html.py --output dist-html   # minified copy elsewhere
+    python minify_html.py --in-place           # rewrite the pages themselves
+"""
+
+import argparse
+import gzip
+import os
+import re
+import sys
+from functools import partial
+
+import html_tokenizer
+from atomic_write import write_if_changed
+from discovery import add_discovery_arguments, discover
+from html_tokenizer import COMMENT, END_TAG, START_TAG, TEXT, attributes, tokenize
+from manifest import Manifest, content_hash, manifest_path, source_version
+from parallel_runner import add_runner_arguments, run_parallel
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MINIFIER_VERSION = source_version(__file__, html_tokenizer.__file__)
+GZIP_LEVEL = 9
+ZSTD_LEVEL = 19
+# Elements whose text content is whitespace-significant
+PRESERVE_ELEMENTS = frozenset({'pre', 'textarea'})
+
+# HTML's ASCII whitespace only: \s would also collapse U+00A0 and the
+# other Unicode spaces, which render differently
+whitespace_pattern = re.compile(r'[ \t\n\r\f]+')
+
+
+def _collapse(m):
+    return '\n' if '\n' in m.group() else ' '
+
+
+def minify_tag(token):
+    """
+    Rewrite a complete start tag with single spaces between attributes.
+    A tag whose attributes do not parse cleanly (anything left between
+    them but whitespace and a closing slash) is returned unchanged.
+    """
+    text = token.text
+    attrs = attributes(token)
+    pos = 1 + len(token.name)
+    for attr in attrs:
+        if text[pos:attr.start - token.start].strip():
+            return text
+        pos = attr.end - token.start
+    if text[pos:-1].strip(' \t\r\n\f/'):
+        return text
+    parts = ['<', text[1:1 + len(token.name)]]
+    for attr in attrs:
+        parts.append(' ')
+        parts.append(text[attr.start - token.start:attr.end - token.start])
+    inner = text[:-1].rstrip()
+    last_end = attrs[-1].end - token.start if attrs else 1 + len(token.name)
+    if inner.endswith('/') and len(inner) - 1 >= last_end:
+        parts.append('/')
+    parts.append('>')
+    return ''.join(parts)
+
+
+def minify(content, keep_comments=False):
+    """Return the minified page."""
+    out = []
+    preserve = 0  # depth of open <pre>/<textarea>
+    last_text = False  # out[-1] is collapsed text
+    for token in tokenize(content):
+        kind = token.kind
+        if kind == TEXT and not preserve:
+            text = whitespace_pattern.sub(_collapse, token.text)
+            if last_text and text[:1] in ' \n' and out[-1][-1:] in (' ', '\n'):
+                # Text either side of a dropped comment: one run, not two
+                run = '\n' if '\n' in (text[0], out[-1][-1]) else ' '
+                out[-1] = out[-1][:-1] + run
+                text = text[1:]
+            if text or not last_text:
+                out.append(text)
+            last_text = True
+            continue
+        if kind == COMMENT and not keep_comments and not token.text.startswith(('<!--[if', '<![endif]')):
+            continue  # dropped; text either side still merges
+        last_text = False
+        if kind in (TEXT, COMMENT):
+            out.append(token.text)
+        elif kind == START_TAG and token.closed:
+            if token.name in PRESERVE_ELEMENTS:
+                preserve += 1
+            out.append(minify_tag(token))
+        elif kind == END_TAG:
+            if token.name in PRESERVE_ELEMENTS and preserve:
+                preserve -= 1
+            out.append(f'</{token.text[2:2 + len(token.name)]}>')
+        else:
+            # Declarations, raw script/style text and broken tags, verbatim
+            out.append(token.text)
+    return ''.join(out)
+
+
+def sidecar_paths(path):
+    """The .gz (and, with zstandard, .zst) files written next to path."""
+    paths = [path + '.gz']
+    if zstandard is not None:
+        paths.append(path + '.zst')
+    return paths
+
+
+def minify_file(site_file, output=None, keep_comments=False, known_sha=None):
+    """
+    Minify one page and write it with its sidecars.
+
+    Returns (sizes, sha256, size, mtime_ns): sizes is None when the page's
+    hash matches known_sha, else {'original', 'minified', 'gz'[, 'zst']}
+    in bytes; the rest describe the source file after the run.
+    """
+    with open(site_file.path, 'rb') as f:
+        data = f.read()
+    sha256 = content_hash(data)
+    if sha256 == known_sha:
+        st = os.stat(site_file.path)
+        return None, sha256, st.st_size, st.st_mtime_ns
+
+    minified = minify(data.decode('utf-8'), keep_comments).encode('utf-8')
+    target = site_file.path if output is None else os.path.join(output, site_file.rel_path)
+    if output is not None:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+    write_if_changed(target, minified, original=data if output is None else None)
+
+    sizes = {'original': len(data), 'minified': len(minified)}
+    gz = gzip.compress(minified, compresslevel=GZIP_LEVEL, mtime=0)
+    write_if_changed(target + '.gz', gz)
+    sizes['gz'] = len(gz)
+    if zstandard is not None:
+        zst = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(minified)
+        write_if_changed(target + '.zst', zst)
+        sizes['zst'] = len(zst)
+
+    st = os.stat(site_file.path)
+    if output is None:
+        sha256 = content_hash(minified)
+    return sizes, sha256, st.st_size, st.st_mtime_ns
+
+
+def minify_task(task, output=None, keep_comments=False):
+    """Unpack a (site_file, known_sha) work item for the process pool."""
+    site_file, known_sha = task
+    return minify_file(site_file, output, keep_comments, known_sha)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_discovery_arguments(parser)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--output', metavar='DIR', help='write minified pages and sidecars under DIR')
+    target.add_argument('--in-place', action='store_true',
+                        help='overwrite the pages and write their sidecars beside them')
+    parser.add_argument('--keep-comments', action='store_true', help='keep HTML comments')
+    parser.add_argument('--force', action='store_true', help='reprocess unchanged pages')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    output = os.path.abspath(args.output) if args.output else None
+    ignore = {os.path.basename(output)} if output and output.startswith(root + os.sep) else set()
+    args.ignore.extend(ignore)
+    pages = discover(args)
+
+    settings = f"{MINIFIER_VERSION}-{output or 'in-place'}-{args.keep_comments}-{bool(zstandard)}"
+    manifest = Manifest(manifest_path(root, 'minify'), settings)
+    manifest.prune(f.rel_path for f in pages)
+    pending = []
+    for f in pages:
+        unchanged = not args.force and manifest.lookup(f.rel_path, f.size, f.mtime_ns)
+        target = f.path if output is None else os.path.join(output, f.rel_path)
+        if unchanged and all(os.path.exists(p) for p in sidecar_paths(target)):
+            continue
+        pending.append(f)
+    print(f"Minifying {len(pending)} of {len(pages)} pages"
+          + ("" if zstandard else " (zstandard not installed: .gz only)"))
+
+    totals = {}
+    errors = []
+    tasks = [(f, None if args.force else manifest.known_hash(f.rel_path)) for f in pending]
+    results = run_parallel(partial(minify_task, output=output, keep_comments=args.keep_comments),
+                           tasks, args.workers, args.chunksize)
+    for (f, _), error, result in results:
+        if error:
+            errors.append(f"{f.rel_path}: {error}")
+            continue
+        sizes, sha256, size, mtime_ns = result
+        manifest.record(f.rel_path, size, mtime_ns, sha256, sizes)
+        if sizes is None:
+            continue
+        for key, value in sizes.items():
+            totals[key] = totals.get(key, 0) + value
+        line = f"  {sizes['original'] / 1e3:>8.1f} KB -> {sizes['minified'] / 1e3:>7.1f} KB, gz {sizes['gz'] / 1e3:>6.1f} KB"
+        if 'zst' in sizes:
+            line += f", zst {sizes['zst'] / 1e3:>6.1f} KB"
+        print(f"{line}  {f.rel_path}")
+    manifest.save()
+
+    if totals:
+        summary = (f"\n✅ {totals['original'] / 1e6:.2f} MB -> {totals['minified'] / 1e6:.2f} MB minified "
+                   f"({1 - totals['minified'] / totals['original']:.0%} smaller), "
+                   f"{totals['gz'] / 1e6:.2f} MB gzipped")
+        if 'zst' in totals:
+            summary += f", {totals['zst'] / 1e6:.2f} MB zstd"
+        print(summary)
+    else:
+        print("\n✓ Nothing to do")
+
+    if errors:
+        print(f"\n❌ Errors ({len(errors)}):")
+        for e in errors:
+            print(f"  {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Process-pool runner shared by the repair and verification scripts.
+
+Fans a per-file function out over a configurable number of worker
+processes in chunks, and hands results back in input order so reports
+are deterministic regardless of which worker finished first.
+
+Any existing per-file function can be plugged in unchanged, including the
+ones living in hyphenated scripts that cannot be imported by name:
+
+    python parallel_runner.py fix-footer-glitch.py:fix_footer_corruption --workers 8
+"""
+
+import argparse
+import importlib.util
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+_loaded_scripts = {}
+
+
+class ScriptFunction:
+    """
+    Picklable reference to a function defined in a script file.
+
+    Only the script path and function name travel to the workers; each
+    worker imports the script once on first call and reuses it.
+    """
+
+    def __init__(self, script, name):
+        self.script = str(SCRIPTS_DIR / script)
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        module = _loaded_scripts.get(self.script)
+        if module is None:
+            module_name = Path(self.script).stem.replace('-', '_')
+            spec = importlib.util.spec_from_file_location(module_name, self.script)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _loaded_scripts[self.script] = module
+        return getattr(module, self.name)(*args, **kwargs)
+
+    def __repr__(self):
+        return f"{Path(self.script).name}:{self.name}"
+
+
+def default_workers():
+    """Use every available core unless told otherwise."""
+    return os.cpu_count() or 1
+
+
+def _safe_call(func, item):
+    """Run func(item) and turn an exception into a reportable error string."""
+    try:
+        return None, func(item)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", None
+
+
+def run_parallel(func, items, workers=None, chunksize=None):
+    """
+    Apply func to every item on a process pool.
+
+    Yields (item, error, result) tuples in the order of `items`; error is
+    None on success. workers=1 runs in-process, which keeps tracebacks
+    readable when debugging a single rule.
+    """
+    items = list(items)
+    workers = workers or default_workers()
+    call = partial(_safe_call, func)
+
+    if workers == 1 or len(items) <= 1:
+        for item in items:
+            yield (item,) + call(item)
+        return
+
+    if chunksize is None:
+        # A few chunks per worker balances uneven page sizes without paying
+        # a pickling round-trip per file.
+        chunksize = max(1, len(items) // (workers * 4))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for item, outcome in zip(items, pool.map(call, items, chunksize=chunksize)):
+            yield (item,) + outcome
+
+
+def add_runner_arguments(parser):
+    """Add the --workers/--chunksize options shared by every script."""
+    parser.add_argument('--workers', type=int, default=default_workers(),
+                        help='worker processes (1 runs in-process)')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='files handed to a worker at a time')
+
+
+def main():
+    from discovery import add_discovery_arguments, discover
+
+    parser = argparse.ArgumentParser(description='Run a per-file fix function over every HTML file in parallel.')
+    parser.add_argument('target', help='script.py:function, e.g. fix-footer-glitch.py:fix_footer_corruption')
+    add_discovery_arguments(parser)
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    script, _, name = args.target.partition(':')
+    func = ScriptFunction(script, name)
+    root = os.path.abspath(args.root)
+    html_files = [f.path for f in discover(args)]
+
+    fixed_count = 0
+    errors = []
+    for file_path, error, result in run_parallel(func, html_files, args.workers, args.chunksize):
+        rel_path = os.path.relpath(file_path, root)
+        if error:
+            errors.append(f"{rel_path}: {error}")
+        elif result:
+            fixed_count += 1
+            print(f"✓ Fixed: {rel_path}")
+
+    print(f"\n{'='*60}")
+    print(f"{func}: fixed {fixed_count} of {len(html_files)} files")
+    for e in errors:
+        print(f"✗ Error processing {e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Lint every page against a static performance budget.
+
+Nothing tells us offline which pages are heavy. This reads each page once
+(html_tokenizer) and counts what costs it load time:
+
+- eager_images:        img without loading="lazy" (the hero ones included)
+- missing_dimensions:  img without both width and height (layout shift)
+- blocking_css:        stylesheets linked in <head> without a print or
+                       other non-screen media query
+- blocking_scripts:    external scripts in <head> without async, defer or
+                       type="module"
+- third_party_origins: other origins the page loads from or preconnects
+                       to (flagcdn.com flags, fonts, analytics)
+- asset_kb:            bytes of the local images, stylesheets, scripts and
+                       inline-style url()s the page references, from the
+                       file sizes discovery already stat()ed; assets that
+                       stylesheets pull in themselves are not followed
+
+Each metric is scored against its budget (DEFAULT_BUDGETS, a JSON file
+given with --budgets, or --budget name=value) and pages are listed worst
+first, so a page that grew past its budget fails CI. What a page
+references is kept in a manifest (.repair-cache/perf-budget-manifest.json)
+keyed by size and mtime, so unchanged pages are not re-read; byte totals
+are always recomputed from current asset sizes.
+
+    python perf_budget.py
+    python perf_budget.py --budget eager_images=6 --budget asset_kb=2000
+    python perf_budget.py --budgets perf-budgets.json --json perf-report.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from urllib.parse import urlsplit
+
+import asset_refs
+import html_tokenizer
+from asset_refs import extract_references, resolve_reference, served_path
+from discovery import DEFAULT_IGNORES, add_discovery_arguments, discover, is_page, scan
+from html_tokenizer import END_TAG, RAW_TEXT, START_TAG, attributes, tokenize
+from manifest import Manifest, content_hash, manifest_path, source_version
+from parallel_runner import add_runner_arguments, run_parallel
+
+MEASURE_VERSION = source_version(__file__, asset_refs.__file__, html_tokenizer.__file__)
+
+DEFAULT_BUDGETS = {
+    'eager_images': 6,
+    'missing_dimensions': 0,
+    'blocking_css': 1,
+    'blocking_scripts': 0,
+    'third_party_origins': 3,
+    'asset_kb': 2000,
+}
+# Origins of the site itself, never counted as third parties
+FIRST_PARTY_HOSTS = ('costaglass.com', 'costaglass.es')
+
+# link rel values that make the browser fetch something or open a connection
+FETCHING_RELS = frozenset({'stylesheet', 'preload', 'modulepreload', 'icon', 'shortcut',
+                           'apple-touch-icon', 'manifest', 'preconnect', 'dns-prefetch'})
+# tag -> attributes holding a URL the browser loads
+LOADING_ATTRIBUTES = {
+    'img': ('src', 'srcset'),
+    'source': ('src', 'srcset'),
+    'script': ('src',),
+    'iframe': ('src',),
+    'video': ('src', 'poster'),
+    'audio': ('src',),
+    'embed': ('src',),
+    'track': ('src',),
+}
+NON_BLOCKING_MEDIA = ('print', 'speech')
+
+
+def srcset_urls(value):
+    """The URL of every candidate in a srcset."""
+    return [c.split()[0] for c in value.split(',') if c.strip()]
+
+
+def measure(content, rel_path):
+    """
+    Count one page's budgeted features. Returns a JSON-able dict of the
+    counts plus 'origins' (every absolute origin loaded) and 'refs' (the
+    local site paths whose bytes the page pulls in).
+    """
+    page = served_path(rel_path)
+    counts = {'images': 0, 'lazy_images': 0, 'eager_images': 0, 'missing_dimensions': 0,
+              'blocking_css': 0, 'blocking_scripts': 0}
+    origins = set()
+    refs = set()
+
+    def load(url, counted=True):
+        url = url.strip()
+        if url.startswith(('http://', 'https://', '//')):
+            host = urlsplit(url).hostname
+            if host:
+                origins.add(host)
+            return
+        path = resolve_reference(url, page)
+        if path and counted:
+            refs.add(path)
+
+    in_head = False
+    for token in tokenize(content):
+        if token.kind == END_TAG:
+            if token.name == 'head':
+                in_head = False
+            continue
+        if token.kind == RAW_TEXT:
+            if token.name == 'style':
+                for url in extract_references(token.text):
+                    load(url)
+            continue
+        if token.kind != START_TAG:
+            continue
+        name = token.name
+        if name == 'head':
+            in_head = True
+            continue
+        if name == 'body':
+            in_head = False
+        attrs = {}
+        for attr in attributes(token):
+            attrs.setdefault(attr.name, '' if attr.value is None else attr.value)
+        if 'style' in attrs and 'url(' in attrs['style']:
+            for url in extract_references(attrs['style']):
+                load(url)
+
+        if name == 'link':
+            rels = set(attrs.get('rel', '').lower().split())
+            href = attrs.get('href')
+            if not href or not rels & FETCHING_RELS:
+                continue
+            # preconnect and dns-prefetch open a connection but fetch nothing
+            load(href, counted=not rels <= {'preconnect', 'dns-prefetch'})
+            media = attrs.get('media', 'all').lower()
+            if in_head and 'stylesheet' in rels and not media.startswith(NON_BLOCKING_MEDIA):
+                counts['blocking_css'] += 1
+            continue
+        for attr_name in LOADING_ATTRIBUTES.get(name, ()):
+            value = attrs.get(attr_name)
+            if not value:
+                continue
+            if attr_name == 'srcset':
+                # Only one candidate is fetched; count the bytes of src instead
+                for url in srcset_urls(value):
+                    load(url, counted='src' not in attrs)
+            else:
+                load(value)
+        if name == 'img':
+            counts['images'] += 1
+            if attrs.get('loading', '').lower() == 'lazy':
+                counts['lazy_images'] += 1
+            else:
+                counts['eager_images'] += 1
+            if not (attrs.get('width') and attrs.get('height')):
+                counts['missing_dimensions'] += 1
+        elif name == 'script' and in_head and attrs.get('src'):
+            if not ('async' in attrs or 'defer' in attrs or attrs.get('type') == 'module'):
+                counts['blocking_scripts'] += 1
+
+    counts['origins'] = sorted(origins)
+    counts['refs'] = sorted(refs)
+    return counts
+
+
+def measure_page(site_file):
+    """measure() one discovery SiteFile; returns (facts, sha256)."""
+    with open(site_file.path, 'rb') as f:
+        data = f.read()
+    return measure(data.decode('utf-8', 'replace'), site_file.rel_path), content_hash(data)
+
+
+def served_sizes(root, ignore, cache=False):
+    """
+    Return {served path: bytes} for every file under root; a file at the
+    root wins over the public/ copy served at the same path.
+    """
+    sizes = {}
+    files = scan(root, None, ignore, cache)
+    for f in sorted(files, key=lambda f: f.rel_path.startswith('public' + os.sep)):
+        sizes.setdefault(served_path(f.rel_path), f.size)
+    return sizes
+
+
+def is_first_party(host, first_party):
+    return any(host == h or host.endswith('.' + h) for h in first_party)
+
+
+def page_metrics(facts, sizes, first_party):
+    """Turn a page's recorded facts into its budgeted metric values."""
+    metrics = {name: facts[name] for name in ('images', 'lazy_images', 'eager_images',
+                                              'missing_dimensions', 'blocking_css', 'blocking_scripts')}
+    metrics['third_party_origins'] = sum(1 for h in facts['origins'] if not is_first_party(h, first_party))
+    metrics['asset_kb'] = round(sum(sizes.get(ref, 0) for ref in facts['refs']) / 1024)
+    return metrics
+
+
+def score(metrics, budgets):
+    """
+    Return (score, [(metric, value, budget)] over budget). Each excess
+    counts relative to its budget, or in units for a zero budget, so the
+    worst pages sort first.
+    """
+    total = 0.0
+    over = []
+    for name, budget in budgets.items():
+        value = metrics[name]
+        if value > budget:
+            total += (value - budget) / budget if budget else value - budget
+            over.append((name, value, budget))
+    return round(total, 2), over
+
+
+def parse_budget(text):
+    name, sep, value = text.partition('=')
+    if not sep or name not in DEFAULT_BUDGETS:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE with NAME one of {', '.join(DEFAULT_BUDGETS)}")
+    return name, float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_discovery_arguments(parser)
+    add_runner_arguments(parser)
+    parser.add_argument('--budgets', metavar='PATH',
+                        help='JSON object of budgets (and optionally "first_party" hosts) '
+                             'overriding the defaults')
+    parser.add_argument('--budget', type=parse_budget, action='append', default=[], metavar='NAME=VALUE',
+                        help='override one budget (repeatable)')
+    parser.add_argument('--all', action='store_true', help='list every page, not only those over budget')
+    parser.add_argument('--json', metavar='PATH', help='write the full report as JSON')
+    args = parser.parse_args()
+
+    budgets = dict(DEFAULT_BUDGETS)
+    first_party = FIRST_PARTY_HOSTS
+    if args.budgets:
+        with open(args.budgets, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        first_party = tuple(config.pop('first_party', first_party))
+        unknown = set(config) - set(DEFAULT_BUDGETS)
+        if unknown:
+            print(f"❌ Unknown budget(s) in {args.budgets}: {', '.join(sorted(unknown))}")
+            sys.exit(2)
+        for name, value in config.items():
+            try:
+                budgets[name] = float(value)
+            except (TypeError, ValueError):
+                print(f"❌ Budget {name} in {args.budgets} is not a number: {value!r}")
+                sys.exit(2)
+    budgets.update(args.budget)
+
+    root = os.path.abspath(args.root)
+    pages = [f for f in discover(args) if is_page(f.rel_path)]
+    sizes = served_sizes(root, DEFAULT_IGNORES | set(args.ignore), args.cache_listing)
+
+    manifest = Manifest(manifest_path(root, 'perf-budget'), MEASURE_VERSION)
+    manifest.prune(f.rel_path for f in pages)
+    pending = [f for f in pages if not manifest.lookup(f.rel_path, f.size, f.mtime_ns)]
+    errors = []
+    for f, error, result in run_parallel(measure_page, pending, args.workers, args.chunksize):
+        if error:
+            errors.append(f"{f.rel_path}: {error}")
+            continue
+        facts, sha256 = result
+        manifest.record(f.rel_path, f.size, f.mtime_ns, sha256, facts)
+    manifest.save()
+
+    report = []
+    for f in pages:
+        entry = manifest.entries.get(f.rel_path)
+        if not entry:
+            continue
+        metrics = page_metrics(entry['result'], sizes, first_party)
+        page_score, over = score(metrics, budgets)
+        report.append((page_score, f.rel_path, metrics, over))
+    report.sort(key=lambda r: (-r[0], r[1]))
+
+    over_budget = [r for r in report if r[3]]
+    print(f"Budgets: {', '.join(f'{name} ≤ {value:g}' for name, value in budgets.items())}")
+    print(f"{len(pages)} page(s), {len(pending)} re-read")
+    listed = report if args.all else over_budget
+    if listed:
+        print()
+    for page_score, rel_path, metrics, over in listed:
+        mark = '✗' if over else '✓'
+        detail = ', '.join(f"{name} {value}/{budget:g}" for name, value, budget in over)
+        print(f"{mark} {page_score:6.2f}  {rel_path}" + (f"  ({detail})" if detail else ''))
+        print(f"          {metrics['eager_images']} eager / {metrics['lazy_images']} lazy img, "
+              f"{metrics['missing_dimensions']} without size, {metrics['blocking_css']} css + "
+              f"{metrics['blocking_scripts']} js blocking, {metrics['third_party_origins']} third-party "
+              f"origin(s), {metrics['asset_kb']} KB")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'budgets': budgets, 'first_party': list(first_party),
+                       'pages': [{'path': rel_path, 'score': page_score, 'metrics': metrics,
+                                  'over': [name for name, _, _ in over]}
+                                 for page_score, rel_path, metrics, over in report]},
+                      f, indent=1)
+
+    print(f"\n{'✅' if not over_budget else '❌'} {len(report) - len(over_budget)}/{len(report)} "
+          f"page(s) within budget")
+    if errors:
+        print(f"\n❌ Errors ({len(errors)}):")
+        for e in errors:
+            print(f"  {e}")
+    if over_budget or errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
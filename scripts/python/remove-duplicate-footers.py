@@ -3,8 +3,11 @@
 Remove duplicate/consecutive footer logo images.
 """
 
+import argparse
 import re
-import os
+
+from atomic_write import write_atomic
+from discovery import add_discovery_arguments, discover
 
 def remove_duplicate_footer_logos(file_path):
     """Remove duplicate footer logo img tags."""
@@ -28,23 +31,19 @@ def remove_duplicate_footer_logos(file_path):
     )
     
     if content != original_content:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        write_atomic(file_path, content)
         return True
     
     return False
 
 def main():
     """Process all HTML files in the project."""
-    html_files = []
-    for root, dirs, files in os.walk('/Users/noz/Desktop/development/costaGlass'):
-        dirs[:] = [d for d in dirs if d not in ['.git', 'node_modules', '.next']]
-        for file in files:
-            if file.endswith('.html'):
-                html_files.append(os.path.join(root, file))
-    
+    parser = argparse.ArgumentParser(description='Remove duplicate footer logo images.')
+    add_discovery_arguments(parser)
+    args = parser.parse_args()
+
     fixed_files = []
-    for file_path in sorted(html_files):
+    for file_path in [f.path for f in discover(args)]:
         if remove_duplicate_footer_logos(file_path):
             fixed_files.append(file_path)
             print(f"✓ Removed duplicate: {file_path}")
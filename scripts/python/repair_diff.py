@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Unified diffs of a repair, built from the rules' splice edits.
+
+repair_content() can hand back the EditList of every pass. changed_spans()
+composes them into the regions of the original page that changed and the
+regions of the repaired page they became, and unified_diff() turns only
+those regions (plus context lines) into hunks. Nothing ever compares the
+two pages line by line, so previewing a repair costs about as much as the
+repair itself, and a page with one fix produces one small hunk however
+large the page is.
+
+The output applies with `git apply` or `patch -p1` from the site root.
+"""
+
+from html_tokenizer import LineIndex
+
+CONTEXT_LINES = 3
+
+
+def changed_spans(passes):
+    """
+    Compose the EditLists of successive passes into changed spans.
+
+    Returns a sorted list of (orig_start, orig_end, new_start, new_end):
+    outside these spans the original and repaired text are identical.
+    """
+    spans = []
+    for edits in passes:
+        items = [(span[2], span[3], True, span) for span in spans]
+        items.extend((start, end, False, len(text) - (end - start))
+                     for start, end, _, text in edits.accepted)
+        items.sort(key=lambda item: (item[0], item[1]))
+
+        merged = []
+        delta = 0   # current - original, left of the sweep position
+        shift = 0   # next pass - current, left of the sweep position
+        i = 0
+        while i < len(items):
+            start, end = items[i][0], items[i][1]
+            span_delta = 0
+            edit_shift = 0
+            # Overlapping or touching spans and edits become one span
+            while i < len(items) and items[i][0] <= end:
+                _, item_end, is_span, value = items[i]
+                end = max(end, item_end)
+                if is_span:
+                    o_s, o_e, c_s, c_e = value
+                    span_delta += (c_e - c_s) - (o_e - o_s)
+                else:
+                    edit_shift += value
+                i += 1
+            merged.append((start - delta, end - delta - span_delta,
+                           start + shift, end + shift + edit_shift))
+            delta += span_delta
+            shift += edit_shift
+        spans = merged
+    return spans
+
+
+def _line_blocks(original, repaired, spans):
+    """
+    Widen changed spans to whole lines, identically on both sides.
+
+    A span is extended left to its line start and right to its line end
+    (unless it already ends on a line boundary on both sides); spans that
+    end up sharing a line are merged. Returns [orig_start, orig_end,
+    new_start, new_end] lists.
+    """
+    def at_line_start(text, pos, floor):
+        return pos == floor or text[pos - 1] == '\n'
+
+    blocks = []
+    i = 0
+    while i < len(spans):
+        o_s, o_e, c_s, c_e = spans[i]
+        i += 1
+        line_start = original.rfind('\n', 0, o_s) + 1
+        c_s -= o_s - line_start
+        o_s = line_start
+
+        while not (at_line_start(original, o_e, o_s) and at_line_start(repaired, c_e, c_s)):
+            newline = original.find('\n', o_e)
+            line_end = len(original) if newline == -1 else newline + 1
+            if i < len(spans) and (spans[i][0] < line_end or newline == -1):
+                # The next span starts on this line: absorb it first
+                _, o_e, _, c_e = spans[i]
+                i += 1
+                continue
+            c_e += line_end - o_e
+            o_e = line_end
+            break
+
+        if blocks and o_s <= blocks[-1][1]:
+            blocks[-1][1] = o_e
+            blocks[-1][3] = c_e
+        else:
+            blocks.append([o_s, o_e, c_s, c_e])
+    return blocks
+
+
+def _split_lines(text):
+    """Split on '\n' only (as LineIndex does), keeping the newlines."""
+    lines = [line + '\n' for line in text.split('\n')]
+    lines[-1] = lines[-1][:-1]
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def _hunk_range(start, count):
+    """Format one side of a hunk header the way diff -u does."""
+    if count == 0:
+        start -= 1
+    return f'{start}' if count == 1 else f'{start},{count}'
+
+
+def _line_out(prefix, line):
+    if line.endswith('\n'):
+        return prefix + line
+    return prefix + line + '\n\\ No newline at end of file\n'
+
+
+def unified_diff(original, repaired, passes, path, context=CONTEXT_LINES):
+    """Return the unified diff of a repair as a string ('' if unchanged)."""
+    blocks = [b for b in _line_blocks(original, repaired, changed_spans(passes))
+              if original[b[0]:b[1]] != repaired[b[2]:b[3]]]
+    if not blocks:
+        return ''
+
+    old_lines = LineIndex(original)
+    new_lines = LineIndex(repaired)
+    orig_all = _split_lines(original)
+
+    # (first orig line, orig line count, first new line, new line count,
+    # orig text, new text); lines are 1-based
+    changes = []
+    for o_s, o_e, c_s, c_e in blocks:
+        old_text = _split_lines(original[o_s:o_e])
+        new_text = _split_lines(repaired[c_s:c_e])
+        changes.append((old_lines.position(o_s)[0], len(old_text),
+                        new_lines.position(c_s)[0], len(new_text), old_text, new_text))
+
+    out = [f'--- a/{path}\n', f'+++ b/{path}\n']
+    i = 0
+    while i < len(changes):
+        j = i
+        while (j + 1 < len(changes) and
+               changes[j + 1][0] - (changes[j][0] + changes[j][1]) <= 2 * context):
+            j += 1
+
+        first_old, _, first_new, _, _, _ = changes[i]
+        lead = min(context, first_old - 1)
+        old_start = first_old - lead
+        new_start = first_new - lead
+        body = [_line_out(' ', line) for line in orig_all[old_start - 1:first_old - 1]]
+        old_count = new_count = lead
+
+        for k in range(i, j + 1):
+            o_first, o_count, _, n_count, old_text, new_text = changes[k]
+            body.extend(_line_out('-', line) for line in old_text)
+            body.extend(_line_out('+', line) for line in new_text)
+            old_count += o_count
+            new_count += n_count
+            gap_end = changes[k + 1][0] - 1 if k < j else min(o_first + o_count - 1 + context,
+                                                               len(orig_all))
+            gap = orig_all[o_first + o_count - 1:gap_end]
+            body.extend(_line_out(' ', line) for line in gap)
+            old_count += len(gap)
+            new_count += len(gap)
+
+        out.append(f'@@ -{_hunk_range(old_start, old_count)} '
+                   f'+{_hunk_range(new_start, new_count)} @@\n')
+        out.extend(body)
+        i = j + 1
+    return ''.join(out)
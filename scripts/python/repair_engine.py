@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Single-pass HTML repair engine.
+
+Replaces running fix-corrupted-images.py, fix-corrupted-images-v2.py,
+fix-loading-lazy.py, fix-all-html-bugs.py, fix-footer-glitch.py,
+fix-remaining-corruption.py and remove-duplicate-footers.py one after
+another: every page is read once, all rules from repair_rules.RULES are
+applied in memory, and the page is written once if anything changed.
+
+--report run.json records per-rule hit counts and timings for the run
+(see run_report.py); --top N prints the slowest rules and files.
+
+Pages are replaced atomically and only when their bytes change (see
+atomic_write.py); --fsync makes the run durable with one batched sync.
+
+--dry-run writes nothing and lists what each page would get from each
+rule; --diff streams a unified diff of every page that would change
+instead (to --output, default stdout), e.g. for review in pre-commit:
+
+    python repair_engine.py --diff --output repair.patch
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+from functools import partial
+
+import asset_index
+import html_tokenizer
+import repair_rules
+from asset_index import get_index
+from atomic_write import SyncBatch, write_atomic
+from discovery import add_discovery_arguments, discover
+from manifest import Manifest, content_hash, manifest_path, source_version
+from parallel_runner import add_runner_arguments, run_parallel
+from repair_diff import unified_diff
+from repair_rules import RULES, repair_content
+from run_report import RunReport, new_file_stats
+
+RULES_VERSION = source_version(repair_rules.__file__, asset_index.__file__, html_tokenizer.__file__)
+
+RepairResult = namedtuple('RepairResult', 'changed sha256 size mtime_ns stats diff', defaults=(None, None))
+
+
+def repair_file(file_path, root, known_sha=None, instrument=False, dry_run=None):
+    """
+    Repair one page in memory; write it only if a rule changed it.
+
+    When known_sha matches the page's hash, the current rule set already
+    processed exactly these bytes and the rules are not run again. With
+    instrument=True the result carries run_report per-file stats.
+    dry_run='summary' or 'diff' never writes; the result carries the
+    per-rule stats or the unified diff of the repair instead.
+    """
+    start = time.perf_counter()
+    stats = new_file_stats() if instrument or dry_run == 'summary' else None
+    passes = [] if dry_run == 'diff' else None
+    diff = None
+    rel_path = os.path.relpath(file_path, root)
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    sha256 = content_hash(data)
+    if stats:
+        stats['bytes_read'] = len(data)
+
+    changed = False
+    if sha256 != known_sha:
+        content = data.decode('utf-8')
+        repaired = repair_content(content, rel_path, stats['rules'] if stats else None, passes,
+                                  get_index(root))
+        if repaired != content:
+            changed = True
+            if dry_run == 'diff':
+                diff = unified_diff(content, repaired, passes, rel_path.replace(os.sep, '/'))
+            if not dry_run:
+                data = repaired.encode('utf-8')
+                write_atomic(file_path, data)
+                sha256 = content_hash(data)
+                if stats:
+                    stats['bytes_written'] = len(data)
+
+    st = os.stat(file_path)
+    if stats:
+        stats['seconds'] = time.perf_counter() - start
+    return RepairResult(changed, sha256, st.st_size, st.st_mtime_ns, stats, diff)
+
+
+def repair_file_task(task, root, instrument=False, dry_run=None):
+    """Unpack a (file_path, known_sha) work item for the process pool."""
+    file_path, known_sha = task
+    return repair_file(file_path, root, known_sha, instrument, dry_run)
+
+
+def edit_summary(rel_path, rule_stats):
+    """One dry-run line: how many edits each rule would make to a page."""
+    hits = [(name, count) for name, (count, _) in rule_stats.items() if count]
+    total = sum(count for _, count in hits)
+    return f"{rel_path}: {total} edit(s) ({', '.join(f'{name} ×{count}' for name, count in hits)})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_discovery_arguments(parser)
+    parser.add_argument('--incremental', action='store_true',
+                        help='skip pages unchanged since the last run with the same rules')
+    parser.add_argument('--report', help='write per-rule hit counts and timings as JSON here')
+    parser.add_argument('--top', type=int, default=0,
+                        help='print the N slowest rules and files')
+    parser.add_argument('--fsync', action='store_true',
+                        help='fsync repaired pages (once, at the end of the run)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='write nothing; list the edits each page would get')
+    parser.add_argument('--diff', action='store_true',
+                        help='write nothing; stream a unified diff of every page that would change')
+    parser.add_argument('--output', help='write the dry-run listing or diff here instead of stdout')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+    if args.output and not (args.dry_run or args.diff):
+        parser.error('--output only applies to --dry-run or --diff')
+
+    dry_run = 'diff' if args.diff else 'summary' if args.dry_run else None
+    # In a dry run stdout carries only the listing/diff, progress goes to stderr
+    log = sys.stderr if dry_run else sys.stdout
+    out = open(args.output, 'w', encoding='utf-8') if dry_run and args.output else sys.stdout
+
+    root = os.path.abspath(args.root)
+    instrument = bool(args.report or args.top)
+    report = RunReport('repair', [name for name, _ in RULES], RULES_VERSION) if instrument else None
+    html_files = discover(args)
+    manifest = None
+    if args.incremental:
+        # Adding an asset can make a truncated path repairable, so the
+        # asset list is part of the version
+        version = f'{RULES_VERSION}-{get_index(root).fingerprint()}'
+        manifest = Manifest(manifest_path(root, 'repair'), version)
+        if not dry_run:
+            manifest.prune(f.rel_path for f in html_files)
+
+    pending = []
+    skipped = 0
+    for f in html_files:
+        if manifest and manifest.lookup(f.rel_path, f.size, f.mtime_ns):
+            skipped += 1
+        else:
+            pending.append(f)
+    print(f"Applying {len(RULES)} rules to {len(pending)} HTML files"
+          + (f" ({skipped} unchanged, skipped)" if manifest else "")
+          + (" (dry run)" if dry_run else ""), file=log)
+
+    tasks = [(f.path, manifest.known_hash(f.rel_path) if manifest else None)
+             for f in pending]
+
+    fixed_files = []
+    errors = []
+    sync = SyncBatch() if args.fsync and not dry_run else None
+    results = run_parallel(partial(repair_file_task, root=root, instrument=instrument, dry_run=dry_run),
+                           tasks, args.workers, args.chunksize)
+    for (file_path, _), error, result in results:
+        rel_path = os.path.relpath(file_path, root)
+        if error:
+            errors.append(f"{rel_path}: {error}")
+            continue
+        if result.changed:
+            fixed_files.append(rel_path)
+            if dry_run == 'diff':
+                out.write(result.diff)
+            elif dry_run:
+                print(edit_summary(rel_path, result.stats['rules']), file=out)
+            if sync is not None:
+                sync.add(file_path)
+        if report:
+            report.add(rel_path, result.stats)
+        if manifest and not dry_run:
+            manifest.record(rel_path, result.size, result.mtime_ns, result.sha256,
+                            'repaired' if result.changed else 'clean')
+
+    if sync is not None:
+        sync.flush()
+    if manifest and not dry_run:
+        manifest.save()
+    if report:
+        report.finish()
+
+    if out is not sys.stdout:
+        out.close()
+
+    if dry_run:
+        print(f"\nWould fix {len(fixed_files)} files", file=log)
+    else:
+        print(f"\n✅ Fixed {len(fixed_files)} files:")
+        for f in fixed_files:
+            print(f"  {f}")
+
+    if errors:
+        print(f"\n❌ Errors ({len(errors)}):", file=log)
+        for e in errors:
+            print(f"  {e}", file=log)
+    else:
+        print("\n✓ No errors encountered", file=log)
+
+    if report:
+        if args.top:
+            report.print_top(args.top, file=log)
+        if args.report:
+            report.save(args.report)
+            print(f"\n✓ Run report written to {args.report}", file=log)
+
+
+if __name__ == '__main__':
+    main()
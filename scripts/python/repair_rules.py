@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Ordered registry of the HTML repair rules.
+
+Each rule used to live in its own fix-*.py script that walked the tree,
+re-read every file and rewrote it. Here every rule is a function
+`rule(page)` registered in the order the scripts were historically run.
+Rules never rewrite the page themselves: they look at page.content (with
+regexes or the shared html_tokenizer stream) and record splice edits in
+page.edits, which repair_content() applies in one rebuild per pass.
+When two rules want to edit the same span, the earlier rule wins and the
+later one gets another chance on the next pass over the repaired text.
+
+Patterns that rewrite valid markup (fix-corrupted-images.py patterns 4/5
+and fix-corrupted-images-v2.py patterns 2/5) are deliberately not ported:
+they strip span text and split well-formed img tags into `< class=...`
+fragments, i.e. they produce the corruption the other rules repair.
+"""
+
+import re
+import time
+
+from asset_index import asset_prefix, page_depth
+from html_tokenizer import BROKEN_TAG, EditList, tokenize
+from run_report import add_rule_time
+
+RULES = []
+MAX_PASSES = 4
+
+
+def rule(name):
+    """Register a repair function under `name`, keeping definition order."""
+    def register(func):
+        RULES.append((name, func))
+        return func
+    return register
+
+
+class Page:
+    """
+    One page being repaired: its text, site-relative path and edits, and
+    the site's AssetIndex (None when repairing text without a site).
+    """
+
+    def __init__(self, content, rel_path, assets=None):
+        self.content = content
+        self.rel_path = rel_path
+        self.assets = assets
+        self.edits = EditList()
+        self._tokens = None
+
+    @property
+    def tokens(self):
+        """The page's html_tokenizer tokens, computed once per pass."""
+        if self._tokens is None:
+            self._tokens = list(tokenize(self.content))
+        return self._tokens
+
+    def sub(self, pattern, repl):
+        """Like pattern.sub(repl, content), but recorded as splice edits."""
+        for m in pattern.finditer(self.content):
+            text = repl(m) if callable(repl) else m.expand(repl)
+            self.edits.replace(m.start(), m.end(), text)
+
+
+# ---------------------------------------------------------------------------
+# fix-corrupted-images.py: overlapping img src attributes
+# ---------------------------------------------------------------------------
+
+overlapping_src_pattern = re.compile(r'<img\s+src="[^"]*?<img\s+src="')
+broken_alt_pattern = re.compile(r'alt="[^"]*?<img\s+src="')
+alt_then_img_pattern = re.compile(r'alt="([^"]*?)"<img\s+src="[^"]*?"')
+lazy_then_class_pattern = re.compile(r'loading="lazy">[a-z]*class="')
+
+
+@rule('overlapping-img-src')
+def fix_overlapping_img_src(page):
+    """<img src="./Ass<img src="./Assets/..." → <img src="./Assets/..."."""
+    page.sub(overlapping_src_pattern, '<img src="')
+    page.sub(broken_alt_pattern, 'alt="')
+    page.sub(alt_then_img_pattern, r'alt="\1"')
+    page.sub(lazy_then_class_pattern, 'loading="lazy">\n                    <div class="')
+
+
+# ---------------------------------------------------------------------------
+# fix-corrupted-images-v2.py: quoted asset paths that lost their <img
+# ---------------------------------------------------------------------------
+
+quoted_path_alt_pattern = re.compile(r'>\s*"(\.\/Assets\/[^"]*?)"(\s+alt=)')
+lazy_then_quoted_path_pattern = re.compile(r'(loading="lazy")>\s+"(\.\/[^"]*)"')
+bare_quoted_path_pattern = re.compile(r'>\s+"(\.\/[A-Za-z])')
+
+
+@rule('missing-img-tag')
+def fix_missing_img_tag(page):
+    """>"./Assets/..." alt= → ><img src="./Assets/..." alt=."""
+    page.sub(quoted_path_alt_pattern, r'><img src="\1"\2')
+    page.sub(lazy_then_quoted_path_pattern, r'\1>\n                    <img src="\2"')
+    page.sub(bare_quoted_path_pattern, r'>\n                    <img src="\1')
+
+
+# ---------------------------------------------------------------------------
+# fix-loading-lazy.py: `< loading="lazy">` fragments
+# ---------------------------------------------------------------------------
+
+lazy_before_img_pattern = re.compile(r'<[ \t]+loading="lazy">[ \t]*(<img\s)')
+lazy_quoted_path_pattern = re.compile(r'<[ \t]+loading="lazy">"')
+lazy_path_tail_pattern = re.compile(r'<[ \t]+loading="lazy">([^"<>\n]+)(?=")')
+lazy_before_tag_pattern = re.compile(r'<[ \t]+loading="lazy">[ \t]*(?=<(?!img\b))')
+lazy_end_of_line_pattern = re.compile(r'<[ \t]+loading="lazy">[ \t\r]*$', re.MULTILINE)
+
+
+# Tails the old script recognised, for assets the index cannot place
+# (e.g. repairing a copy of the pages without the Assets/ tree)
+KNOWN_TAIL_HEADS = (
+    ('roducts/', 'Assets/p'),
+    ('cts/', 'Assets/produ'),
+    ('ts/products/', 'Asse'),
+)
+
+
+def resolve_path_tail(page, tail):
+    """Return the served asset path a truncated src tail belonged to, or None."""
+    if page.assets is not None:
+        asset = page.assets.resolve(tail)
+        if asset:
+            return asset
+    for known, lost in KNOWN_TAIL_HEADS:
+        if tail.startswith(known):
+            return lost + tail
+    return None
+
+
+@rule('loading-lazy-fragment')
+def fix_loading_lazy_fragments(page):
+    """Rebuild img tags whose `<img src="...` was replaced by `< loading="lazy">`."""
+    asset_base = asset_prefix(page_depth(page.rel_path))[:-len('Assets/')]
+    page.sub(lazy_before_img_pattern, r'\1')
+    page.sub(lazy_quoted_path_pattern, '<img src="')
+    for m in lazy_path_tail_pattern.finditer(page.content):
+        asset = resolve_path_tail(page, m.group(1))
+        if asset:
+            page.edits.replace(m.start(), m.end(), f'<img src="{asset_base}{asset}')
+    page.sub(lazy_before_tag_pattern, '')
+    page.sub(lazy_end_of_line_pattern, '')
+
+
+# ---------------------------------------------------------------------------
+# fix-all-html-bugs.py: language widget and orphaned attribute-only tags
+# ---------------------------------------------------------------------------
+
+es_flag_dupe_pattern = re.compile(
+    r'<img\s+src="https://flagcdn\.com/w40/es\.png"\s+alt="[^"]*">\s*\n(\s*)<\s+class="lang-flag"\s+id="currentFlag"([^>]*)>'
+)
+lang_flag_broken_pattern = re.compile(r'<\s+class="lang-flag"\s+id="currentFlag"([^>]*)>')
+broken_tag_start_pattern = re.compile(r'<\s+[a-z]')
+orphan_tag_pattern = re.compile(
+    r'<[ \t]+(?:class|width|height|loading|src|id|alt|style)=["\'][^"\']*["\'][^>]*>$'
+)
+
+
+def lang_flag_tag(extra_attrs):
+    """Build the proper current-language flag img tag."""
+    extra_attrs = extra_attrs.strip() or 'width="40" height="27"'
+    return f'<img src="https://flagcdn.com/w40/es.png" class="lang-flag" id="currentFlag" {extra_attrs} alt="Español">'
+
+
+@rule('lang-flag')
+def fix_lang_flag(page):
+    """< class="lang-flag" id="currentFlag"...> → proper flag img tag."""
+    page.sub(es_flag_dupe_pattern, lambda m: lang_flag_tag(m.group(2)))
+    page.sub(lang_flag_broken_pattern, lambda m: lang_flag_tag(m.group(1)))
+
+
+@rule('orphan-tag')
+def remove_orphan_tags(page):
+    """Drop lines holding only `< width="768" height="512" loading="lazy">`."""
+    content = page.content
+    if not broken_tag_start_pattern.search(content):
+        return
+    for token in page.tokens:
+        if token.kind != BROKEN_TAG or '\n' in token.text or not orphan_tag_pattern.match(token.text):
+            continue
+        line_start = content.rfind('\n', 0, token.start) + 1
+        line_end = content.find('\n', token.end)
+        line_end = len(content) if line_end == -1 else line_end + 1
+        if content[line_start:token.start].strip() or content[token.end:line_end].strip():
+            continue
+        page.edits.delete(line_start, line_end)
+
+
+# ---------------------------------------------------------------------------
+# fix-footer-glitch.py: footer logo corruption
+# ---------------------------------------------------------------------------
+
+FOOTER_LOGO = '<img src="./Assets/logo/download.webp" alt="Costa Glass" class="footer-logo">'
+FOOTER_TEXT = '<p>Sistemas innovadores de pérgolas, techos corredizos y toldos zip. Diseño, confort y elegancia para sus espacios exteriores.</p>'
+
+footer_alt_text_pattern = re.compile(r'< alt="Costa Glass" class="footer-logo"\s+loading="lazy">[^<]*</p>')
+footer_text_pattern = re.compile(r'< class="footer-logo"\s+loading="lazy">[^<]*</p>')
+footer_before_p_pattern = re.compile(r'< class="footer-logo"\s+loading="lazy">\s+<p>')
+footer_diseno_pattern = re.compile(r'< class="footer-logo"\s+loading="lazy">Diseño, confort[^<]*</p>')
+footer_orphan_pattern = re.compile(r'< class="footer-logo"[^>]*>')
+footer_alt_orphan_pattern = re.compile(r'< alt="Costa Glass" class="footer-logo"[^>]*>')
+footer_path_alt_pattern = re.compile(
+    r'<img\s+src="(\.?/?Assets/logo/download\.webp)"\s+alt="[^"]*">\s*\n\s*<img\s+src="([^"]*)"'
+)
+
+
+@rule('footer-logo')
+def fix_footer_logo(page):
+    """< class="footer-logo" loading="lazy">... → footer logo img and text."""
+    full_footer = f'{FOOTER_LOGO}\n                    {FOOTER_TEXT}'
+    page.sub(footer_alt_text_pattern, full_footer)
+    page.sub(footer_text_pattern, full_footer)
+    page.sub(footer_before_p_pattern, f'{FOOTER_LOGO}\n                    <p>')
+    page.sub(footer_diseno_pattern, full_footer)
+    page.sub(footer_orphan_pattern, '')
+    page.sub(footer_alt_orphan_pattern, '')
+    page.sub(footer_path_alt_pattern, r'<img src="\1" alt="Costa Glass" class="footer-logo">\n                    <img src="\2"')
+
+
+# ---------------------------------------------------------------------------
+# fix-remaining-corruption.py: `< cla<img` and `< img` fragments
+# ---------------------------------------------------------------------------
+
+cla_img_pattern = re.compile(r'< cla<img\s+src="([^"]*)"\s+alt="([^"]*)"\s+class="footer-logo">')
+img_before_cla_pattern = re.compile(r'<img\s+src="[^"]*"\s+alt="[^"]*">\s*\n\s*< cla<img\s+src=')
+spaced_img_pattern = re.compile(r'< img\s+src="[^"]*"[^>]*>')
+
+
+@rule('cla-img')
+def fix_cla_img(page):
+    """< cla<img src="..." alt="..." class="footer-logo"> → <img ...>."""
+    page.sub(cla_img_pattern, r'<img src="\1" alt="\2" class="footer-logo">')
+    page.sub(img_before_cla_pattern, '<img src=')
+    page.sub(spaced_img_pattern, '')
+
+
+# ---------------------------------------------------------------------------
+# remove-duplicate-footers.py: consecutive footer logos
+# ---------------------------------------------------------------------------
+
+duplicate_footer_pattern = re.compile(
+    r'<img\s+src="([^"]*)"\s+alt="([^"]*)"\s+class="footer-logo">\s*\n\s*<img\s+src="\1"\s+alt="\2"\s+class="footer-logo">'
+)
+plain_then_footer_pattern = re.compile(
+    r'<img\s+src="([^"]*)"\s+alt="[^"]*">\s*\n\s*<img\s+src="\1"\s+alt="Costa Glass"\s+class="footer-logo">'
+)
+
+
+@rule('duplicate-footer')
+def remove_duplicate_footers(page):
+    """Collapse two consecutive footer logo img tags into one."""
+    page.sub(duplicate_footer_pattern, r'<img src="\1" alt="\2" class="footer-logo">')
+    page.sub(plain_then_footer_pattern, r'<img src="\1" alt="Costa Glass" class="footer-logo">')
+
+
+def run_rule_timed(name, func, page, rule_stats):
+    """Run one rule, adding its edit count and time to rule_stats[name]."""
+    edits = page.edits
+    before = len(edits) + edits.dropped
+    start = time.perf_counter()
+    func(page)
+    elapsed = time.perf_counter() - start
+    add_rule_time(rule_stats, name, len(edits) + edits.dropped - before, elapsed)
+
+
+def repair_content(content, rel_path, rule_stats=None, passes=None, assets=None):
+    """
+    Apply every registered rule and return the repaired content.
+
+    Each pass runs all rules against the same text and splices their edits
+    in one rebuild; passes repeat until no rule has anything left to do,
+    which for a clean page means one scan and no copy at all.
+
+    When rule_stats is a dict, every rule's hits (edits it recorded,
+    including ones dropped for overlapping) and time are accumulated in
+    rule_stats[name] as [hits, seconds]. When passes is a list, the
+    EditList applied by each pass is appended to it (see repair_diff.py).
+    assets is the site's AssetIndex, used to rebuild truncated src paths.
+    """
+    for _ in range(MAX_PASSES):
+        page = Page(content, rel_path, assets)
+        for name, func in RULES:
+            if rule_stats is None:
+                func(page)
+            else:
+                run_rule_timed(name, func, page, rule_stats)
+        if not page.edits:
+            break
+        if passes is not None:
+            passes.append(page.edits)
+        content = page.edits.apply(content)
+    return content
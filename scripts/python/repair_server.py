@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Resident repair server for the Node build, over a Unix domain socket.
+
+Each run of repair_engine.py or corruption_detector.py pays for
+interpreter start-up, imports, compiling the rule patterns and scanning
+Assets/ before it looks at a single page, so calling them per page from
+vite.config.js or generate-pages.js costs far more than the repairs. This
+server does all of that once and then answers requests with the rules,
+the AssetIndex and the repair manifest warm in memory.
+
+The protocol is one JSON object per line each way; a connection can carry
+any number of requests, and every response echoes the request's "id".
+
+    {"op": "repair", "files": ["contact.html"], "diff": false}
+        Repair pages under the root in place. Pages unchanged since the
+        last repair by the same rules and assets are skipped, as with
+        repair_engine.py --incremental. "diff": true writes nothing and
+        returns each page's unified diff.
+    {"op": "repair", "html": "<!DOCTYPE html>...", "path": "blog/x/index.html"}
+        Repair a buffer as if it were the page at "path"; returns "html".
+    {"op": "check", "files": [...]} or {"op": "check", "html": "..."}
+        Corruption findings with line and column (corruption_detector.py).
+    {"op": "reload"}    rescan Assets/ and reread the manifest
+    {"op": "ping"}      rule set version, asset count, requests served
+    {"op": "shutdown"}
+
+Failed requests answer {"ok": false, "error": "..."}; a page that cannot
+be read gets an "error" entry of its own in an otherwise good answer. The socket lives at
+.repair-cache/repair.sock under the root unless --socket says otherwise;
+scripts/repair-client.mjs is the Node side.
+
+    python repair_server.py &                # serve until stopped
+    python repair_server.py --idle-timeout 300
+    python repair_server.py --ping
+    python repair_server.py --stop
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from asset_index import forget_index, get_index
+from corruption_detector import detect
+from discovery import ROOT
+from manifest import CACHE_DIR, Manifest, manifest_path
+from repair_diff import unified_diff
+from repair_engine import RULES_VERSION, repair_file
+from repair_rules import RULES, repair_content
+
+SOCKET_NAME = 'repair.sock'
+
+
+def default_socket(root):
+    return os.path.join(root, CACHE_DIR, SOCKET_NAME)
+
+
+class RepairService:
+    """The warm state for one site root, and the request operations on it."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.load()
+
+    def load(self):
+        """(Re)build the AssetIndex and reopen the repair manifest."""
+        forget_index(self.root)
+        self.assets = get_index(self.root)
+        # The same version repair_engine.py --incremental uses, so the two
+        # share one manifest
+        self.version = f'{RULES_VERSION}-{self.assets.fingerprint()}'
+        self.manifest = Manifest(manifest_path(self.root, 'repair'), self.version)
+
+    def page_path(self, rel_path):
+        """Return the absolute path of a page, refusing paths outside the root."""
+        path = os.path.abspath(os.path.join(self.root, rel_path))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f'{rel_path} is outside {self.root}')
+        return path
+
+    def repair_files(self, files, diff=False):
+        results = []
+        for rel_path in files:
+            try:
+                results.append(self.repair_one(rel_path, diff))
+            except (OSError, ValueError) as e:
+                # ValueError covers paths outside the root and undecodable pages
+                results.append({'path': rel_path, 'error': f'{type(e).__name__}: {e}'})
+        self.manifest.save()
+        return {'files': results}
+
+    def repair_one(self, rel_path, diff):
+        path = self.page_path(rel_path)
+        rel_path = os.path.relpath(path, self.root)
+        st = os.stat(path)
+        if not diff and self.manifest.lookup(rel_path, st.st_size, st.st_mtime_ns):
+            return {'path': rel_path, 'changed': False, 'skipped': True}
+        result = repair_file(path, self.root, self.manifest.known_hash(rel_path),
+                             dry_run='diff' if diff else None)
+        entry = {'path': rel_path, 'changed': result.changed}
+        if diff:
+            entry['diff'] = result.diff or ''
+        else:
+            self.manifest.record(rel_path, result.size, result.mtime_ns, result.sha256,
+                                 'repaired' if result.changed else 'clean')
+        return entry
+
+    def repair_html(self, content, rel_path, diff=False):
+        passes = [] if diff else None
+        repaired = repair_content(content, rel_path, None, passes, self.assets)
+        response = {'html': repaired, 'changed': repaired != content}
+        if diff:
+            response['diff'] = unified_diff(content, repaired, passes, rel_path.replace(os.sep, '/'))
+        return response
+
+    def check(self, request):
+        if 'html' in request:
+            return {'findings': [f._asdict() for f in detect(request['html'])]}
+        results = []
+        for rel_path in request.get('files', []):
+            try:
+                with open(self.page_path(rel_path), 'r', encoding='utf-8') as f:
+                    findings = detect(f.read())
+            except (OSError, ValueError) as e:
+                results.append({'path': rel_path, 'error': f'{type(e).__name__}: {e}'})
+                continue
+            results.append({'path': rel_path, 'findings': [f._asdict() for f in findings]})
+        return {'files': results}
+
+    def handle(self, request):
+        """Run one request; return the response body (without id)."""
+        op = request.get('op')
+        with self.lock:
+            self.requests += 1
+            if op == 'repair':
+                if 'html' in request:
+                    body = self.repair_html(request['html'], request.get('path', 'index.html'),
+                                            request.get('diff', False))
+                else:
+                    body = self.repair_files(request.get('files', []), request.get('diff', False))
+            elif op == 'check':
+                body = self.check(request)
+            elif op == 'reload':
+                self.load()
+                body = {'assets': len(self.assets)}
+            elif op == 'ping':
+                body = {'root': self.root, 'rules': len(RULES), 'version': self.version,
+                        'assets': len(self.assets), 'requests': self.requests,
+                        'uptime': round(time.time() - self.started, 1)}
+            elif op == 'shutdown':
+                body = {}
+            else:
+                raise ValueError(f'unknown op {op!r}')
+        return dict(ok=True, **body)
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """One connection: read JSON lines, answer each with one JSON line."""
+
+    def handle(self):
+        server = self.server
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            server.last_request = time.monotonic()
+            request = {}
+            try:
+                request = json.loads(line)
+                response = server.service.handle(request)
+            except Exception as e:
+                response = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+            if isinstance(request, dict):
+                response['id'] = request.get('id')
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+            self.wfile.flush()
+            if isinstance(request, dict) and request.get('op') == 'shutdown':
+                threading.Thread(target=server.shutdown, daemon=True).start()
+                return
+
+
+class RepairServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, service):
+        self.service = service
+        self.last_request = time.monotonic()
+        super().__init__(socket_path, RequestHandler)
+        os.chmod(socket_path, 0o600)
+
+
+def send(socket_path, request):
+    """Send one request to a running server and return its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as f:
+            return json.loads(f.readline())
+
+
+def server_running(socket_path):
+    try:
+        send(socket_path, {'op': 'ping'})
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--root', default=str(ROOT), help='site root to serve')
+    parser.add_argument('--socket', help=f'socket path (default <root>/{CACHE_DIR}/{SOCKET_NAME})')
+    parser.add_argument('--idle-timeout', type=float, default=0,
+                        help='exit after this many seconds without a request (0: never)')
+    parser.add_argument('--ping', action='store_true', help='print the status of a running server')
+    parser.add_argument('--stop', action='store_true', help='stop a running server')
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    socket_path = args.socket or default_socket(root)
+
+    if args.ping or args.stop:
+        try:
+            response = send(socket_path, {'op': 'shutdown' if args.stop else 'ping'})
+        except OSError as e:
+            print(f"❌ No server at {socket_path}: {e}")
+            sys.exit(1)
+        print('✓ Stopped' if args.stop else json.dumps(response, indent=1))
+        return
+
+    if os.path.exists(socket_path):
+        if server_running(socket_path):
+            print(f"⚠ A server is already listening on {socket_path}")
+            sys.exit(1)
+        os.unlink(socket_path)  # left behind by a server that died
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+
+    start = time.perf_counter()
+    service = RepairService(root)
+    server = RepairServer(socket_path, service)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    print(f"✓ {len(RULES)} rules, {len(service.assets)} assets loaded in "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms; listening on {socket_path}", flush=True)
+
+    if args.idle_timeout:
+        def watch_idle():
+            while True:
+                time.sleep(min(args.idle_timeout, 1.0))
+                if time.monotonic() - server.last_request > args.idle_timeout:
+                    server.shutdown()
+                    return
+        threading.Thread(target=watch_idle, daemon=True).start()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with service.lock:
+            service.manifest.save()
+        try:
+            os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+    print(f"✓ Served {service.requests} request(s)")
+
+
+if __name__ == '__main__':
+    main()
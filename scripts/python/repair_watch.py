@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Watch the site and repair and check pages as the build writes them.
+
+verify-fix.py can only say, after the fact, that corruption came back:
+some build or optimisation step is writing the broken tags again. This
+watches the tree with inotify (through ctypes, no extra package), or by
+polling sizes and mtimes where inotify is unavailable, and collects the
+pages that were written. Once writes have been quiet for --debounce
+seconds (or a burst has gone on for --max-wait), only those pages are
+run through corruption_detector and the repair rules. Every corrupted
+page is logged with the time it was written and its first finding, so the
+log lines up with the build step that wrote it.
+
+The rules, AssetIndex and repair manifest stay loaded for the whole
+session (see repair_server.RepairService), and a change under Assets/
+reloads the index. Pages the watcher itself repaired are not checked
+again when their own write comes back as an event.
+
+    python repair_watch.py
+    python repair_watch.py --check-only --log corruption.jsonl
+    python repair_watch.py --poll 0.5          # force polling
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import select
+import signal
+import struct
+import time
+from datetime import datetime
+
+from asset_index import ASSET_DIRS
+from corruption_detector import detect
+from discovery import DEFAULT_IGNORES, add_discovery_arguments, scan
+from manifest import content_hash
+from repair_server import RepairService
+
+WATCHED_SUFFIXES = ('.html',)
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Recursive inotify watches on every directory that is not ignored."""
+
+    def __init__(self, root, ignore):
+        libc_name = ctypes.util.find_library('c')
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self.libc = libc
+        self.root = root
+        self.ignore = ignore
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.dirs = {}
+        self.add_tree('')
+
+    def add_tree(self, rel_dir):
+        """Watch rel_dir and every directory below it; return the files found there."""
+        found = set()
+        for dir_path, subdirs, files in os.walk(os.path.join(self.root, rel_dir)):
+            subdirs[:] = [d for d in subdirs if d not in self.ignore]
+            rel = os.path.relpath(dir_path, self.root)
+            rel = '' if rel == '.' else rel
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dir_path), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOSPC:
+                    raise OSError(err, 'out of inotify watches (fs.inotify.max_user_watches)')
+                continue  # removed while we walked it
+            self.dirs[wd] = rel
+            found.update(os.path.join(rel, name) if rel else name for name in files)
+        return found
+
+    def read(self, timeout):
+        """Wait up to timeout seconds; return the relative paths written."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, pos)
+            pos += EVENT_HEADER.size
+            name = os.fsdecode(data[pos:pos + length].rstrip(b'\0'))
+            pos += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: treat everything as written
+                changed.update(f.rel_path for f in scan(self.root, None, self.ignore))
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            rel_dir = self.dirs.get(wd)
+            if rel_dir is None or not name:
+                continue
+            rel_path = os.path.join(rel_dir, name) if rel_dir else name
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and name not in self.ignore:
+                    changed.update(self.add_tree(rel_path))
+                continue
+            changed.add(rel_path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Compare the size and mtime of every file each interval."""
+
+    def __init__(self, root, ignore, interval):
+        self.root = root
+        self.ignore = ignore
+        self.interval = interval
+        self.state = self.snapshot()
+
+    def snapshot(self):
+        return {f.rel_path: (f.size, f.mtime_ns) for f in scan(self.root, None, self.ignore)}
+
+    def read(self, timeout):
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        state = self.snapshot()
+        changed = {rel for rel, stamp in state.items() if self.state.get(rel) != stamp}
+        self.state = state
+        return changed
+
+    def close(self):
+        pass
+
+
+class WatchSession:
+    """Checks and repairs batches of written pages and logs what it finds."""
+
+    def __init__(self, service, check_only=False, log_file=None, verbose=False):
+        self.service = service
+        self.check_only = check_only
+        self.log_file = log_file
+        self.verbose = verbose
+        self.seen = {}   # rel_path -> sha256 of the bytes last checked or written
+        self.totals = {'batches': 0, 'checked': 0, 'corrupted': 0, 'repaired': 0, 'errors': 0}
+
+    def log(self, when, message, record=None):
+        stamp = datetime.fromtimestamp(when).strftime('%H:%M:%S.%f')[:-3]
+        print(f"{stamp} {message}", flush=True)
+        if self.log_file and record is not None:
+            record['time'] = datetime.fromtimestamp(when).isoformat(timespec='milliseconds')
+            self.log_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.log_file.flush()
+
+    def error(self, rel_path, message):
+        self.totals['errors'] += 1
+        self.seen.pop(rel_path, None)
+        self.log(time.time(), f"❌ {rel_path}: {message}", {'path': rel_path, 'error': message})
+
+    def check_page(self, rel_path):
+        path = os.path.join(self.service.root, rel_path)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            written = os.stat(path).st_mtime
+        except FileNotFoundError:
+            self.seen.pop(rel_path, None)
+            return
+        sha256 = content_hash(data)
+        if self.seen.get(rel_path) == sha256:
+            return  # our own write, or touched without changing
+        self.totals['checked'] += 1
+        findings = detect(data.decode('utf-8', 'replace'))
+        repaired = False
+        remaining = findings
+        if not self.check_only:
+            result = self.service.handle({'op': 'repair', 'files': [rel_path]})['files'][0]
+            if 'error' in result:
+                self.error(rel_path, result['error'])
+                return
+            repaired = result.get('changed', False)
+            if repaired:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                sha256 = content_hash(data)
+                remaining = detect(data.decode('utf-8', 'replace'))
+        self.seen[rel_path] = sha256
+
+        record = {'path': rel_path, 'findings': [f._asdict() for f in findings],
+                  'repaired': repaired, 'remaining': len(remaining)}
+        if findings:
+            self.totals['corrupted'] += 1
+            first = findings[0]
+            categories = sorted({f.category for f in findings})
+            outcome = ('' if self.check_only
+                       else f"; {len(remaining)} left after repair" if remaining else '; repaired')
+            self.log(written, f"✗ {rel_path}: {len(findings)} corruption(s) ({', '.join(categories)}), "
+                              f"first at {first.line}:{first.column} {first.snippet!r}{outcome}", record)
+        elif repaired:
+            self.log(written, f"✓ {rel_path}: repaired (no detector findings)", record)
+        elif self.verbose:
+            self.log(written, f"· {rel_path}: clean")
+        if repaired:
+            self.totals['repaired'] += 1
+
+    def run_batch(self, rel_paths):
+        start = time.perf_counter()
+        self.totals['batches'] += 1
+        if any(rel.startswith(tuple(d + os.sep for d in ASSET_DIRS)) for rel in rel_paths):
+            self.service.handle({'op': 'reload'})
+        pages = sorted(rel for rel in rel_paths if rel.endswith(WATCHED_SUFFIXES))
+        for rel_path in pages:
+            try:
+                self.check_page(rel_path)
+            except (OSError, ValueError) as e:
+                # One unreadable page must not end the session
+                self.error(rel_path, f'{type(e).__name__}: {e}')
+        if self.verbose and pages:
+            self.log(time.time(), f"  batch of {len(pages)} page(s) in "
+                                  f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def watch(watcher, session, debounce, max_wait):
+    """Collect written paths and hand them over in debounced batches."""
+    pending = set()
+    first = last = None
+    while True:
+        timeout = None
+        if pending:
+            now = time.monotonic()
+            timeout = max(0.0, min(last + debounce, first + max_wait) - now)
+        changed = watcher.read(timeout if timeout is not None else 1.0)
+        now = time.monotonic()
+        if changed:
+            if not pending:
+                first = now
+            pending |= changed
+            last = now
+        if pending and (now >= last + debounce or now >= first + max_wait):
+            batch, pending = pending, set()
+            session.run_batch(batch)
+
+
+def stop(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_discovery_arguments(parser)
+    parser.add_argument('--debounce', type=float, default=0.3,
+                        help='seconds of quiet before a burst of writes is checked')
+    parser.add_argument('--max-wait', type=float, default=3.0,
+                        help='check a burst that keeps going after this many seconds anyway')
+    parser.add_argument('--poll', type=float, metavar='SECONDS',
+                        help='poll at this interval instead of using inotify')
+    parser.add_argument('--check-only', action='store_true', help='log corruption but do not repair')
+    parser.add_argument('--initial', action='store_true', help='check every page once at start-up')
+    parser.add_argument('--log', help='append one JSON line per corrupted or repaired page here')
+    parser.add_argument('-v', '--verbose', action='store_true', help='also log clean pages and batch timings')
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    ignore = DEFAULT_IGNORES | set(args.ignore)
+    watcher = None
+    if args.poll is None:
+        try:
+            watcher = InotifyWatcher(root, ignore)
+            mode = f'inotify, {len(watcher.dirs)} directories'
+        except (OSError, AttributeError) as e:
+            print(f"⚠ inotify unavailable ({e}); polling every 1 s")
+            args.poll = 1.0
+    if watcher is None:
+        watcher = PollingWatcher(root, ignore, args.poll)
+        mode = f'polling every {args.poll:g} s'
+
+    log_file = open(args.log, 'a', encoding='utf-8') if args.log else None
+    session = WatchSession(RepairService(root), args.check_only, log_file, args.verbose)
+    if args.initial:
+        session.run_batch({f.rel_path for f in scan(root, WATCHED_SUFFIXES, ignore)})
+    # Stop cleanly when the build that started us terminates it
+    signal.signal(signal.SIGTERM, stop)
+    print(f"👀 Watching {root} ({mode}); "
+          f"{'checking' if args.check_only else 'repairing and checking'} written pages. Ctrl-C to stop.",
+          flush=True)
+
+    try:
+        watch(watcher, session, args.debounce, args.max_wait)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        session.service.manifest.save()
+        if log_file:
+            log_file.close()
+    t = session.totals
+    print(f"\n✓ {t['batches']} batch(es), {t['checked']} page(s) checked, "
+          f"{t['corrupted']} corrupted, {t['repaired']} repaired, {t['errors']} error(s)")
+
+
+if __name__ == '__main__':
+    main()
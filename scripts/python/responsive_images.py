@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Width-bucketed WebP derivatives of the site's images, wired in with srcset.
+
+Every page references the full-size original of each photo, so a phone
+downloads the same 1-2 MB file as a desktop. For every image under the
+asset directories wider than a bucket in --widths this stage encodes a
+WebP scaled to that width into Assets/responsive/ (public/Assets/responsive/
+for images that only live there), then gives every img pointing at the
+original a srcset listing the derivatives plus the original, and a sizes
+attribute.
+
+Derivative names are content-addressed: they carry a hash of the
+source's bytes, the width, the quality and the encoder settings, so an
+existing file is never re-encoded and a changed source simply gets new
+names. Encoding fans out over the shared process pool. Derivatives that
+come out no smaller than their source are left out of the srcset.
+
+Encoding uses Pillow when it is installed and the cwebp binary
+otherwise; with neither, pages are still rewritten for the derivatives
+already on disk. Nothing is fetched from the network.
+
+    python responsive_images.py                     # encode, rewrite pages
+    python responsive_images.py --dry-run           # show what would happen
+    python responsive_images.py --widths 480,960 --prune
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import namedtuple
+from functools import partial
+
+from asset_index import asset_prefix, page_depth
+from asset_refs import resolve_reference, served_path
+from atomic_write import write_atomic
+from discovery import add_discovery_arguments, discover
+from html_tokenizer import START_TAG, EditList, attributes, tokenize
+from image_dimensions import attribute_insert_pos, probe_assets
+from parallel_runner import add_runner_arguments, run_parallel
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+DERIVATIVE_DIR = 'responsive'
+DEFAULT_WIDTHS = (480, 768, 1200)
+DEFAULT_QUALITY = 80
+DEFAULT_SIZES = '100vw'
+# Bumped when the encoding settings change, so every derivative is redone
+ENCODER_SETTINGS = 'webp-lanczos-m6-1'
+# The layout viewport the per-page savings are computed for
+MOBILE_VIEWPORT = 480
+
+Derivative = namedtuple('Derivative', 'asset path width height')
+EncodeTask = namedtuple('EncodeTask', 'source path width height quality')
+# A srcset candidate: served path (None for the original), width, bytes
+Candidate = namedtuple('Candidate', 'asset width bytes')
+
+
+def derivative_name(asset, sha256, width, quality):
+    """Return the content-addressed file name of one derivative."""
+    stem = os.path.splitext(asset.rsplit('/', 1)[-1])[0]
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '-', stem).strip('-')[:40] or 'image'
+    key = hashlib.sha256(f'{sha256}:{width}:{quality}:{ENCODER_SETTINGS}'.encode('ascii'))
+    return f'{slug}-{key.hexdigest()[:12]}-{width}w.webp'
+
+
+def plan_derivatives(images, widths, quality):
+    """Return {source asset: [Derivative]} for every bucket below its width."""
+    plan = {}
+    for asset, info in sorted(images.items()):
+        if asset.startswith(f'Assets/{DERIVATIVE_DIR}/'):
+            continue
+        # The site directory holding the source's Assets/: root or root/public
+        base = info.path[:len(info.path) - len(asset)]
+        derivatives = []
+        for width in widths:
+            if width >= info.width:
+                continue
+            name = derivative_name(asset, info.sha256, width, quality)
+            derivatives.append(Derivative(
+                f'Assets/{DERIVATIVE_DIR}/{name}',
+                os.path.join(base, 'Assets', DERIVATIVE_DIR, name),
+                width, max(1, round(info.height * width / info.width))))
+        if derivatives:
+            plan[asset] = derivatives
+    return plan
+
+
+def encoder():
+    """Return 'pillow', the path of cwebp, or None if neither is available."""
+    if Image is not None:
+        return 'pillow'
+    return shutil.which('cwebp')
+
+
+def encode(task, cwebp=None):
+    """Encode one derivative and write it atomically; return its size in bytes."""
+    if cwebp is None:
+        with Image.open(task.source) as im:
+            # Lets the JPEG decoder downscale by 1/2, 1/4 or 1/8 while decoding
+            im.draft('RGB', (task.width, task.height))
+            if im.mode not in ('RGB', 'RGBA'):
+                alpha = 'A' in im.getbands() or 'transparency' in im.info
+                im = im.convert('RGBA' if alpha else 'RGB')
+            resized = im.resize((task.width, task.height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, 'WEBP', quality=task.quality, method=6)
+        data = buffer.getvalue()
+        write_atomic(task.path, data)
+        return len(data)
+
+    fd, tmp_path = tempfile.mkstemp(suffix='.webp', dir=os.path.dirname(task.path))
+    os.close(fd)
+    try:
+        subprocess.run([cwebp, '-quiet', '-m', '6', '-q', str(task.quality),
+                        '-resize', str(task.width), str(task.height), task.source, '-o', tmp_path],
+                       check=True, capture_output=True)
+        os.replace(tmp_path, task.path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return os.path.getsize(task.path)
+
+
+def candidates_for(plan, images):
+    """
+    Return {source asset: [Candidate]} sorted by width, listing the
+    derivatives on disk that are smaller than the source, then the source.
+    """
+    srcsets = {}
+    for asset, derivatives in plan.items():
+        info = images[asset]
+        candidates = []
+        for d in derivatives:
+            try:
+                size = os.path.getsize(d.path)
+            except FileNotFoundError:
+                continue
+            if size < info.bytes:
+                candidates.append(Candidate(d.asset, d.width, size))
+        if candidates:
+            candidates.append(Candidate(None, info.width, info.bytes))
+            srcsets[asset] = candidates
+    return srcsets
+
+
+def srcset_url(url):
+    """Escape the characters a srcset candidate URL cannot contain."""
+    return url.replace(' ', '%20').replace(',', '%2C')
+
+
+def is_generated_srcset(value, src):
+    """True for a srcset this stage wrote: derivatives plus the src itself."""
+    for candidate in value.split(','):
+        words = candidate.split()
+        if not words:
+            continue
+        url = words[0]
+        if f'/{DERIVATIVE_DIR}/' not in url and url != srcset_url(src):
+            return False
+    return True
+
+
+def mobile_bytes(candidates):
+    """Bytes a MOBILE_VIEWPORT-wide client downloads at 1x with sizes=100vw."""
+    for c in candidates:
+        if c.width >= MOBILE_VIEWPORT:
+            return c.bytes
+    return candidates[-1].bytes
+
+
+def rewrite_srcsets(content, rel_path, srcsets, sizes=DEFAULT_SIZES):
+    """
+    Record srcset/sizes edits for every img pointing at an image with
+    derivatives. Returns (EditList, bytes of the originals, bytes a
+    mobile client loads instead).
+    """
+    edits = EditList()
+    full = mobile = 0
+    page = served_path(rel_path)
+    for token in tokenize(content):
+        if token.kind != START_TAG or token.name != 'img' or not token.closed:
+            continue
+        attrs = {}
+        for attr in attributes(token):
+            attrs.setdefault(attr.name, attr)
+        src = attrs['src'].value if 'src' in attrs else None
+        candidates = srcsets.get(resolve_reference(src, page)) if src else None
+        if not candidates:
+            continue
+        current = attrs.get('srcset')
+        if current is not None and not is_generated_srcset(current.value or '', src):
+            continue  # hand-written srcset
+
+        prefix = '/Assets/' if src.startswith('/') else asset_prefix(page_depth(page))
+        srcset = ', '.join(
+            f"{srcset_url(src if c.asset is None else prefix + c.asset[len('Assets/'):])} {c.width}w"
+            for c in candidates)
+        added = ''
+        if current is None:
+            added += f' srcset="{srcset}"'
+        elif current.value != srcset:
+            edits.replace(current.start, current.end, f'srcset="{srcset}"')
+        if 'sizes' not in attrs:
+            added += f' sizes="{sizes}"'
+        if added:
+            edits.insert(attribute_insert_pos(content, token), added)
+        full += candidates[-1].bytes
+        mobile += mobile_bytes(candidates)
+    return edits, full, mobile
+
+
+def process_page(site_file, srcsets, sizes=DEFAULT_SIZES, dry_run=False):
+    """Rewrite one page's srcsets; return (edit count, full bytes, mobile bytes)."""
+    with open(site_file.path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    edits, full, mobile = rewrite_srcsets(content, site_file.rel_path, srcsets, sizes)
+    if edits and not dry_run:
+        write_atomic(site_file.path, edits.apply(content))
+    return len(edits), full, mobile
+
+
+def prune_derivatives(root, plan):
+    """Delete derivative files no current source/width maps to; return how many."""
+    keep = {d.path for derivatives in plan.values() for d in derivatives}
+    removed = 0
+    for asset_dir in ('Assets', os.path.join('public', 'Assets')):
+        directory = os.path.join(root, asset_dir, DERIVATIVE_DIR)
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith('.webp') and path not in keep:
+                os.unlink(path)
+                removed += 1
+    return removed
+
+
+def parse_widths(value):
+    widths = sorted({int(w) for w in value.split(',') if w.strip()})
+    if not widths or widths[0] <= 0:
+        raise argparse.ArgumentTypeError('expected positive widths, e.g. 480,768,1200')
+    return widths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_discovery_arguments(parser)
+    parser.add_argument('--widths', type=parse_widths, default=list(DEFAULT_WIDTHS),
+                        help='comma-separated derivative widths in pixels (default %(default)s)')
+    parser.add_argument('--quality', type=int, default=DEFAULT_QUALITY,
+                        help='WebP quality 0-100 (default %(default)s)')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help='sizes attribute added next to each new srcset (default %(default)s)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='encode and write nothing; report what would change')
+    parser.add_argument('--prune', action='store_true',
+                        help='delete derivatives no current image maps to')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    images, _ = probe_assets(root)
+    plan = plan_derivatives(images, args.widths, args.quality)
+    tasks = [EncodeTask(images[asset].path, d.path, d.width, d.height, args.quality)
+             for asset, derivatives in plan.items()
+             for d in derivatives if not os.path.exists(d.path)]
+    cached = sum(len(derivatives) for derivatives in plan.values()) - len(tasks)
+    print(f"{len(plan)} images need derivatives: {len(tasks)} to encode, {cached} cached")
+
+    errors = []
+    encode_with = encoder()
+    if args.dry_run:
+        for task in tasks:
+            print(f"  would encode {os.path.relpath(task.path, root)} ({task.width}x{task.height})")
+    elif tasks and encode_with is None:
+        print(f"❌ Cannot encode {len(tasks)} derivatives: install Pillow (pip install Pillow) "
+              f"or put cwebp on PATH")
+        errors.append('no WebP encoder')
+    elif tasks:
+        for directory in {os.path.dirname(task.path) for task in tasks}:
+            os.makedirs(directory, exist_ok=True)
+        cwebp = None if encode_with == 'pillow' else encode_with
+        written = 0
+        # One image per task: encodes are large and uneven
+        for task, error, result in run_parallel(partial(encode, cwebp=cwebp), tasks,
+                                                args.workers, args.chunksize or 1):
+            if error:
+                errors.append(f"{os.path.relpath(task.source, root)} @ {task.width}w: {error}")
+            else:
+                written += result
+        print(f"✓ Encoded {len(tasks) - len(errors)} derivatives ({written / 1e6:.2f} MB)")
+
+    if args.prune and not args.dry_run:
+        print(f"✓ Pruned {prune_derivatives(root, plan)} stale derivatives")
+
+    srcsets = candidates_for(plan, images)
+    pages = discover(args)
+    changed = []
+    total_full = total_mobile = 0
+    results = run_parallel(partial(process_page, srcsets=srcsets, sizes=args.sizes,
+                                   dry_run=args.dry_run),
+                           pages, args.workers, args.chunksize)
+    print(f"\n--- Bytes per page at {MOBILE_VIEWPORT}px (originals -> srcset) ---")
+    for f, error, result in results:
+        if error:
+            errors.append(f"{f.rel_path}: {error}")
+            continue
+        edits, full, mobile = result
+        if edits:
+            changed.append(f.rel_path)
+        if full:
+            total_full += full
+            total_mobile += mobile
+            print(f"  {full / 1e3:>9.1f} KB -> {mobile / 1e3:>8.1f} KB  "
+                  f"saves {(full - mobile) / 1e3:>8.1f} KB  {f.rel_path}")
+
+    verb = 'Would update' if args.dry_run else '✅ Updated'
+    print(f"\n{verb} srcset in {len(changed)} files")
+    if total_full:
+        print(f"Mobile image bytes: {total_full / 1e6:.2f} MB -> {total_mobile / 1e6:.2f} MB "
+              f"({(total_full - total_mobile) / total_full:.0%} saved)")
+
+    if errors:
+        print(f"\n❌ Errors ({len(errors)}):")
+        for e in errors:
+            print(f"  {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Per-rule hit counts and timings for a repair run, exported as JSON.
+
+repair_engine.py --report run.json collects, for every page, how many
+edits each rule recorded and how long each rule took, plus bytes read and
+written, and this module aggregates them into one machine-readable report.
+A rule whose hit count climbs between runs points at the build step that
+is corrupting output again; --top N prints the slowest rules and files.
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+REPORT_FORMAT = 1
+
+
+def new_file_stats():
+    """Return the empty per-file stats dict filled in by a worker."""
+    return {'seconds': 0.0, 'bytes_read': 0, 'bytes_written': 0, 'rules': {}}
+
+
+def add_rule_time(rules, name, hits, seconds):
+    """Accumulate one rule call into a {name: [hits, seconds]} dict."""
+    entry = rules.get(name)
+    if entry is None:
+        rules[name] = [hits, seconds]
+    else:
+        entry[0] += hits
+        entry[1] += seconds
+
+
+class RunReport:
+    """Aggregate of the per-file stats returned by the workers."""
+
+    def __init__(self, tool, rule_names, rules_version=None):
+        self.tool = tool
+        self.rules_version = rules_version
+        self.rules = {name: {'hits': 0, 'files': 0, 'seconds': 0.0} for name in rule_names}
+        self.files = {}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self.wall_seconds = None
+
+    def add(self, rel_path, stats):
+        """Fold one page's stats into the totals."""
+        self.bytes_read += stats['bytes_read']
+        self.bytes_written += stats['bytes_written']
+        hits = {}
+        for name, (count, seconds) in stats['rules'].items():
+            totals = self.rules.setdefault(name, {'hits': 0, 'files': 0, 'seconds': 0.0})
+            totals['hits'] += count
+            totals['seconds'] += seconds
+            if count:
+                totals['files'] += 1
+                hits[name] = count
+        self.files[rel_path] = {
+            'seconds': round(stats['seconds'], 6),
+            'bytes_read': stats['bytes_read'],
+            'bytes_written': stats['bytes_written'],
+            'hits': hits,
+        }
+
+    def finish(self):
+        self.wall_seconds = time.perf_counter() - self._start
+
+    def to_dict(self):
+        if self.wall_seconds is None:
+            self.finish()
+        return {
+            'format': REPORT_FORMAT,
+            'tool': self.tool,
+            'rules_version': self.rules_version,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'wall_seconds': round(self.wall_seconds, 4),
+            'files_processed': len(self.files),
+            'files_changed': sum(1 for f in self.files.values() if f['bytes_written']),
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'rules': {
+                name: {'hits': r['hits'], 'files': r['files'], 'seconds': round(r['seconds'], 6)}
+                for name, r in self.rules.items()
+            },
+            'files': self.files,
+        }
+
+    def save(self, path):
+        """Write the report as JSON, creating the parent directory."""
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def print_top(self, n, file=None):
+        """Print the n slowest rules and the n slowest files."""
+        report = self.to_dict()
+        print(f"\n--- Slowest rules (of {len(report['rules'])}) ---", file=file)
+        rules = sorted(report['rules'].items(), key=lambda item: item[1]['seconds'], reverse=True)
+        for name, r in rules[:n]:
+            print(f"  {name:<24} {r['seconds'] * 1000:>10.1f} ms {r['hits']:>7} hits in {r['files']} files", file=file)
+
+        print(f"\n--- Slowest files (of {len(report['files'])}) ---", file=file)
+        files = sorted(report['files'].items(), key=lambda item: item[1]['seconds'], reverse=True)
+        for rel_path, f in files[:n]:
+            hits = sum(f['hits'].values())
+            print(f"  {f['seconds'] * 1000:>8.1f} ms {hits:>4} hits  {rel_path}", file=file)
+
+        print(f"\nWall time {report['wall_seconds']:.2f}s, read {report['bytes_read'] / 1e6:.2f} MB, "
+              f"wrote {report['bytes_written'] / 1e6:.2f} MB", file=file)
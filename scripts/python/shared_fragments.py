@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Find copy-pasted header, nav, language widget and footer blocks that have
+drifted from the rest of the site.
+
+Every page carries its own copy of these blocks, which is why
+fix-footer-glitch.py, fix-remaining-corruption.py and
+remove-duplicate-footers.py each hunt for per-page variants of the same
+broken markup. Here each page is tokenized once and split into its
+shared fragments; each fragment is hashed in a normalised form (text
+whitespace collapsed, comments dropped, relative URLs resolved to site
+paths, the per-page `active` class and the width/height/loading
+attributes the image stages add ignored) so the copies on pages at
+different depths hash alike. Fragments are grouped by hash across the
+site, the largest group of each kind is the canonical version, and every
+other variant is reported with its token-level diff to it.
+
+--fix replaces each outlier with the canonical fragment, its relative
+URLs rebased for the page and the page's own `active` link kept (rerun
+the image stages afterwards to restore their attributes); --diff shows
+those edits as a patch instead, and --kind limits either to some kinds.
+
+    python shared_fragments.py
+    python shared_fragments.py --fix --kind footer --kind lang
+"""
+
+import argparse
+import difflib
+import html
+import os
+import posixpath
+import sys
+from collections import namedtuple
+from functools import partial
+
+from asset_refs import resolve_reference, served_path
+from atomic_write import write_atomic
+from discovery import add_discovery_arguments, discover
+from html_tokenizer import (COMMENT, END_TAG, START_TAG, TEXT, VOID_ELEMENTS,
+                            EditList, attributes, get_attribute, tokenize)
+from image_dimensions import attribute_insert_pos
+from link_graph import page_slug
+from manifest import content_hash
+from parallel_runner import add_runner_arguments, run_parallel
+from repair_diff import unified_diff
+
+# (kind, element or None for any, class or id the start tag must carry)
+FRAGMENTS = (
+    ('header', 'header', None),
+    ('nav', 'nav', 'navbar'),
+    ('lang', None, 'langWidget'),
+    ('footer', 'footer', None),
+)
+KINDS = tuple(kind for kind, _, _ in FRAGMENTS)
+URL_ATTRIBUTES = frozenset({'href', 'src', 'poster', 'action', 'data-src'})
+# The class that marks the current page's link rather than the markup
+ACTIVE_CLASS = 'active'
+# Added per page by image_dimensions.py and lazy_loading.py
+GENERATED_ATTRIBUTES = frozenset({'width', 'height', 'loading', 'decoding', 'fetchpriority'})
+MAX_DIFF_LINES = 12
+
+# kind: the page's fragment of that kind spans content[start:end] (end is
+# None when its element is never closed). pieces are the (start, end,
+# text) runs of it outside any fragment nested in it, e.g. the nav inside
+# a header; lines is their normalised form, active the site paths of the
+# links carrying the active class.
+Fragment = namedtuple('Fragment', 'kind start end sha256 lines active pieces')
+
+
+def fragment_kind(token):
+    """Return the shared fragment a start tag opens, or None."""
+    for kind, element, marker in FRAGMENTS:
+        if element is not None and token.name != element:
+            continue
+        if marker is None:
+            return kind
+        classes = (get_attribute(token, 'class') or '').split()
+        if marker in classes or get_attribute(token, 'id') == marker:
+            return kind
+    return None
+
+
+def find_fragments(content):
+    """Return [(kind, start, end)] for the shared fragments of a page."""
+    spans = []
+    open_fragments = []  # [kind, name, start, depth]
+    for token in tokenize(content):
+        if token.kind == START_TAG and token.closed and token.name not in VOID_ELEMENTS:
+            for entry in open_fragments:
+                if entry[1] == token.name:
+                    entry[3] += 1
+            kind = fragment_kind(token)
+            if kind and all(entry[0] != kind for entry in open_fragments):
+                open_fragments.append([kind, token.name, token.start, 1])
+        elif token.kind == END_TAG:
+            for entry in open_fragments[:]:
+                if entry[1] == token.name:
+                    entry[3] -= 1
+                    if entry[3] == 0:
+                        spans.append((entry[0], entry[2], token.end))
+                        open_fragments.remove(entry)
+    spans.extend((kind, start, None) for kind, _, start, _ in open_fragments)
+    return sorted(spans, key=lambda span: span[1])
+
+
+def split_url(value):
+    """Split an href into its path and its ?query/#fragment suffix."""
+    cut = min((i for i in (value.find('?'), value.find('#')) if i != -1), default=len(value))
+    return value[:cut], value[cut:]
+
+
+def normalize(text, page):
+    """
+    Return (lines, active) for a fragment of the page served at `page`:
+    one line per tag or text run, and the site paths its active-class
+    links point to.
+    """
+    lines = []
+    active = []
+    for token in tokenize(text):
+        if token.kind == TEXT:
+            words = ' '.join(token.text.split())
+            if words:
+                lines.append(words)
+        elif token.kind == START_TAG:
+            parts = []
+            href = None
+            state = False
+            for attr in attributes(token):
+                value = attr.value
+                if attr.name in GENERATED_ATTRIBUTES:
+                    continue
+                if value is None:
+                    parts.append(attr.name)
+                    continue
+                value = html.unescape(value)
+                if attr.name in URL_ATTRIBUTES:
+                    path = resolve_reference(value, page)
+                    if path is not None:
+                        value = '/' + path + split_url(value)[1]
+                        if attr.name == 'href':
+                            href = path
+                elif attr.name == 'class':
+                    classes = value.split()
+                    kept = [c for c in classes if c != ACTIVE_CLASS]
+                    state = len(kept) != len(classes)
+                    if not kept:
+                        continue
+                    value = ' '.join(kept)
+                parts.append(f'{attr.name}="{value}"')
+            if state and href is not None:
+                active.append(href)
+            lines.append('<' + ' '.join([token.name] + sorted(parts)) + '>')
+        elif token.kind == END_TAG:
+            lines.append(f'</{token.name}>')
+        elif token.kind != COMMENT:
+            lines.append(token.text.strip())
+    return lines, sorted(active)
+
+
+def page_fragments(site_file):
+    """Read one page; return (its Fragments, the page's sha256)."""
+    with open(site_file.path, 'rb') as f:
+        data = f.read()
+    content = data.decode('utf-8')
+    page = served_path(site_file.rel_path)
+    spans = find_fragments(content)
+    fragments = []
+    for kind, start, end in spans:
+        stop = len(content) if end is None else end
+        nested = [span for span in spans
+                  if span[2] is not None and start < span[1] and span[2] <= stop]
+        # Only the outermost nested fragments cut this one into pieces
+        nested = [span for span in nested
+                  if not any(o[1] < span[1] and span[2] <= o[2] for o in nested)]
+        pieces = []
+        lines = []
+        active = []
+        pos = start
+        for child_kind, child_start, child_end in nested + [(None, stop, stop)]:
+            piece_lines, piece_active = normalize(content[pos:child_start], page)
+            pieces.append((pos, child_start, content[pos:child_start]))
+            lines.extend(piece_lines)
+            active.extend(piece_active)
+            if child_kind:
+                lines.append(f'<{child_kind} fragment>')
+            pos = child_end
+        sha256 = content_hash('\n'.join(lines).encode('utf-8'))
+        fragments.append(Fragment(kind, start, end, sha256, lines, sorted(active), pieces))
+    return fragments, content_hash(data)
+
+
+def rebase_url(value, source_page, page):
+    """Rewrite a relative URL written for source_page so it works from page."""
+    path = resolve_reference(value, source_page)
+    if path is None or value.startswith('/'):
+        return value
+    base, suffix = split_url(value)
+    rel = posixpath.relpath(path or '.', posixpath.dirname(page) or '.')
+    if rel == '.':
+        rel = './'
+    elif base.endswith('/'):
+        rel += '/'
+    elif base.startswith('./') and not rel.startswith('../'):
+        rel = './' + rel
+    return rel + suffix
+
+
+def render_piece(text, source_page, page, active):
+    """
+    Return a piece of a canonical fragment as it should appear on page:
+    its relative URLs rebased and its active class moved to the
+    links in `active` (the slugs of the pages the page's own copy marked,
+    so /blog and blog.html count as the same link).
+    """
+    active = {page_slug(path) for path in active}
+    edits = EditList()
+    for token in tokenize(text):
+        if token.kind != START_TAG:
+            continue
+        attrs = attributes(token)
+        href = None
+        for attr in attrs:
+            if attr.value is None:
+                continue
+            if attr.name in URL_ATTRIBUTES and posixpath.dirname(source_page) != posixpath.dirname(page):
+                new_value = rebase_url(html.unescape(attr.value), source_page, page)
+                if new_value != html.unescape(attr.value):
+                    edits.replace(attr.start, attr.end, f'{attr.name}="{html.escape(new_value)}"')
+            if attr.name == 'href':
+                href = resolve_reference(html.unescape(attr.value), source_page)
+        marked = href is not None and page_slug(href) in active
+        class_attr = next((a for a in attrs if a.name == 'class' and a.value is not None), None)
+        if class_attr is None:
+            if marked:
+                edits.insert(attribute_insert_pos(text, token), f' class="{ACTIVE_CLASS}"')
+            continue
+        classes = class_attr.value.split()
+        kept = [c for c in classes if c != ACTIVE_CLASS] + ([ACTIVE_CLASS] if marked else [])
+        if not kept:
+            start = class_attr.start
+            while text[start - 1].isspace():
+                start -= 1
+            edits.delete(start, class_attr.end)
+        elif kept != classes:
+            edits.replace(class_attr.start, class_attr.end, f'class="{" ".join(kept)}"')
+    return edits.apply(text)
+
+
+def replace_outliers(site_file, fixes, sha256, dry_run=False):
+    """
+    Replace the outlier fragments of one page. fixes holds one
+    [(start, end, replacement)] list per fragment; nothing is written if
+    the page changed since it was scanned. Returns (replaced, diff).
+    """
+    with open(site_file.path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if content_hash(content.encode('utf-8')) != sha256:
+        raise RuntimeError('page changed since it was scanned')
+    edits = EditList()
+    for pieces in fixes:
+        for start, end, replacement in pieces:
+            if content[start:end] != replacement:
+                edits.replace(start, end, replacement)
+    updated = edits.apply(content)
+    diff = None
+    if dry_run:
+        diff = unified_diff(content, updated, [edits], site_file.rel_path.replace(os.sep, '/'))
+    elif updated != content:
+        write_atomic(site_file.path, updated)
+    return len(fixes), diff
+
+
+def fix_task(task, dry_run=False):
+    """Unpack a (site_file, fixes, sha256) work item for the process pool."""
+    site_file, fixes, sha256 = task
+    return replace_outliers(site_file, fixes, sha256, dry_run)
+
+
+def variant_diff(canonical, variant):
+    """The token-level diff from the canonical fragment to a variant."""
+    diff = difflib.unified_diff(canonical.lines, variant.lines, n=0, lineterm='')
+    lines = [line for line in diff if not line.startswith(('---', '+++'))]
+    if len(lines) > MAX_DIFF_LINES:
+        lines = lines[:MAX_DIFF_LINES] + [f'... {len(lines) - MAX_DIFF_LINES} more line(s)']
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_discovery_arguments(parser)
+    parser.add_argument('--fix', action='store_true',
+                        help='replace outlier fragments with the canonical version')
+    parser.add_argument('--diff', action='store_true',
+                        help='write nothing; print the --fix edits as a unified diff')
+    parser.add_argument('--kind', action='append', choices=KINDS,
+                        help='only check this fragment kind (repeatable; default all)')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+    log = sys.stderr if args.diff else sys.stdout
+
+    pages = discover(args)
+    scanned = {}
+    errors = []
+    for f, error, result in run_parallel(page_fragments, pages, args.workers, args.chunksize):
+        if error:
+            errors.append(f"{f.rel_path}: {error}")
+            continue
+        scanned[f.rel_path] = (f, *result)
+
+    # kind -> sha256 -> [(rel_path, Fragment)]
+    groups = {}
+    duplicates = []
+    unclosed = []
+    misnested = []
+    for rel_path, (_, fragments, _) in sorted(scanned.items()):
+        seen = set()
+        for fragment in fragments:
+            if args.kind and fragment.kind not in args.kind:
+                continue
+            if fragment.end is None:
+                unclosed.append((rel_path, fragment.kind))
+                continue
+            if fragment.kind in seen:
+                duplicates.append((rel_path, fragment.kind))
+            seen.add(fragment.kind)
+            groups.setdefault(fragment.kind, {}).setdefault(fragment.sha256, []).append((rel_path, fragment))
+
+    print(f"Shared fragments: {len(scanned)} pages", file=log)
+    fixes = {}
+    for kind in sorted(groups):
+        variants = sorted(groups[kind].values(), key=lambda members: (-len(members), members[0][0]))
+        canonical_page, canonical = variants[0][0]
+        total = sum(len(members) for members in variants)
+        if len(variants) == 1:
+            print(f"\n✓ {kind}: {total} copies, all identical", file=log)
+            continue
+        print(f"\n⚠ {kind}: {total} copies, {len(variants)} variants; canonical "
+              f"{canonical.sha256[:12]} on {len(variants[0])} page(s), e.g. {canonical_page}", file=log)
+        for members in variants[1:]:
+            variant = members[0][1]
+            names = ', '.join(rel for rel, _ in members[:5])
+            more = f' and {len(members) - 5} more' if len(members) > 5 else ''
+            print(f"  ✗ {variant.sha256[:12]} on {len(members)} page(s): {names}{more}", file=log)
+            for line in variant_diff(canonical, variant):
+                print(f"      {line}", file=log)
+            for rel_path, fragment in members:
+                if len(fragment.pieces) != len(canonical.pieces):
+                    # Nests other fragments than the canonical copy: the
+                    # pieces do not line up, so replacing them would cut markup
+                    misnested.append((rel_path, kind, len(fragment.pieces), len(canonical.pieces)))
+                    continue
+                pieces = [(start, end, render_piece(text, served_path(canonical_page),
+                                                    served_path(rel_path), fragment.active))
+                          for (start, end, _), (_, _, text) in zip(fragment.pieces, canonical.pieces)]
+                fixes.setdefault(rel_path, []).append(pieces)
+
+    if duplicates:
+        print(f"\n⚠ Pages with a repeated fragment ({len(duplicates)}):", file=log)
+        for rel_path, kind in duplicates:
+            print(f"  {rel_path}: {kind}", file=log)
+    if unclosed:
+        print(f"\n❌ Fragments never closed, left alone ({len(unclosed)}):", file=log)
+        for rel_path, kind in unclosed:
+            print(f"  {rel_path}: <{kind}>", file=log)
+    if misnested:
+        print(f"\n❌ Fragments nesting different fragments than the canonical copy, "
+              f"left alone ({len(misnested)}):", file=log)
+        for rel_path, kind, pieces, expected in misnested:
+            print(f"  {rel_path}: <{kind}> in {pieces} piece(s), canonical in {expected}", file=log)
+
+    if args.fix or args.diff:
+        tasks = [(scanned[rel][0], page_fixes, scanned[rel][2]) for rel, page_fixes in sorted(fixes.items())]
+        replaced = 0
+        for (f, _, _), error, result in run_parallel(partial(fix_task, dry_run=args.diff),
+                                                     tasks, args.workers, args.chunksize):
+            if error:
+                errors.append(f"{f.rel_path}: {error}")
+                continue
+            count, diff = result
+            replaced += count
+            if diff:
+                sys.stdout.write(diff)
+        verb = 'Would replace' if args.diff else '✅ Replaced'
+        print(f"\n{verb} {replaced} fragment(s) on {len(tasks)} page(s)", file=log)
+    elif fixes:
+        print(f"\n{sum(len(v) for v in fixes.values())} outlier fragment(s); --fix replaces them", file=log)
+
+    if errors:
+        print(f"\n❌ Errors ({len(errors)}):", file=log)
+        for e in errors:
+            print(f"  {e}", file=log)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
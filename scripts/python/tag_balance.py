@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Check that every page's tags balance: report unclosed elements, stray end
+tags and misnested tags with their line and column.
+
+verify-fix.py records a div mismatch in bioclimatic.html that had to be
+found and fixed by hand; nothing else looks at structure. This walks the
+html_tokenizer token stream of each page once with a stack of open
+elements, following the parts of the HTML parsing rules that matter for
+balance:
+
+- void elements (img, br, meta, ...) never open anything;
+- elements whose end tag is optional (p, li, td, option, ...) are closed
+  by the start tags that close them implicitly, and never reported;
+- `<x/>` only closes itself inside svg or math, as in a browser.
+
+An end tag that closes an element further down the stack closes the ones
+above it too. If one of those is closed later by its own end tag the pair
+is reported once, as misnested; otherwise it is reported as unclosed.
+Line and column come from a newline-offset table built once per page.
+
+    python tag_balance.py
+    python tag_balance.py --incremental      # only re-check changed pages
+"""
+
+import argparse
+import os
+import sys
+from collections import namedtuple
+
+import html_tokenizer
+from discovery import add_discovery_arguments, discover, is_page
+from html_tokenizer import END_TAG, START_TAG, VOID_ELEMENTS, LineIndex, tokenize
+from manifest import Manifest, content_hash, manifest_path, source_version
+from parallel_runner import add_runner_arguments, run_parallel
+
+CHECK_VERSION = source_version(__file__, html_tokenizer.__file__)
+
+UNCLOSED = 'unclosed'
+STRAY = 'stray'
+MISNESTED = 'misnested'
+
+Issue = namedtuple('Issue', 'kind line column message')
+
+# Elements whose end tag may be left out
+OPTIONAL_END = frozenset({
+    'html', 'head', 'body', 'p', 'li', 'dt', 'dd', 'tr', 'td', 'th',
+    'thead', 'tbody', 'tfoot', 'colgroup', 'option', 'optgroup', 'rb', 'rt', 'rp',
+})
+FOREIGN_ELEMENTS = ('svg', 'math')
+P_CLOSERS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'details', 'dialog', 'div', 'dl',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4',
+    'h5', 'h6', 'header', 'hgroup', 'hr', 'main', 'menu', 'nav', 'ol', 'p', 'pre',
+    'section', 'table', 'ul',
+})
+# start tag -> (open elements it closes, elements that stop the search)
+IMPLICIT_CLOSES = {name: ({'p'}, {'button'}) for name in P_CLOSERS}
+IMPLICIT_CLOSES.update({
+    'body': ({'head'}, {'html'}),
+    'li': ({'li'}, {'ul', 'ol', 'menu'}),
+    'dt': ({'dt', 'dd'}, {'dl'}),
+    'dd': ({'dt', 'dd'}, {'dl'}),
+    'tr': ({'tr'}, {'table', 'thead', 'tbody', 'tfoot'}),
+    'td': ({'td', 'th'}, {'tr', 'table'}),
+    'th': ({'td', 'th'}, {'tr', 'table'}),
+    'thead': ({'thead', 'tbody', 'tfoot'}, {'table'}),
+    'tbody': ({'thead', 'tbody', 'tfoot'}, {'table'}),
+    'tfoot': ({'thead', 'tbody', 'tfoot'}, {'table'}),
+    'option': ({'option'}, {'select', 'datalist'}),
+    'optgroup': ({'option', 'optgroup'}, {'select'}),
+})
+
+
+class Open:
+    """An element on the stack, and the ones an end tag closed out from under it."""
+
+    __slots__ = ('name', 'start', 'self_closing', 'skipped')
+
+    def __init__(self, name, start, self_closing=False):
+        self.name = name
+        self.start = start
+        self.self_closing = self_closing
+        self.skipped = []   # (element, end tag) closed early by another element's end tag
+
+
+def check_balance(content):
+    """Return every balance Issue in a page, in document order."""
+    issues = []
+    lines = LineIndex(content)
+
+    def report(kind, offset, message):
+        line, column = lines.position(offset)
+        issues.append(Issue(kind, line, column, message))
+
+    def where(element):
+        line, column = lines.position(element.start)
+        return f'{line}:{column}'
+
+    def describe(element):
+        note = f' (<{element.name}/> does not close a non-void element)' if element.self_closing else ''
+        return f'<{element.name}> opened at {where(element)}{note}'
+
+    def pop():
+        element = stack.pop()
+        for skipped, _ in element.skipped:
+            report(UNCLOSED, skipped.start, f'{describe(skipped)} is never closed')
+        return element
+
+    stack = [Open('#document', 0)]
+    foreign = 0
+    for token in tokenize(content):
+        kind = token.kind
+        if kind == START_TAG:
+            name = token.name
+            if name in IMPLICIT_CLOSES:
+                closes, boundary = IMPLICIT_CLOSES[name]
+                for depth in range(len(stack) - 1, 0, -1):
+                    open_name = stack[depth].name
+                    if open_name in closes:
+                        while len(stack) > depth:
+                            pop()
+                        break
+                    if open_name in boundary or open_name not in OPTIONAL_END:
+                        break
+            if name in VOID_ELEMENTS:
+                continue
+            self_closing = token.text.endswith('/>')
+            if self_closing and (foreign or name in FOREIGN_ELEMENTS):
+                continue
+            stack.append(Open(name, token.start, self_closing))
+            if name in FOREIGN_ELEMENTS:
+                foreign += 1
+        elif kind == END_TAG:
+            name = token.name
+            depth = next((i for i in range(len(stack) - 1, 0, -1) if stack[i].name == name), None)
+            if depth is None:
+                owner = next((e for e in reversed(stack) for s, _ in e.skipped if s.name == name), None)
+                if owner:
+                    entry = next(entry for entry in reversed(owner.skipped) if entry[0].name == name)
+                    owner.skipped.remove(entry)
+                    skipped, closer = entry
+                    report(MISNESTED, closer.start,
+                           f'</{closer.name}> closes {describe(skipped)}, '
+                           f'whose </{name}> only follows at {where(token)}')
+                elif name in VOID_ELEMENTS:
+                    report(STRAY, token.start, f'</{name}>: {name} is a void element')
+                else:
+                    report(STRAY, token.start, f'</{name}> has no open <{name}>')
+                continue
+            closed_early = [e for e in stack[depth + 1:] if e.name not in OPTIONAL_END]
+            while len(stack) > depth:
+                element = pop()
+                if element.name in FOREIGN_ELEMENTS:
+                    foreign -= 1
+            stack[-1].skipped.extend((element, token) for element in closed_early)
+    while len(stack) > 1:
+        element = pop()
+        if element.name not in OPTIONAL_END:
+            report(UNCLOSED, element.start, f'{describe(element)} is never closed')
+    pop()
+    issues.sort(key=lambda issue: (issue.line, issue.column))
+    return issues
+
+
+def check_file(task):
+    """
+    Check one page; reuse the recorded issues when its content hash
+    matches what the current checks already saw. Returns
+    (issues, sha256, size, mtime_ns).
+    """
+    path, known = task
+    with open(path, 'rb') as f:
+        data = f.read()
+    sha256 = content_hash(data)
+    if known and known[0] == sha256:
+        issues = known[1]
+    else:
+        issues = check_balance(data.decode('utf-8'))
+    st = os.stat(path)
+    return issues, sha256, st.st_size, st.st_mtime_ns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--incremental', action='store_true',
+                        help='only re-check pages changed since the last run')
+    add_discovery_arguments(parser)
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    pages = [f for f in discover(args) if is_page(f.rel_path)]
+
+    results = {}
+    tasks = []
+    manifest = None
+    if args.incremental:
+        # Untouched pages keep their recorded issues without being read
+        manifest = Manifest(manifest_path(root, 'tag-balance'), CHECK_VERSION)
+        manifest.prune(f.rel_path for f in pages)
+    for f in pages:
+        entry = manifest and manifest.lookup(f.rel_path, f.size, f.mtime_ns)
+        if entry:
+            results[f.rel_path] = [Issue(*issue) for issue in entry['result']]
+            continue
+        known = None
+        if manifest and f.rel_path in manifest.entries:
+            known = (manifest.known_hash(f.rel_path),
+                     [Issue(*issue) for issue in manifest.entries[f.rel_path]['result']])
+        tasks.append((f.path, known))
+
+    errors = []
+    for (path, _), error, result in run_parallel(check_file, tasks, args.workers, args.chunksize):
+        rel_path = os.path.relpath(path, root)
+        if error:
+            errors.append(f"{rel_path}: {error}")
+            continue
+        issues, sha256, size, mtime_ns = result
+        results[rel_path] = issues
+        if manifest:
+            manifest.record(rel_path, size, mtime_ns, sha256, [list(issue) for issue in issues])
+    if manifest:
+        manifest.save()
+
+    counts = {UNCLOSED: 0, STRAY: 0, MISNESTED: 0}
+    unbalanced = 0
+    for f in pages:
+        issues = results.get(f.rel_path)
+        if not issues:
+            continue
+        unbalanced += 1
+        for issue in issues:
+            counts[issue.kind] += 1
+            print(f"{f.rel_path}:{issue.line}:{issue.column}: {issue.kind}: {issue.message}")
+
+    summary = ', '.join(f"{n} {kind}" for kind, n in counts.items())
+    checked = f" ({len(tasks)} re-checked)" if args.incremental else ''
+    print(f"\n{'✅' if not unbalanced else '❌'} {len(pages) - unbalanced}/{len(pages)} pages balanced"
+          f"{checked}; {summary}")
+    if errors:
+        print(f"\n❌ Errors ({len(errors)}):")
+        for e in errors:
+            print(f"  {e}")
+    if unbalanced or errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Check every product × city landing page against its template with a
+Merkle-hashed tree diff.
+
+A landing page should differ from seo-generator/template.html (or its
+product's own "template" page) only in the fields landing_pages.py fills
+in, but the repair scripts have a history of corrupting random subtrees.
+Each page is parsed once into a lightweight element tree in which every
+node carries a hash of its label (tag and attributes, or text) and its
+children's hashes. The expected tree comes from the compiled template:
+its field-free subtrees are hashed once per run, and only the elements
+holding a {{FIELD}} are rebuilt for each page. Comparing the two roots
+and descending only into children whose hashes differ finds the
+divergent subtrees in time proportional to the differences, not the
+page.
+
+Text whitespace, comments, the hero image preload link and the
+attributes the later stages add (width/height, loading/decoding,
+fetchpriority, srcset/sizes) are left out of the hashes, so minified and
+optimised pages still match.
+
+    python template_diff.py
+    python template_diff.py --matrix seo-generator/landing-pages.json
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+from difflib import SequenceMatcher
+from functools import partial
+
+from discovery import ROOT
+from hero_preload import is_hero_preload
+from html_tokenizer import (COMMENT, END_TAG, RAW_TEXT, START_TAG, TEXT, VOID_ELEMENTS,
+                            LineIndex, attributes, tokenize)
+from landing_pages import DEFAULT_MATRIX, Template, field_pattern, load_matrix, page_fields
+from parallel_runner import add_runner_arguments, run_parallel
+
+# Added after rendering by image_dimensions.py, lazy_loading.py,
+# responsive_images.py and the preload stage
+IGNORED_ATTRIBUTES = frozenset({'width', 'height', 'loading', 'decoding',
+                                'fetchpriority', 'srcset', 'sizes'})
+MAX_REPORTED = 20
+# Stop descending once a page has this many differences
+MAX_FOUND = 200
+
+
+class Node:
+    """One element, text run or leftover fragment of a page."""
+
+    __slots__ = ('name', 'label', 'children', 'start', 'end', 'digest', 'fields')
+
+    def __init__(self, name, label, start):
+        self.name = name
+        self.label = label
+        self.children = []
+        self.start = start
+        self.end = start
+        self.digest = None
+        self.fields = False   # the label or a descendant holds a {{FIELD}}
+
+    def seal(self):
+        """Hash the node from its label and its children's hashes."""
+        h = hashlib.blake2b(self.label.encode('utf-8'), digest_size=16)
+        for child in self.children:
+            h.update(child.digest)
+        self.digest = h.digest()
+        self.fields = bool(field_pattern.search(self.label)) or any(c.fields for c in self.children)
+
+    def selector(self):
+        """A short CSS-like name for reports: tag#id or tag.class."""
+        return self.label.split(' ', 1)[0][1:].rstrip('>') if self.name else self.label[:40]
+
+
+def tag_label(token):
+    """Return the normalised label of a start tag: name and sorted attributes."""
+    parts = []
+    for attr in attributes(token):
+        if attr.name in IGNORED_ATTRIBUTES:
+            continue
+        if attr.name == 'id':
+            parts.insert(0, f'#{attr.value}')
+        elif attr.name == 'class' and attr.value:
+            parts.insert(0, '.' + '.'.join(attr.value.split()))
+        else:
+            parts.append(attr.name if attr.value is None else f'{attr.name}="{attr.value}"')
+    head = token.name + ''.join(p for p in parts if p[0] in '#.')
+    rest = sorted(p for p in parts if p[0] not in '#.')
+    return '<' + ' '.join([head] + rest) + '>'
+
+
+def build_tree(text, offset=0):
+    """
+    Parse text into a Node tree. Unclosed elements end with their parent,
+    and a stray end tag or a broken tag becomes a leaf of its own so that
+    it shows up as a difference.
+    """
+    root = Node('#document', '', offset)
+    stack = [root]
+
+    def close(node, end):
+        node.end = end
+        node.seal()
+
+    for token in tokenize(text):
+        kind = token.kind
+        start = token.start + offset
+        if kind == START_TAG and token.closed:
+            if token.name == 'link' and is_hero_preload(token):
+                continue  # added by hero_preload.py
+            node = Node(token.name, tag_label(token), start)
+            stack[-1].children.append(node)
+            if token.name in VOID_ELEMENTS or token.text.endswith('/>'):
+                close(node, token.end + offset)
+            else:
+                stack.append(node)
+        elif kind == END_TAG:
+            depth = next((i for i in range(len(stack) - 1, 0, -1) if stack[i].name == token.name), None)
+            if depth is None:
+                leaf = Node(None, f'</{token.name}>', start)
+                stack[-1].children.append(leaf)
+                close(leaf, token.end + offset)
+                continue
+            while len(stack) > depth:
+                close(stack.pop(), token.end + offset)
+        elif kind == COMMENT:
+            continue
+        else:
+            words = ' '.join(token.text.split()) if kind in (TEXT, RAW_TEXT) else token.text.strip()
+            if not words:
+                continue
+            leaf = Node(None, words, start)
+            stack[-1].children.append(leaf)
+            close(leaf, token.end + offset)
+    while stack:
+        close(stack.pop(), len(text) + offset)
+    return root
+
+
+def render_fields(text, values):
+    return field_pattern.sub(lambda m: values[m.group(1)], text)
+
+
+def expected_tree(node, source, values):
+    """
+    Return the template node as it should appear for one page: field-free
+    subtrees are shared as they are, an element whose own label or text
+    holds a field is rebuilt from its rendered source, and the elements
+    above those are re-hashed.
+    """
+    if not node.fields:
+        return node
+    direct = field_pattern.search(node.label) or any(
+        c.name is None and field_pattern.search(c.label) for c in node.children)
+    if direct and node.name:
+        rebuilt = build_tree(render_fields(source[node.start:node.end], values))
+        if len(rebuilt.children) == 1:
+            # Report the rebuilt nodes at the template element they came from
+            pending = [rebuilt.children[0]]
+            while pending:
+                n = pending.pop()
+                n.start, n.end = node.start, node.end
+                pending.extend(n.children)
+            return rebuilt.children[0]
+    copy = Node(node.name, render_fields(node.label, values), node.start)
+    copy.end = node.end
+    copy.children = [expected_tree(c, source, values) for c in node.children]
+    copy.seal()
+    return copy
+
+
+def fields_in(source, node):
+    """The template fields an expected node was rendered from."""
+    return sorted(set(field_pattern.findall(source[node.start:node.end])))
+
+
+def diverging(expected, actual, source, path, found):
+    """
+    Append (page offset, path, what, fields, digest) for every subtree
+    where the page differs from the expected tree, descending only where
+    hashes differ.
+    """
+    if expected.digest == actual.digest or len(found) >= MAX_FOUND:
+        return
+    if expected.label != actual.label:
+        found.append((actual.start, path + [actual.selector()], 'changed',
+                      fields_in(source, expected), None))
+        return
+    here = path + [expected.selector()] if expected.name != '#document' else path
+    a = [c.digest for c in expected.children]
+    b = [c.digest for c in actual.children]
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == 'equal':
+            continue
+        paired = min(i2 - i1, j2 - j1)
+        for k in range(paired):
+            diverging(expected.children[i1 + k], actual.children[j1 + k], source, here, found)
+        for child in expected.children[i1 + paired:i2]:
+            found.append((actual.children[j1 + paired].start if j1 + paired < len(actual.children) else actual.end,
+                          here + [child.selector()], 'missing', fields_in(source, child), child.digest))
+        for child in actual.children[j1 + paired:j2]:
+            found.append((child.start, here + [child.selector()], 'unexpected', [], child.digest))
+
+
+def merge_moves(found):
+    """
+    Report a subtree that is missing in one place and present unchanged
+    in another (what an unclosed or stray tag does) once, as moved.
+    """
+    missing = {}
+    for entry in found:
+        if entry[2] == 'missing':
+            missing.setdefault(entry[4], []).append(entry)
+    merged = []
+    moved = set()
+    for entry in found:
+        if entry[2] == 'unexpected' and missing.get(entry[4]):
+            source = missing[entry[4]].pop(0)
+            moved.add(id(source))
+            merged.append((entry[0], entry[1], 'moved', source[3], None))
+        elif entry[2] != 'missing':
+            merged.append(entry)
+    merged.extend(e for e in found if e[2] == 'missing' and id(e) not in moved)
+    return sorted(merged, key=lambda entry: entry[0])
+
+
+def check_page(task, trees):
+    """Compare one rendered page with its template; return its divergences."""
+    rel_path, path, template_key, values = task
+    source, tree = trees[template_key]
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    expected = expected_tree(tree, source, values)
+    actual = build_tree(content)
+    found = []
+    diverging(expected, actual, source, [], found)
+    lines = LineIndex(content)
+    return [(lines.position(offset)[0], ' > '.join(p), what, fields)
+            for offset, p, what, fields, _ in merge_moves(found)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--root', default=str(ROOT), help='site root the pages are written under')
+    parser.add_argument('--matrix', help=f'products/cities JSON (default <root>/{DEFAULT_MATRIX})')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    matrix = load_matrix(args.matrix or os.path.join(root, DEFAULT_MATRIX))
+    base_url = matrix.get('base_url', '')
+
+    trees = {}
+    tasks = []
+    missing = []
+    for product in matrix['products']:
+        source = product.get('template', matrix['template'])
+        if source not in trees:
+            with open(os.path.join(root, source), 'r', encoding='utf-8') as f:
+                template = Template(f.read())
+            trees[source] = (template.text, build_tree(template.text))
+        for city in matrix['cities']:
+            rel_path = os.path.join(product['slug'], city['slug'], 'index.html')
+            path = os.path.join(root, rel_path)
+            if not os.path.exists(path):
+                missing.append(rel_path)
+                continue
+            tasks.append((rel_path, path, source, page_fields(product, city, base_url)))
+
+    print(f"Checking {len(tasks)} landing page(s) against {len(trees)} template(s)")
+    clean = 0
+    divergent = 0
+    errors = []
+    for task, error, result in run_parallel(partial(check_page, trees=trees), tasks,
+                                            args.workers, args.chunksize):
+        if error:
+            errors.append(f"{task[0]}: {error}")
+            continue
+        if not result:
+            clean += 1
+            continue
+        divergent += 1
+        print(f"\n❌ {task[0]} ({len(result)} divergent subtree(s))")
+        for line, path, what, fields in result[:MAX_REPORTED]:
+            slot = f" [slot {', '.join(fields)}]" if fields else ''
+            print(f"  line {line}: {what} {path}{slot}")
+        if len(result) > MAX_REPORTED:
+            print(f"  ... {len(result) - MAX_REPORTED} more")
+
+    if missing:
+        print(f"\n⚠ {len(missing)} page(s) in the matrix not rendered yet (run landing_pages.py)")
+    print(f"\n{'✅' if not divergent else '❌'} {clean} page(s) match their template, {divergent} diverge")
+    if errors:
+        print(f"\n❌ Errors ({len(errors)}):")
+        for e in errors:
+            print(f"  {e}")
+    if divergent or errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
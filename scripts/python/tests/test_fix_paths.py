@@ -0,0 +1,65 @@
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS)
+
+spec = importlib.util.spec_from_file_location('fix_paths', os.path.join(SCRIPTS, 'fix-paths.py'))
+fix_paths = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fix_paths)
+
+
+class FixPathsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.write('index.html', '<a href="contact/">Contact</a>')
+        self.write('company.html', '<a href="index.html">Home</a>')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, content):
+        path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def fix(self, rel_path, **kwargs):
+        path = os.path.join(self.root, rel_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            fix_paths.fix_paths(path, root=self.root, **kwargs)
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def test_subfolder_index_link_goes_home(self):
+        self.write('contact/index.html',
+                   '<a href="index.html">Home</a> <a href="company.html">Company</a> <a href="./">Contact</a>')
+        self.assertEqual(self.fix('contact/index.html'),
+                         '<a href="../">Home</a> <a href="../company.html">Company</a> <a href="./">Contact</a>')
+
+    def test_subfolder_index_link_kept_when_not_subfolder(self):
+        self.write('contact/index.html', '<a href="index.html#form">Form</a>')
+        self.assertEqual(self.fix('contact/index.html', is_subfolder=False),
+                         '<a href="index.html#form">Form</a>')
+
+    def test_root_page_unchanged(self):
+        self.assertEqual(self.fix('company.html'), '<a href="index.html">Home</a>')
+
+    def test_routes_built_once_per_root(self):
+        self.write('contact/index.html', '<a href="company.html">Company</a>')
+        with mock.patch.object(fix_paths, 'build_routes', wraps=fix_paths.build_routes) as build:
+            self.fix('company.html')
+            self.fix('contact/index.html')
+        build.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
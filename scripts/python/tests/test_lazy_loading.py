@@ -0,0 +1,26 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lazy_loading import lazy_load_edits  # noqa: E402
+
+
+def apply(content):
+    edits, _, _ = lazy_load_edits(content)
+    return edits.apply(content)
+
+
+class LazyLoadingTest(unittest.TestCase):
+    def test_header_classes_are_not_hero(self):
+        page = '<div class="section-header fade-up"><img src="a.jpg" alt=""></div>'
+        self.assertIn('loading="lazy"', apply(page))
+
+    def test_hero_section_stays_eager(self):
+        page = '<section class="page-hero"><img src="a.jpg" alt="" loading="lazy"></section>'
+        self.assertIn('loading="eager"', apply(page))
+
+
+if __name__ == '__main__':
+    unittest.main()
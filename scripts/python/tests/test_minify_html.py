@@ -0,0 +1,30 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from minify_html import minify  # noqa: E402
+
+
+class MinifyTagTest(unittest.TestCase):
+    def test_unparsable_attributes_copied_unchanged(self):
+        # company/index.html:27 escapes its quotes
+        tag = '<script type=\\"application/ld+json\\">'
+        page = f'<head>\n    {tag}{{"@type": "Organization"}}</script>\n</head>'
+        self.assertIn(tag, minify(page))
+
+    def test_attribute_spacing_collapsed(self):
+        self.assertEqual(minify('<div  class="a"\n   id=x >t</div>'), '<div class="a" id=x>t</div>')
+
+    def test_self_closing_slash_kept(self):
+        self.assertEqual(minify('<input disabled />'), '<input disabled/>')
+
+
+class MinifyTextTest(unittest.TestCase):
+    def test_non_breaking_space_kept(self):
+        self.assertEqual(minify('<p>10\xa0m²  y\n  5\u2009%</p>'), '<p>10\xa0m² y\n5\u2009%</p>')
+
+
+if __name__ == '__main__':
+    unittest.main()
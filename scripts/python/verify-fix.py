@@ -2,48 +2,67 @@
 """
 Verify that the main image corruption issues have been resolved
 """
-import re
-from pathlib import Path
+import argparse
 
-print("\n" + "=" * 70)
-print(" FIXING REPORT - IMAGE CORRUPTION ISSUES ")
-print("=" * 70 + "\n")
+from corruption_detector import DUPLICATE_SRC, OVERLAPPING_IMG, detect_file, first_issue
+from discovery import add_discovery_arguments, discover, is_page
+from parallel_runner import add_runner_arguments, run_parallel
 
-root = Path('/Users/noz/Desktop/development/costaGlass')
-html_files = sorted(list(root.glob('*.html')) + list(root.glob('**/index.html')))
+ISSUE_LABELS = {
+    OVERLAPPING_IMG: 'Overlapping img src',
+    DUPLICATE_SRC: 'Malformed img attributes',
+}
 
-# Only check for the REAL corruption patterns (not language widgets)
-real_issues = []
-
-for html_file in html_files:
-    with open(html_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
+def check_file(html_file):
+    """Return the real corruption category found in a file, or None if clean."""
     # The actual problem: overlapping img src attributes
     # E.g., <img src="./Ass<img src="./Assets/...
-    if re.search(r'img src=".*?<img src="', content):
-        real_issues.append((html_file.relative_to(root), 'Overlapping img src'))
-    # Multiple img src on same line without proper closing of first
-    elif re.search(r'src="[^"]*?"[^>]*?src="', content):
-        real_issues.append((html_file.relative_to(root), 'Malformed img attributes'))
+    # or multiple src attributes inside one img tag
+    issue = first_issue(detect_file(html_file), ISSUE_LABELS)
+    if issue:
+        label, finding = issue
+        return f"{label} (line {finding.line}, col {finding.column})"
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify image corruption fixes in parallel.')
+    add_discovery_arguments(parser)
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    print("\n" + "=" * 70)
+    print(" FIXING REPORT - IMAGE CORRUPTION ISSUES ")
+    print("=" * 70 + "\n")
+
+    html_files = [f for f in discover(args) if is_page(f.rel_path)]
+    rel_paths = {f.path: f.rel_path for f in html_files}
 
-total_files = len([f for f in html_files if 'node_modules' not in str(f)])
+    # Only check for the REAL corruption patterns (not language widgets)
+    real_issues = []
 
-print(f"Total HTML files scanned: {total_files}")
-print(f"Files with real corruption issues: {len(real_issues)}")
+    for html_file, error, issue in run_parallel(check_file, rel_paths, args.workers, args.chunksize):
+        if error:
+            real_issues.append((rel_paths[html_file], error))
+        elif issue:
+            real_issues.append((rel_paths[html_file], issue))
 
-if real_issues:
-    print("\nRemaining issues:")
-    for path, issue in real_issues[:5]:  # Show first 5
-        print(f"  ✗ {path}: {issue}")
-else:
-    print("\n✓ NO OVERLAPPING IMAGE TAG ISSUES FOUND!")
+    total_files = len(html_files)
 
-print("\n" + "=" * 70)
-print(" SUMMARY OF FIX COMPLETION ")
-print("=" * 70)
+    print(f"Total HTML files scanned: {total_files}")
+    print(f"Files with real corruption issues: {len(real_issues)}")
 
-print("""
+    if real_issues:
+        print("\nRemaining issues:")
+        for path, issue in real_issues[:5]:  # Show first 5
+            print(f"  ✗ {path}: {issue}")
+    else:
+        print("\n✓ NO OVERLAPPING IMAGE TAG ISSUES FOUND!")
+
+    print("\n" + "=" * 70)
+    print(" SUMMARY OF FIX COMPLETION ")
+    print("=" * 70)
+
+    print("""
 ✓ FIXED:
   • 83 files with corrupted overlapping <img src> tags
   • 11 additional files with structural HTML corruption  
@@ -60,4 +79,7 @@ process that created them is being executed. To prevent:
   4. Verify lazy loading injection scripts
 """)
 
-print("=" * 70)
+    print("=" * 70)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+/**
+ * Client for scripts/python/repair_server.py, the resident repair server.
+ *
+ * Start the server once (python scripts/python/repair_server.py &), then
+ * from the build:
+ *
+ *   import { RepairClient, repairPlugin } from './scripts/repair-client.mjs';
+ *
+ *   const client = await RepairClient.connect();
+ *   const { html } = await client.repairHtml(source, 'blog/x/index.html');
+ *   await client.repairFiles(['contact.html']);
+ *   client.close();
+ *
+ * or add repairPlugin() to the Vite plugins to repair every HTML entry
+ * as it is transformed. If no server is listening the plugin warns once
+ * and leaves the HTML untouched, so the build never depends on Python.
+ */
+import net from 'net';
+import path from 'path';
+import { fileURLToPath } from 'url';
+
+const PROJECT_ROOT = path.resolve(path.dirname(fileURLToPath(import.meta.url)), '..');
+export const DEFAULT_SOCKET = path.join(PROJECT_ROOT, '.repair-cache', 'repair.sock');
+
+export class RepairClient {
+  constructor(socket) {
+    this.socket = socket;
+    this.nextId = 1;
+    this.pending = new Map();
+    this.buffer = '';
+    this.closed = false;
+    socket.setEncoding('utf8');
+    socket.on('data', (chunk) => this.onData(chunk));
+    socket.on('close', () => {
+      this.closed = true;
+      this.failAll(new Error('repair server closed the connection'));
+    });
+    socket.on('error', (error) => this.failAll(error));
+  }
+
+  static connect(socketPath = DEFAULT_SOCKET) {
+    return new Promise((resolve, reject) => {
+      const socket = net.createConnection(socketPath);
+      socket.once('connect', () => resolve(new RepairClient(socket)));
+      socket.once('error', reject);
+    });
+  }
+
+  onData(chunk) {
+    this.buffer += chunk;
+    let newline;
+    while ((newline = this.buffer.indexOf('\n')) !== -1) {
+      const line = this.buffer.slice(0, newline);
+      this.buffer = this.buffer.slice(newline + 1);
+      if (!line.trim()) continue;
+      const response = JSON.parse(line);
+      const waiter = this.pending.get(response.id);
+      if (!waiter) continue;
+      this.pending.delete(response.id);
+      if (response.ok) {
+        waiter.resolve(response);
+      } else {
+        waiter.reject(new Error(response.error));
+      }
+    }
+  }
+
+  failAll(error) {
+    for (const waiter of this.pending.values()) waiter.reject(error);
+    this.pending.clear();
+  }
+
+  request(body) {
+    if (this.closed) {
+      return Promise.reject(new Error('repair server closed the connection'));
+    }
+    const id = this.nextId++;
+    return new Promise((resolve, reject) => {
+      this.pending.set(id, { resolve, reject });
+      this.socket.write(JSON.stringify({ ...body, id }) + '\n');
+    });
+  }
+
+  repairHtml(html, page, { diff = false } = {}) {
+    return this.request({ op: 'repair', html, path: page, diff });
+  }
+
+  repairFiles(files, { diff = false } = {}) {
+    return this.request({ op: 'repair', files, diff });
+  }
+
+  check(files) {
+    return this.request({ op: 'check', files });
+  }
+
+  checkHtml(html) {
+    return this.request({ op: 'check', html });
+  }
+
+  close() {
+    this.socket.end();
+  }
+}
+
+/**
+ * Vite plugin: run every HTML entry through the repair rules. If the
+ * server goes away mid-build the page is left as is and the next one
+ * tries to reconnect.
+ */
+export function repairPlugin({ socketPath = DEFAULT_SOCKET, root = PROJECT_ROOT } = {}) {
+  let client = null;
+  let unavailable = false;
+
+  return {
+    name: 'costaglass-repair',
+    async transformIndexHtml(html, ctx) {
+      if (unavailable) return html;
+      try {
+        client = client || await RepairClient.connect(socketPath);
+      } catch (error) {
+        unavailable = true;
+        console.warn(`⚠️  Repair server not reachable at ${socketPath} (${error.message}); HTML left as is`);
+        return html;
+      }
+      const page = path.relative(root, ctx.filename);
+      try {
+        const result = await client.repairHtml(html, page);
+        return result.html;
+      } catch (error) {
+        console.warn(`⚠️  Repair of ${page} failed (${error.message}); HTML left as is`);
+        client.close();
+        client = null;
+        return html;
+      }
+    },
+    closeBundle() {
+      if (client) client.close();
+      client = null;
+    },
+  };
+}